@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+sys.path.append(".")
+
+from src.services.kubernetes import pod_api_wrapper  # noqa: E402
+from src.services.kubernetes.k8s_api import K8sApi  # noqa: E402
+from src.services.kubernetes.pod_executor import PodExecutor  # noqa: E402
+from src.services.kubernetes.pod_informer import PodInformer  # noqa: E402
+from src.services.kubernetes.pod_manager import PodManager  # noqa: E402
+from src.utils import config  # noqa: E402
+from src.utils.name_generator import generate_name  # noqa: E402
+
+logger = logging.getLogger("benchmark")
+
+
+def measure(concurrency: int, operations: int, operation: Callable[[int], None]) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(operation, range(operations)))
+    return operations / (time.perf_counter() - start)
+
+
+def run(image: str, pods: int, operations: int, concurrency_levels: List[int]):
+    api = K8sApi().core
+    namespace = config.K8S_NAMESPACE
+    PodInformer(api, namespace).start()
+
+    for concurrency in concurrency_levels:
+        pod_names = [generate_name("lotse-benchmark") for _ in range(pods)]
+
+        def create(index: int):
+            PodManager.create_pod(api, namespace, pod_names[index], "3.13", [], logger, [],
+                                  image, None, False)
+            asyncio.run(pod_api_wrapper.wait_for_pod_running(api, namespace, pod_names[index], logger))
+
+        def read(index: int):
+            PodManager.get_pod(api, namespace, pod_names[index % pods])
+
+        def execute(index: int):
+            PodExecutor.run_command(namespace, pod_names[index % pods], ["true"])
+
+        try:
+            create_rate = measure(concurrency, pods, create)
+            read_rate = measure(concurrency, operations, read)
+            exec_rate = measure(concurrency, operations, execute)
+            print(f"concurrency={concurrency:>3}  create={create_rate:8.2f}/s  "
+                  f"read={read_rate:8.2f}/s  exec={exec_rate:8.2f}/s")
+        finally:
+            for pod_name in pod_names:
+                PodManager.delete_pod(api, namespace, pod_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Kubernetes create/read/exec throughput")
+    parser.add_argument("--image", default="python:3.13-slim")
+    parser.add_argument("--pods", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    run(args.image, args.pods, args.operations, [int(level) for level in args.concurrency.split(",")])
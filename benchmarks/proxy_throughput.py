@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.append(".")
+
+from src.routes import proxy  # noqa: E402
+from src.services.proxy_route_table import ProxyRoute, ProxyRouteTable  # noqa: E402
+from src.utils import config  # noqa: E402
+
+TASK_ID = "benchmark"
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_upstream_app(asset_size: int):
+    asset = b"x" * asset_size
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/javascript"),
+                                (b"content-length", str(len(asset)).encode())]})
+        await send({"type": "http.response.body", "body": asset})
+
+    return app
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def measure(url: str, concurrency: int, duration: float) -> float:
+    completed = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal completed
+        while time.perf_counter() < deadline:
+            response = await client.get(url)
+            response.raise_for_status()
+            completed += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, trust_env=False) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return completed / (time.perf_counter() - start)
+
+
+def run(asset_size: int, duration: float, concurrency_levels: List[int]):
+    upstream_port = get_free_port()
+    proxy_port = get_free_port()
+
+    app = FastAPI()
+    app.add_middleware(proxy.ProxyDispatcher)
+    # resolved upfront so the benchmark measures the proxy hot path and not the database
+    config.PROXY_ROUTE_TTL_SECONDS = float("inf")
+
+    async def load_route():
+        return ProxyRoute("127.0.0.1", upstream_port)
+
+    asyncio.run(ProxyRouteTable().resolve(TASK_ID, proxy.ProxyCacheType.PROXY.value, load_route))
+
+    servers = [serve(create_upstream_app(asset_size), upstream_port), serve(app, proxy_port)]
+    try:
+        for concurrency in concurrency_levels:
+            direct_rate = asyncio.run(measure(f"http://127.0.0.1:{upstream_port}/static/app.js",
+                                              concurrency, duration))
+            proxy_rate = asyncio.run(measure(f"http://127.0.0.1:{proxy_port}/proxy/{TASK_ID}/static/app.js",
+                                             concurrency, duration))
+            print(f"concurrency={concurrency:>3}  direct={direct_rate:9.1f} req/s  "
+                  f"proxy={proxy_rate:9.1f} req/s  overhead={direct_rate / proxy_rate:5.2f}x")
+    finally:
+        for server in servers:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure requests per second through the /proxy reverse proxy")
+    parser.add_argument("--asset-size", type=int, default=16 * 1024)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", default="1,8,32,64")
+    args = parser.parse_args()
+
+    run(args.asset_size, args.duration, [int(level) for level in args.concurrency.split(",")])
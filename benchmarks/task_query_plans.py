@@ -0,0 +1,182 @@
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import create_engine, event, text
+
+sys.path.append(".")
+
+from src.database import database_access  # noqa: E402
+from src.database.models.package_entity import PackageEntity  # noqa: E402
+from src.database.models.task_entity import TaskEntity  # noqa: E402
+from src.database.repositories.task_repository import TaskRepository  # noqa: E402
+from src.misc.task_status import TaskStatus  # noqa: E402
+from src.utils import config  # noqa: E402
+
+SCHEMA = "lotse_benchmark"
+TASK_INDEXES = ["ix_tasks_deployment_id_status", "ix_tasks_stage_started_at", "ix_tasks_active_ip_address"]
+
+
+@dataclass
+class DashboardQuery:
+    name: str
+    call: Callable[[TaskRepository], Any]
+    index_only: bool = False
+
+
+QUERIES = [
+    DashboardQuery("running tasks of this host", lambda repository: repository.get_running_tasks()),
+    DashboardQuery("queued tasks of this host", lambda repository: repository.get_queued_tasks()),
+    DashboardQuery("running instances of a deployment",
+                   lambda repository: repository.get_tasks_count_by_deployment_id(
+                       "deployment-1", [TaskStatus.RUNNING, TaskStatus.INITIALIZING]), index_only=True),
+    DashboardQuery("running instances of a stage",
+                   lambda repository: repository.get_tasks_count_by_stage(
+                       "dev", [TaskStatus.RUNNING, TaskStatus.INITIALIZING])),
+    DashboardQuery("first task page of a stage", lambda repository: repository.list_tasks("dev", 100)),
+    DashboardQuery("tasks of a deployment",
+                   lambda repository: repository.get_tasks_by_deployment_id("deployment-1", [])),
+]
+
+
+def seed(engine, tasks: int, deployments: int, active: int, ip_address: str, with_indexes: bool):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    schema_engine = engine.execution_options(schema_translate_map={None: SCHEMA})
+    database_access.Base.metadata.create_all(schema_engine, tables=[PackageEntity.__table__,
+                                                                    TaskEntity.__table__])  # type: ignore
+    with schema_engine.begin() as connection:
+        if not with_indexes:
+            for index in TASK_INDEXES:
+                connection.execute(text(f"DROP INDEX {SCHEMA}.{index}"))
+
+        connection.execute(text(f"""
+            INSERT INTO {SCHEMA}."Packages"
+                (deployment_id, package_name, python_version, version, stage, deployed_at, active, deleted)
+            SELECT 'deployment-' || n, 'package-' || n, '3.13', '1.0.0',
+                   CASE WHEN n % 2 = 0 THEN 'dev' ELSE 'prod' END, now(), true, false
+            FROM generate_series(1, :deployments) AS n"""), {"deployments": deployments})
+
+        # years of finished tasks spread over a few hosts, only the newest ones are still active
+        connection.execute(text(f"""
+            INSERT INTO {SCHEMA}."Tasks"
+                (task_id, deployment_id, status, stage, started_at, finished_at, hostname, ip_address, is_ui_app)
+            SELECT 'task-' || n,
+                   'deployment-' || (n % :deployments + 1),
+                   CASE WHEN n <= :active THEN (ARRAY['queued', 'initializing', 'running'])[n % 3 + 1]
+                        WHEN n % 10 = 0 THEN 'failed'
+                        ELSE 'completed' END,
+                   CASE WHEN (n % :deployments + 1) % 2 = 0 THEN 'dev' ELSE 'prod' END,
+                   now() - n * interval '10 seconds',
+                   CASE WHEN n <= :active THEN NULL ELSE now() - n * interval '10 seconds' + interval '5 seconds' END,
+                   'host-' || n % 8,
+                   CASE WHEN n % 8 = 0 THEN :ip_address ELSE '10.0.0.' || n % 8 END,
+                   false
+            FROM generate_series(1, :tasks) AS n"""),
+                           {"tasks": tasks, "deployments": deployments, "active": active, "ip_address": ip_address})
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f'VACUUM ANALYZE {SCHEMA}."Tasks"'))
+        connection.execute(text(f'VACUUM ANALYZE {SCHEMA}."Packages"'))
+
+    return schema_engine
+
+
+def walk(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def explain(engine, statement: str, parameters: Any) -> Dict[str, Any]:
+    with engine.connect() as connection:
+        cursor = connection.connection.cursor()
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0]
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def check_plan(query: DashboardQuery, plan: Dict[str, Any]) -> Tuple[bool, str]:
+    nodes = list(walk(plan["Plan"]))
+    task_scans = [node for node in nodes if node.get("Relation Name") == "Tasks" or
+                  (node.get("Index Name") or "").startswith("ix_tasks")]
+    scan_types = sorted({f"{node['Node Type']} ({node.get('Index Name', 'Tasks')})" for node in task_scans})
+    summary = ", ".join(scan_types)
+
+    if not task_scans or any(node["Node Type"] == "Seq Scan" for node in task_scans):
+        return False, summary
+    if query.index_only:
+        index_only = [node for node in task_scans if node["Node Type"] == "Index Only Scan"]
+        if not index_only:
+            return False, summary
+        summary += f", heap fetches {sum(node.get('Heap Fetches', 0) for node in index_only)}"
+
+    return True, summary
+
+
+def run(database_url: str, tasks: int, deployments: int, active: int, repeat: int, with_indexes: bool) -> bool:
+    engine = create_engine(database_url)
+    repository = TaskRepository()
+
+    started = time.perf_counter()
+    schema_engine = seed(engine, tasks, deployments, active, repository.ip_address, with_indexes)
+    print(f"seeded {tasks} tasks over {deployments} deployments in {time.perf_counter() - started:.1f}s")
+
+    # the repository opens its sessions through SessionLocal, point it at the seeded schema
+    database_access.SessionLocal.configure(bind=schema_engine)
+    statements: List[Tuple[str, Any]] = []
+
+    def capture(_, __, statement, parameters, ___, ____):
+        statements.append((statement, parameters))
+
+    passed = True
+    for query in QUERIES:
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            query.call(repository)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query.call(repository)
+            durations.append((time.perf_counter() - started) * 1000)
+
+        statement, parameters = statements[-1]
+        plan = explain(schema_engine, statement, parameters)
+        ok, summary = check_plan(query, plan)
+        passed = passed and ok
+        print(f"{'ok  ' if ok else 'FAIL'} {query.name:<36} call {sorted(durations)[len(durations) // 2]:8.2f} ms  "
+              f"execution {plan['Execution Time']:8.2f} ms  {summary}")
+
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the query plans of the task dashboard queries on a large "
+                                                 f"seeded Tasks table in the {SCHEMA} schema")
+    parser.add_argument("--database-url", default=config.DATABASE_URL)
+    parser.add_argument("--tasks", type=int, default=3_000_000)
+    parser.add_argument("--deployments", type=int, default=200)
+    parser.add_argument("--active", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--without-indexes", action="store_true", help="drop the task indexes to see the baseline")
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    try:
+        success = run(args.database_url, args.tasks, args.deployments, args.active, args.repeat,
+                      not args.without_indexes)
+    finally:
+        if not args.keep:
+            with create_engine(args.database_url).begin() as cleanup:
+                cleanup.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    sys.exit(0 if success else 1)
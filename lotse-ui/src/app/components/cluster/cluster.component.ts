@@ -107,11 +107,7 @@ export class ClusterComponent implements OnInit, OnDestroy {
   private setupWebSocket(): void {
     this.wsSubscription = this.webSocketService.connectToCluster().subscribe({
       next: (data) => {
-        const nodes = data.nodes;
-        if (!nodes) {
-          return;
-        }
-
+        const nodes = data.nodes || [];
         for (const node of nodes) {
           const existingNode = this.nodes.find(n => n.name === node.name);
           if (existingNode) {
@@ -120,6 +116,11 @@ export class ClusterComponent implements OnInit, OnDestroy {
             this.nodes.push(node);
           }
         }
+
+        const removedNames: string[] | undefined = data.removed?.nodes;
+        if (removedNames) {
+          this.nodes = this.nodes.filter(n => !removedNames.includes(n.name));
+        }
       },
       error: (error) => {
         console.error('WebSocket error:', error);
@@ -121,7 +121,7 @@ export class NamespaceResourcesComponent implements OnInit, OnDestroy {
 
         this.wsSubscription = this.webSocketService.connectToNamespaceResource(this.namespace, resourceType).subscribe({
             next: (data: any) => {
-                if (data[resourceType]) {
+                if (data[resourceType] || data.removed?.[resourceType]) {
                     const resourceMap = {
                         'pods': this.pods,
                         'services': this.services,
@@ -134,7 +134,11 @@ export class NamespaceResourcesComponent implements OnInit, OnDestroy {
 
                     if (resourceType in resourceMap) {
                         const key = resourceType as keyof typeof resourceMap;
-                        this.updateResourceArray(resourceMap[key], data[resourceType]);
+                        if (data.partial) {
+                            this.mergeResourceChanges(resourceMap[key], data[resourceType] || [], data.removed?.[resourceType] || []);
+                        } else {
+                            this.updateResourceArray(resourceMap[key], data[resourceType]);
+                        }
                         this.loading = false;
                     }
                 }
@@ -146,6 +150,25 @@ export class NamespaceResourcesComponent implements OnInit, OnDestroy {
         });
     }
 
+    private mergeResourceChanges(targetArray: any[], changedItems: any[], removedNames: string[]): void {
+        for (const changedItem of changedItems) {
+            const existingItem = targetArray.find(item => item.name === changedItem.name);
+            if (existingItem) {
+                Object.assign(existingItem, changedItem);
+                existingItem.duration = new AgePipe().transform(existingItem.creationTimestamp);
+            } else {
+                targetArray.push(changedItem);
+            }
+        }
+
+        for (const name of removedNames) {
+            const index = targetArray.findIndex(item => item.name === name);
+            if (index > -1) {
+                targetArray.splice(index, 1);
+            }
+        }
+    }
+
     private updateResourceArray(targetArray: any[], newItems: any[]): void {
         for (const newItem of newItems) {
             const existingItem = targetArray.find(item => item.name === newItem.name);
@@ -61,6 +61,7 @@ export class PackageExecutionComponent implements OnInit, OnDestroy {
   customArgs: CustomArgument[] = [];
   waitForCompletion = true;
   tasks: TaskInfo[] = [];
+  nextTasksCursor: string | null = null;
   selectedLogTaskId: string | null = null;
   taskLogs: string[] = [];
   isPackageRunning = signal(false);
@@ -109,7 +110,20 @@ export class PackageExecutionComponent implements OnInit, OnDestroy {
   async loadTasksAsync(): Promise<void> {
     try {
       const stage = localStorage.getItem('stage') || 'dev';
-      this.tasks = await this.taskService.getTasksAsync(stage);
+      const page = await this.taskService.getTasksAsync(stage);
+      this.tasks = page.tasks;
+      this.nextTasksCursor = page.next_cursor;
+    } catch (error) {
+      this.showError('Failed to load tasks');
+    }
+  }
+
+  async loadMoreTasksAsync(): Promise<void> {
+    try {
+      const stage = localStorage.getItem('stage') || 'dev';
+      const page = await this.taskService.getTasksAsync(stage, this.nextTasksCursor);
+      this.tasks = [...this.tasks, ...page.tasks];
+      this.nextTasksCursor = page.next_cursor;
     } catch (error) {
       this.showError('Failed to load tasks');
     }
@@ -143,18 +143,23 @@ export class PackageInstanceComponent implements OnInit, OnDestroy {
 
     const stage = localStorage.getItem('stage') || 'dev';
     this.wsSubscriptionForTasks = this.webSocketService.connectToTasks(this.packageName, stage, this.packageVersion).subscribe({
-      next: (data: { tasks: TaskInfo[] }) => {
+      next: (data: { tasks?: TaskInfo[], removed?: { tasks?: string[] } }) => {
         if (data.tasks) {
           for (const task of data.tasks) {
             const existingTask = this.packageInstance.tasks.find(t => t.task_id === task.task_id);
             if (existingTask) {
-              task.duration = new DurationPipe().transform(task.started_at, task.finished_at);
               Object.assign(existingTask, task);
+              existingTask.duration = new DurationPipe().transform(existingTask.started_at, existingTask.finished_at);
             } else {
               this.packageInstance.tasks.push(task);
             }
           }
         }
+
+        const removedTaskIds = data.removed?.tasks;
+        if (removedTaskIds) {
+          this.packageInstance.tasks = this.packageInstance.tasks.filter(t => !removedTaskIds.includes(t.task_id));
+        }
       },
       error: (error: Error) => {
         console.error('WebSocket error:', error);
@@ -167,8 +172,10 @@ export class PackageInstanceComponent implements OnInit, OnDestroy {
     this.taskLogs = [];
     if (this.selectedTask) {
       this.wsSubscriptionForTaskLogs = this.webSocketService.connectToTaskLogs(taskId).subscribe({
-        next: (data: { logs: string[] }) => {
-          if (data.logs && this.taskLogs.length !== data.logs.length) {
+        next: (data: { logs?: string[], prepended?: { logs?: string[] } }) => {
+          if (data.prepended?.logs) {
+            this.taskLogs = [...data.prepended.logs, ...this.taskLogs];
+          } else if (data.logs && this.taskLogs.length !== data.logs.length) {
             this.taskLogs = data.logs;
           }
         },
@@ -190,7 +197,8 @@ export class PackageInstanceComponent implements OnInit, OnDestroy {
     this.selectedLogTaskId = task.task_id;
     this.taskLogs = [];
 
-    if (task.status === TaskStatus.RUNNING || task.status === TaskStatus.INITIALIZING) {
+    if (task.status === TaskStatus.QUEUED || task.status === TaskStatus.RUNNING ||
+      task.status === TaskStatus.INITIALIZING) {
       await this.setupWebSocketForTaskLogs(task.task_id);
     } else {
       const taskLogs = await this.taskService.getTaskLogsAsync(task.task_id);
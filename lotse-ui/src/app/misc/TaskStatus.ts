@@ -1,4 +1,5 @@
 export enum TaskStatus {
+  QUEUED = 'queued',
   INITIALIZING = 'initializing',
   RUNNING = 'running',
   COMPLETED = 'completed',
@@ -0,0 +1,6 @@
+import { TaskInfo } from './TaskInfo';
+
+export interface TaskPage {
+  tasks: TaskInfo[];
+  next_cursor: string | null;
+}
@@ -5,6 +5,7 @@ import { SyncPackageResponse } from '../models/SyncPackageResponse';
 import { AsyncPackageResponse } from '../models/AsyncPackageResponse';
 import { TaskInfo } from '../models/TaskInfo';
 import { TaskLogs } from '../models/TaskLogs';
+import { TaskPage } from '../models/TaskPage';
 
 
 @Injectable({
@@ -17,8 +18,9 @@ export class TaskService {
     return await firstValueFromAsync(this.http.get<AsyncPackageResponse>(`${environment.url}/task/status/${taskId}`));
   }
 
-  async getTasksAsync(stage: string): Promise<TaskInfo[]> {
-    return await firstValueFromAsync(this.http.get<TaskInfo[]>(`${environment.url}/tasks/${stage}`));
+  async getTasksAsync(stage: string, cursor: string | null = null): Promise<TaskPage> {
+    const params: Record<string, string> = cursor ? { cursor } : {};
+    return await firstValueFromAsync(this.http.get<TaskPage>(`${environment.url}/tasks/${stage}`, { params }));
   }
 
   async cancelTaskAsync(taskId: string): Promise<TaskInfo> {
@@ -9,12 +9,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, PlainTextResponse
 
 import src.utils.service_registry as service_registry
-from src.database import seed_users
-from src.database.database_access import get_db_session, init_db
+from src.database import migrations, seed_users
+from src.database.database_access import (AsyncSessionLocal, async_engine,
+                                          init_db)
 from src.routes import (authentication, cluster, execute, package,
-                        pod_terminal, proxy, status, task, volume, websocket)
-from src.routes.proxy import handle_proxy_404_middleware
+                        pod_terminal, status, task, volume, websocket)
+from src.routes.proxy import ProxyDispatcher, ProxyRefererFallback
 from src.services.activemq_service import ActiveMQService
+from src.services.proxy_client_pool import ProxyClientPool
 from src.services.task_manager_service import TaskManagerService
 from src.utils import config
 from src.utils.singleton_meta import get_service_instance
@@ -26,9 +28,10 @@ logger = logging.getLogger(__name__)
 async def lifespan(_: FastAPI):
     logger.info("Initializing database...")
     init_db()
-    db_session = next(get_db_session())
+    migrations.run_migrations()
     try:
-        seed_users.seed_default_users(db_session)
+        async with AsyncSessionLocal() as db_session:
+            await seed_users.seed_default_users(db_session)
         logger.info("Database initialized")
         service_registry.initialize_registry()
 
@@ -40,28 +43,20 @@ async def lifespan(_: FastAPI):
             threading.Thread(target=get_service_instance(ActiveMQService).start_listener, daemon=True).start()
         yield
     finally:
-        db_session.close()
+        await ProxyClientPool().aclose()
+        await async_engine.dispose()
 
 
 app = FastAPI(title=config.APP_NAME, root_path=config.OPENAPI_PREFIX_PATH,
               version=config.API_VERSION, lifespan=lifespan)
 
-app.middleware('http')(handle_proxy_404_middleware)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.router.default = ProxyRefererFallback(app.router.default)
 
 app.include_router(authentication.router)
 app.include_router(cluster.router)
 app.include_router(execute.router)
 app.include_router(package.router)
 app.include_router(pod_terminal.router)
-app.include_router(proxy.router)
 app.include_router(status.router)
 app.include_router(task.router)
 app.include_router(volume.router)
@@ -103,3 +98,13 @@ async def catch_exceptions_middleware(request: Request, call_next):
 
 app.middleware('http')(catch_exceptions_middleware)
 app.middleware('http')(tracking_middleware)
+
+# added last so it wraps the http middlewares above, proxied traffic skips them but still gets CORS
+app.add_middleware(ProxyDispatcher)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
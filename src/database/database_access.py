@@ -1,29 +1,46 @@
 import logging
 import time
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from sqlalchemy import create_engine
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import QueuePool
 
-from src.utils.config import DATABASE_URL
+from src.utils.config import (ASYNC_DATABASE_MAX_CONNECTIONS, ASYNC_DATABASE_URL,
+                              DATABASE_MAX_CONNECTIONS, DATABASE_URL)
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+
+
+def get_pool_options(max_connections: int) -> dict:
+    pool_size = max(max_connections * 3 // 8, 1)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max(max_connections - pool_size, 0),
+        "pool_timeout": 60,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800
+    }
+
+
 engine = create_engine(
     DATABASE_URL,
     poolclass=QueuePool,
-    pool_size=30,
-    max_overflow=50,
-    pool_timeout=60,
-    pool_pre_ping=True,
-    pool_recycle=1800
+    **get_pool_options(max(DATABASE_MAX_CONNECTIONS - ASYNC_DATABASE_MAX_CONNECTIONS, 1))
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# used by the request handlers so a query waits on the event loop instead of blocking it
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_pool_options(ASYNC_DATABASE_MAX_CONNECTIONS))
+# loaded entities stay readable after commit, an expired attribute could not be refreshed lazily
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db_session() -> Generator[Session]:
     db = SessionLocal()
@@ -33,6 +50,11 @@ def get_db_session() -> Generator[Session]:
         db.close()
 
 
+async def get_async_db_session() -> AsyncGenerator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db(retries=5, delay=2):
     for attempt in range(retries):
         try:
@@ -0,0 +1,78 @@
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Type
+
+from sqlalchemy import Connection, select, text
+from sqlalchemy.schema import CreateIndex
+
+from src.database.database_access import Base, engine
+from src.database.models.schema_migration_entity import SchemaMigrationEntity
+from src.database.models.task_entity import TaskEntity
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_ID = 7261001
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def create_indexes(entity: Type[Base], *names: str) -> Callable[[Connection], None]:  # type: ignore
+    def upgrade(connection: Connection):
+        indexes = {index.name: index for index in entity.__table__.indexes}  # type: ignore
+        for name in names:
+            # a failed concurrent build leaves an invalid index behind that IF NOT EXISTS would keep
+            invalid = connection.execute(text(
+                "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+                "WHERE pg_class.relname = :name AND pg_table_is_visible(pg_class.oid) AND NOT pg_index.indisvalid"
+            ), {"name": name}).first()
+            if invalid is not None:
+                logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+                connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+            # only this statement builds concurrently, create_all still runs the model indexes inside a transaction
+            index = indexes[name]
+            index.dialect_kwargs["postgresql_concurrently"] = True
+            try:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+            finally:
+                index.dialect_kwargs["postgresql_concurrently"] = False
+
+    return upgrade
+
+
+# create_all already builds new databases with the current schema, so every step has to be idempotent
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Indexes for the task dashboard queries",
+              create_indexes(TaskEntity, "ix_tasks_deployment_id_status", "ix_tasks_stage_started_at",
+                             "ix_tasks_active_ip_address")),
+]
+
+
+def run_migrations():
+    # concurrent index builds cannot run inside a transaction, so every statement commits on its own
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT")
+        # replicas starting at the same time wait for the first one instead of migrating twice
+        connection.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        try:
+            SchemaMigrationEntity.__table__.create(connection, checkfirst=True)  # type: ignore
+            applied = set(connection.execute(select(SchemaMigrationEntity.version)).scalars())
+
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+
+                logger.info(f"Applying database migration {migration.version}: {migration.description}")
+                migration.upgrade(connection)
+                connection.execute(SchemaMigrationEntity.__table__.insert().values(  # type: ignore
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.datetime.now(datetime.timezone.utc)))
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, DateTime, Integer, String
+
+from src.database.database_access import Base
+
+
+class SchemaMigrationEntity(Base):
+    __tablename__ = 'SchemaMigrations'
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, nullable=False)
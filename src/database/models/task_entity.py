@@ -1,9 +1,10 @@
-from sqlalchemy import (JSON, Boolean, Column, DateTime, ForeignKey, Integer,
-                        String)
+from sqlalchemy import (JSON, Boolean, Column, DateTime, ForeignKey, Index,
+                        Integer, String)
 from sqlalchemy.orm import relationship
 
 from src.database.database_access import Base
 from src.database.models.package_entity import PackageEntity
+from src.misc.task_status import ACTIVE_TASK_STATUSES
 
 
 class TaskEntity(Base):
@@ -27,3 +28,11 @@ class TaskEntity(Base):
     arguments = Column(JSON, nullable=True)
 
     package = relationship(PackageEntity, backref="tasks")
+
+    __table_args__ = (
+        Index("ix_tasks_deployment_id_status", deployment_id, status),
+        Index("ix_tasks_stage_started_at", stage, started_at),
+        # finished tasks make up almost all rows, the pod startup and dashboard lookups only need the active ones
+        Index("ix_tasks_active_ip_address", ip_address, status,
+              postgresql_where=status.in_([task_status.value for task_status in ACTIVE_TASK_STATUSES])),
+    )
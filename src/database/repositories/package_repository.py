@@ -2,16 +2,31 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import and_, update
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models.package_entity import PackageEntity
 
 
+def select_package(package_name: str, stage: str, version: Optional[str] = None) -> Select:
+    query = select(PackageEntity).where(
+        and_(
+            PackageEntity.package_name == package_name,
+            PackageEntity.stage == stage,
+            PackageEntity.deleted.is_(False),
+        )
+    )
+
+    if version:
+        return query.where(PackageEntity.version == version)
+
+    return query.where(PackageEntity.active.is_(True))
+
+
 class PackageRepository:
     @staticmethod
-    def create_package(
-        db_session: Session,
+    async def create_package(
+        db_session: AsyncSession,
         package_name: str,
         version: str,
         python_version: str,
@@ -34,7 +49,7 @@ class PackageRepository:
         db_session.add(metadata)
 
         if set_as_active:
-            db_session.execute(
+            await db_session.execute(
                 update(PackageEntity).where(  # type: ignore
                     and_(
                         PackageEntity.package_name == package_name,
@@ -45,52 +60,39 @@ class PackageRepository:
                 ).values(active=False)
             )
 
-        db_session.commit()
+        await db_session.commit()
         return metadata
 
     @staticmethod
-    def get_package_by_deployment_id(
-        db_session: Session,
+    async def get_package_by_deployment_id(
+        db_session: AsyncSession,
         deployment_id: str
     ) -> Optional[PackageEntity]:
-        return db_session.query(PackageEntity).filter(
+        return (await db_session.scalars(select(PackageEntity).where(
             PackageEntity.deployment_id == deployment_id
-        ).first()
+        ))).first()
 
     @staticmethod
-    def get_package(
-        db_session: Session,
+    async def get_package(
+        db_session: AsyncSession,
         package_name: str,
         stage: str,
         version: Optional[str] = None
     ) -> Optional[PackageEntity]:
-        query = db_session.query(PackageEntity).filter(
-            and_(
-                PackageEntity.package_name == package_name,
-                PackageEntity.stage == stage,
-                PackageEntity.deleted.is_(False),
-            )
-        )
-
-        if version:
-            query = query.filter(PackageEntity.version == version)
-        else:
-            query = query.filter(PackageEntity.active.is_(True))
-
-        return query.first()
+        return (await db_session.scalars(select_package(package_name, stage, version))).first()
 
     @staticmethod
-    def set_active_package(
-        db_session: Session,
+    async def set_active_package(
+        db_session: AsyncSession,
         package_name: str,
         version: str,
         stage: str
     ) -> bool:
-        package = PackageRepository.get_package(db_session, package_name, stage, version)
+        package = await PackageRepository.get_package(db_session, package_name, stage, version)
         if not package:
             return False
 
-        db_session.execute(
+        await db_session.execute(
             update(PackageEntity).where(  # type: ignore
                 and_(
                     PackageEntity.package_name == package_name,
@@ -100,43 +102,43 @@ class PackageRepository:
             ).values(active=False)
         )
         package.active = True  # type: ignore
-        db_session.commit()
+        await db_session.commit()
         return True
 
     @staticmethod
-    def list_packages(
-        db_session: Session,
+    async def list_packages(
+        db_session: AsyncSession,
         package_name: Optional[str] = None,
         stage: Optional[str] = None,
         version: Optional[str] = None
     ) -> List[PackageEntity]:
-        query = db_session.query(PackageEntity).filter(
+        query = select(PackageEntity).where(
             PackageEntity.deleted.is_(False)
         )
 
         if package_name:
-            query = query.filter(PackageEntity.package_name == package_name)
+            query = query.where(PackageEntity.package_name == package_name)
 
         if stage:
-            query = query.filter(PackageEntity.stage == stage)
+            query = query.where(PackageEntity.stage == stage)
 
         if version:
-            query = query.filter(PackageEntity.version == version)
+            query = query.where(PackageEntity.version == version)
 
-        return query.all()
+        return list((await db_session.scalars(query)).all())
 
     @staticmethod
-    def delete_package(
-        db_session: Session,
+    async def delete_package(
+        db_session: AsyncSession,
         package_name: str,
         version: str,
         stage: str
     ) -> bool:
-        package = PackageRepository.get_package(db_session, package_name, stage, version)
+        package = await PackageRepository.get_package(db_session, package_name, stage, version)
         if not package:
             return False
 
-        db_session.execute(
+        await db_session.execute(
             update(PackageEntity).where(  # type: ignore
                 and_(
                     PackageEntity.package_name == package_name,
@@ -146,33 +148,33 @@ class PackageRepository:
             ).values(deleted=True, active=False)
         )
 
-        db_session.commit()
+        await db_session.commit()
         return True
 
     @staticmethod
-    def list_other_package_version(
-        db_session: Session,
+    async def list_other_package_version(
+        db_session: AsyncSession,
         package_name: str,
         stage: str,
         version: str
     ) -> List[PackageEntity]:
-        return db_session.query(PackageEntity).filter(
+        return list((await db_session.scalars(select(PackageEntity).where(
             and_(
                 PackageEntity.package_name == package_name,
                 PackageEntity.stage == stage,
                 PackageEntity.version != version,
                 PackageEntity.deleted.is_(False)
             )
-        ).all()
+        ))).all())
 
     @staticmethod
-    def delete_other_package_versions(
-        db_session: Session,
+    async def delete_other_package_versions(
+        db_session: AsyncSession,
         package_name: str,
         stage: str,
         version: str
     ) -> bool:
-        db_session.execute(
+        await db_session.execute(
             update(PackageEntity).where(  # type: ignore
                 and_(
                     PackageEntity.package_name == package_name,
@@ -182,5 +184,5 @@ class PackageRepository:
                 )
             ).values(deleted=True, active=False)
         )
-        db_session.commit()
+        await db_session.commit()
         return True
@@ -1,18 +1,22 @@
+import base64
 import datetime
 import json
 import os
 import socket
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import psutil
+from sqlalchemy import (DateTime, Row, Select, delete, func, literal, select,
+                        tuple_, update)
 from sqlalchemy.orm import joinedload
 
-from src.database.database_access import get_db_session
+from src.database.database_access import AsyncSessionLocal, get_db_session
+from src.database.models.package_entity import PackageEntity
 from src.database.models.task_entity import TaskEntity
-from src.misc.task_status import TaskStatus
+from src.misc.task_status import FINISHED_TASK_STATUSES, TaskStatus
 from src.models.package_request_argument import PackageRequestArgument
-from src.models.sync_execution_response import SyncExecutionResponse
-from src.models.task_info import TaskInfo
+from src.models.task_info import TaskInfo, TaskPage
+from src.services.task_event_bus import TaskEventBus
 from src.utils.singleton_meta import SingletonMeta
 
 
@@ -42,6 +46,135 @@ def map_task_entity_to_task_info(task: TaskEntity, message: Optional[str]) -> Ta
     )
 
 
+TASK_LIST_COLUMNS = (TaskEntity.task_id, TaskEntity.status, TaskEntity.stage, TaskEntity.pid, TaskEntity.started_at,
+                     TaskEntity.finished_at, TaskEntity.hostname, TaskEntity.ip_address, TaskEntity.is_ui_app,
+                     TaskEntity.ui_port, TaskEntity.original_ui_port, TaskEntity.vscode_port)
+
+
+def map_task_row_to_task_info(row: Any) -> TaskInfo:
+    return TaskInfo(
+        task_id=row.task_id,
+        package_name=row.package_name,
+        package_version=row.version,
+        status=row.status,
+        stage=row.stage,
+        pid=row.pid,
+        started_at=str(row.started_at),
+        finished_at=str(row.finished_at) if row.finished_at else None,
+        message="Result available" if row.result_type not in (None, "null") else None,
+        hostname=row.hostname,
+        ip_address=row.ip_address,
+        is_ui_app=row.is_ui_app,
+        ui_port=row.ui_port,
+        vscode_port=row.vscode_port,
+        original_ui_port=row.original_ui_port
+    )
+
+
+def encode_task_cursor(started_at: datetime.datetime, task_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([started_at.isoformat(), task_id]).encode()).decode()
+
+
+def decode_task_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    try:
+        started_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(started_at), str(task_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid task cursor: {cursor}") from e
+
+
+def select_task(task_id: str) -> Select:
+    return (select(TaskEntity)
+            .options(joinedload(TaskEntity.package))
+            .where(TaskEntity.task_id == task_id))
+
+
+def select_task_page(stage: str,
+                     limit: int,
+                     cursor: Optional[str] = None,
+                     status: Optional[list[TaskStatus]] = None,
+                     package_name: Optional[str] = None,
+                     started_after: Optional[datetime.datetime] = None,
+                     started_before: Optional[datetime.datetime] = None) -> Select:
+    # only the listed columns are loaded, the result and arguments json stays in the database
+    query = (select(*TASK_LIST_COLUMNS,
+                    PackageEntity.package_name,
+                    PackageEntity.version,
+                    func.json_typeof(TaskEntity.result).label("result_type"))
+             .join(PackageEntity, TaskEntity.deployment_id == PackageEntity.deployment_id)
+             .where(TaskEntity.stage == stage))
+
+    if status:
+        query = query.where(TaskEntity.status.in_(status))
+    if package_name:
+        query = query.where(PackageEntity.package_name == package_name)
+    # compared as timestamptz like psycopg2 sends it, asyncpg rejects aware values for the naive column
+    if started_after is not None:
+        query = query.where(TaskEntity.started_at >= literal(started_after, DateTime(timezone=True)))
+    if started_before is not None:
+        query = query.where(TaskEntity.started_at < literal(started_before, DateTime(timezone=True)))
+    if cursor is not None:
+        query = query.where(tuple_(TaskEntity.started_at, TaskEntity.task_id) < decode_task_cursor(cursor))
+
+    return (query.order_by(TaskEntity.started_at.desc(), TaskEntity.task_id.desc())
+            .limit(limit + 1))
+
+
+def to_task_page(rows: Sequence[Any], limit: int) -> TaskPage:
+    next_cursor = encode_task_cursor(rows[limit - 1].started_at, rows[limit - 1].task_id) \
+        if len(rows) > limit else None
+    return TaskPage(tasks=[map_task_row_to_task_info(row) for row in rows[:limit]], next_cursor=next_cursor)
+
+
+def select_tasks_count_by_stage(stage: str, status: list[TaskStatus], package_name: Optional[str] = None) -> Select:
+    # one grouped count for all deployments, deployments without matching tasks are left out
+    query = (select(PackageEntity.deployment_id, func.count())
+             .join(TaskEntity, TaskEntity.deployment_id == PackageEntity.deployment_id)
+             .where(PackageEntity.stage == stage, PackageEntity.deleted.is_(False)))
+
+    if package_name:
+        query = query.where(PackageEntity.package_name == package_name)
+
+    if status:
+        query = query.where(TaskEntity.status.in_(status))
+
+    return query.group_by(PackageEntity.deployment_id)
+
+
+def select_tasks_by_deployment_id(deployment_id: str, status: list[TaskStatus]) -> Select:
+    query = (select(TaskEntity)
+             .options(joinedload(TaskEntity.package))
+             .where(TaskEntity.deployment_id == deployment_id))
+
+    if status:
+        query = query.where(TaskEntity.status.in_(status))
+
+    return query
+
+
+def get_status_values(status: TaskStatus) -> Dict[str, Any]:
+    values: Dict[str, Any] = {"status": status}
+    if status in FINISHED_TASK_STATUSES:
+        values["finished_at"] = datetime.datetime.now(datetime.timezone.utc)
+    return values
+
+
+def kill_process(pid: Optional[int]):
+    if not pid:
+        return
+
+    try:
+        process = psutil.Process(pid)
+        for child in process.children(recursive=True):
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+        process.kill()
+    except psutil.NoSuchProcess:
+        pass
+
+
 class TaskRepository(metaclass=SingletonMeta):
     def __init__(self):
         self.hostname = self._get_hostname()
@@ -59,141 +192,163 @@ class TaskRepository(metaclass=SingletonMeta):
     def get_task(self, task_id: str) -> Optional[TaskEntity]:
         db = self._get_db_session()
         try:
-            return (db.query(TaskEntity)
-                    .options(joinedload(TaskEntity.package))
-                    .filter(TaskEntity.task_id == task_id)
-                    .first())
+            return db.scalars(select_task(task_id)).first()
         finally:
             db.close()
 
-    def add_task(self, task_id: str, deployment_id: str, stage: str, arguments: list[PackageRequestArgument]) -> None:
+    async def get_task_async(self, task_id: str) -> Optional[TaskEntity]:
+        async with AsyncSessionLocal() as db:
+            return (await db.scalars(select_task(task_id))).first()
+
+    def _create_task_entity(self, task_id: str, deployment_id: str, stage: str,
+                            arguments: list[PackageRequestArgument], status: TaskStatus) -> TaskEntity:
+        return TaskEntity(
+            task_id=task_id,
+            deployment_id=deployment_id,
+            status=status,
+            stage=stage,
+            # the database clock, asyncpg refuses aware datetimes for the naive column
+            started_at=func.now(),
+            result=None,
+            pid=None,
+            arguments=[arg.model_dump() for arg in arguments],
+            hostname=self.hostname,
+            ip_address=self.ip_address
+        )
+
+    def add_task(self, task_id: str, deployment_id: str, stage: str, arguments: list[PackageRequestArgument],
+                 status: TaskStatus = TaskStatus.INITIALIZING) -> None:
         db = self._get_db_session()
         try:
-            task = TaskEntity(
-                task_id=task_id,
-                deployment_id=deployment_id,
-                status=TaskStatus.INITIALIZING,
-                stage=stage,
-                started_at=datetime.datetime.now(datetime.timezone.utc),
-                result=None,
-                pid=None,
-                arguments=[arg.model_dump() for arg in arguments],
-                hostname=self.hostname,
-                ip_address=self.ip_address
-            )
-            db.add(task)
+            db.add(self._create_task_entity(task_id, deployment_id, stage, arguments, status))
+            TaskEventBus.publish(db, task_id, status)
             db.commit()
         finally:
             db.close()
 
-    def update_task_pid(self, task_id: str, pid: Optional[int]) -> None:
+    async def add_task_async(self, task_id: str, deployment_id: str, stage: str,
+                             arguments: list[PackageRequestArgument],
+                             status: TaskStatus = TaskStatus.INITIALIZING) -> None:
+        async with AsyncSessionLocal() as db:
+            db.add(self._create_task_entity(task_id, deployment_id, stage, arguments, status))
+            await TaskEventBus.publish_async(db, task_id, status)
+            await db.commit()
+
+    def _update_tasks(self, criteria: list, values: dict, publish: bool = True) -> List[Row]:
         db = self._get_db_session()
         try:
-            task = (db.query(TaskEntity)
-                    .filter(TaskEntity.task_id == task_id)
-                    .first())
-            if task is not None:
-                task.pid = pid  # type: ignore
-                db.commit()
+            # a single UPDATE ... RETURNING, the notification is sent from the same statement
+            updated = (update(TaskEntity)
+                       .where(*criteria)
+                       .values(**values)
+                       .returning(TaskEntity.task_id, TaskEntity.status, TaskEntity.pid)
+                       .cte("updated"))
+            columns = [updated.c.task_id, updated.c.status, updated.c.pid]
+            if publish:
+                columns.append(TaskEventBus.notification(updated.c.task_id, updated.c.status))
+
+            rows = db.execute(select(*columns)).all()
+            db.commit()
+            return list(rows)
         finally:
             db.close()
 
-    def update_task_status(self, task_id: str, status: TaskStatus, result: Optional[dict] = None) -> None:
-        db = self._get_db_session()
-        try:
-            task = (db.query(TaskEntity)
-                    .options(joinedload(TaskEntity.package))
-                    .filter(TaskEntity.task_id == task_id)
-                    .first())
-            if task:
-                task.status = status  # type: ignore
-                if result is not None:
-                    task.result = result  # type: ignore
+    def update_task_pid(self, task_id: str, pid: Optional[int]) -> None:
+        self._update_tasks([TaskEntity.task_id == task_id], {"pid": pid}, publish=False)
 
-                if status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED, TaskStatus.TIMEOUT]:
-                    task.finished_at = datetime.datetime.now(datetime.timezone.utc),  # type: ignore
+    def update_task_status(self, task_id: str, status: TaskStatus, result: Optional[dict] = None,
+                           expected_status: Optional[list[TaskStatus]] = None) -> bool:
+        criteria = [TaskEntity.task_id == task_id]
+        if expected_status:
+            criteria.append(TaskEntity.status.in_(expected_status))
 
-                db.commit()
-        finally:
-            db.close()
+        values = get_status_values(status)
+        if result is not None:
+            values["result"] = result
+
+        return len(self._update_tasks(criteria, values)) > 0
 
     def update_task_ui_info(self,
                             task_id: str,
                             is_ui_app: bool,
                             ui_ip_address: Optional[str] = None,
                             ui_port: Optional[int] = None) -> None:
+        values: Dict[str, Any] = {
+            "is_ui_app": is_ui_app,
+            "original_ui_port": func.coalesce(TaskEntity.original_ui_port, ui_port)
+        }
+        if ui_ip_address is not None:
+            values["ui_ip_address"] = ui_ip_address
+
+        if ui_port is not None:
+            values["ui_port"] = ui_port
+
+        self._update_tasks([TaskEntity.task_id == task_id], values)
+
+    def kill_and_update_task(self, task_id: str, task_status: TaskStatus,
+                             expected_status: Optional[list[TaskStatus]] = None) -> bool:
+        return len(self.kill_and_update_tasks([task_id], task_status, expected_status)) > 0
+
+    def kill_and_update_tasks(self, task_ids: List[str], task_status: TaskStatus,
+                              expected_status: Optional[list[TaskStatus]] = None) -> List[str]:
+        if not task_ids:
+            return []
+
+        criteria = [TaskEntity.task_id.in_(task_ids)]
+        if expected_status:
+            criteria.append(TaskEntity.status.in_(expected_status))
+
+        # the result of a killed task, built per row so all tasks change in one statement
+        values = get_status_values(task_status)
+        values["result"] = func.json_build_object(
+            literal("success"), literal(task_status == TaskStatus.COMPLETED),
+            literal("output"), literal(""),
+            literal("task_id"), TaskEntity.task_id,
+            literal("error"), literal("Task cancelled by user" if task_status == TaskStatus.CANCELLED else ""))
+
+        rows = self._update_tasks(criteria, values)
+        for row in rows:
+            kill_process(row.pid)
+
+        return [row.task_id for row in rows]
+
+    def list_tasks(self,
+                   stage: str,
+                   limit: int,
+                   cursor: Optional[str] = None,
+                   status: Optional[list[TaskStatus]] = None,
+                   package_name: Optional[str] = None,
+                   started_after: Optional[datetime.datetime] = None,
+                   started_before: Optional[datetime.datetime] = None) -> TaskPage:
         db = self._get_db_session()
         try:
-            task = (db.query(TaskEntity)
-                    .filter(TaskEntity.task_id == task_id)
-                    .first())
-            if task:
-                task.is_ui_app = is_ui_app  # type: ignore
-                if ui_ip_address is not None:
-                    task.ui_ip_address = ui_ip_address  # type: ignore
-
-                if ui_port is not None:
-                    task.ui_port = ui_port  # type: ignore
-
-                if task.original_ui_port is None:
-                    task.original_ui_port = ui_port  # type: ignore
-
-                db.commit()
+            query = select_task_page(stage, limit, cursor, status, package_name, started_after, started_before)
+            return to_task_page(db.execute(query).all(), limit)
         finally:
             db.close()
 
-    def kill_and_update_task(self, task_id: str, task_status: TaskStatus) -> TaskInfo:
-        task = self.get_task(task_id)
-        if not task:
-            raise ValueError(f"Task {task_id} not found")
-
-        pid = task.pid
-
-        error = ""
-        if task.status == TaskStatus.CANCELLED:
-            error = "Task cancelled by user"
-        success = True if task_status == TaskStatus.COMPLETED else False
-
-        self.update_task_status(
-            task_id,
-            task_status,
-            SyncExecutionResponse(
-                success=success,
-                task_id=task_id,
-                output="",
-                error=error
-            ).__dict__
-        )
-
-        if pid:
-            try:
-                process = psutil.Process(pid)
-                for child in process.children(recursive=True):
-                    try:
-                        child.kill()
-                    except psutil.NoSuchProcess:
-                        pass
-                process.kill()
-            except psutil.NoSuchProcess:
-                pass
-
-        response_message = ""
-        if task_status == TaskStatus.CANCELLED:
-            response_message = "Task cancelled successfully"
+    async def list_tasks_async(self,
+                               stage: str,
+                               limit: int,
+                               cursor: Optional[str] = None,
+                               status: Optional[list[TaskStatus]] = None,
+                               package_name: Optional[str] = None,
+                               started_after: Optional[datetime.datetime] = None,
+                               started_before: Optional[datetime.datetime] = None) -> TaskPage:
+        query = select_task_page(stage, limit, cursor, status, package_name, started_after, started_before)
+        async with AsyncSessionLocal() as db:
+            return to_task_page((await db.execute(query)).all(), limit)
 
-        return map_task_entity_to_task_info(
-            task,
-            response_message
-        )
-
-    def list_tasks(self, stage: str) -> List[TaskInfo]:
+    def get_running_tasks_of_pod(self) -> List[TaskInfo]:
         db = self._get_db_session()
         try:
             tasks = (db.query(TaskEntity)
                      .options(joinedload(TaskEntity.package))
-                     .filter(TaskEntity.stage == stage)
-                     .all())
-
+                     .filter(
+                         TaskEntity.ip_address == self.ip_address,
+                         TaskEntity.status.in_([TaskStatus.RUNNING, TaskStatus.INITIALIZING])
+            )
+                .all())
             return [
                 map_task_entity_to_task_info(
                     task,
@@ -204,7 +359,7 @@ class TaskRepository(metaclass=SingletonMeta):
         finally:
             db.close()
 
-    def get_running_tasks_of_pod(self) -> List[TaskInfo]:
+    def get_running_tasks(self) -> List[TaskInfo]:
         db = self._get_db_session()
         try:
             tasks = (db.query(TaskEntity)
@@ -224,14 +379,14 @@ class TaskRepository(metaclass=SingletonMeta):
         finally:
             db.close()
 
-    def get_running_tasks(self) -> List[TaskInfo]:
+    def get_queued_tasks(self) -> List[TaskInfo]:
         db = self._get_db_session()
         try:
             tasks = (db.query(TaskEntity)
                      .options(joinedload(TaskEntity.package))
                      .filter(
                          TaskEntity.ip_address == self.ip_address,
-                         TaskEntity.status.in_([TaskStatus.RUNNING, TaskStatus.INITIALIZING])
+                         TaskEntity.status == TaskStatus.QUEUED
             )
                 .all())
             return [
@@ -252,44 +407,55 @@ class TaskRepository(metaclass=SingletonMeta):
                     .first())
             if task:
                 db.delete(task)
+                TaskEventBus.publish(db, task_id)
                 db.commit()
         finally:
             db.close()
 
+    async def delete_task_async(self, task_id: str) -> None:
+        async with AsyncSessionLocal() as db:
+            deleted = await db.execute(delete(TaskEntity).where(TaskEntity.task_id == task_id))
+            if deleted.rowcount:  # type: ignore
+                await TaskEventBus.publish_async(db, task_id)
+                await db.commit()
+
     def get_tasks_count_by_deployment_id(self, deployment_id: str, status: list[TaskStatus]) -> int:
         db = self._get_db_session()
         try:
-            query = db.query(TaskEntity).filter(TaskEntity.deployment_id == deployment_id)
+            # counting without loading columns lets postgres answer from the deployment/status index alone
+            query = db.query(func.count()).select_from(TaskEntity).filter(TaskEntity.deployment_id == deployment_id)
 
             if status:
                 query = query.filter(TaskEntity.status.in_(status))
 
-            return query.count()
+            return query.scalar() or 0
         finally:
             db.close()
 
-    def get_tasks_by_deployment_id(self, deployment_id: str, status: list[TaskStatus]) -> list[TaskEntity]:
+    def get_tasks_count_by_stage(self, stage: str, status: list[TaskStatus],
+                                 package_name: Optional[str] = None) -> Dict[str, int]:
         db = self._get_db_session()
         try:
-            query = (db.query(TaskEntity)
-                     .options(joinedload(TaskEntity.package))
-                     .filter(TaskEntity.deployment_id == deployment_id))
-
-            if status:
-                query = query.filter(TaskEntity.status.in_(status))
-
-            return query.all()
+            return dict(db.execute(select_tasks_count_by_stage(stage, status, package_name)).tuples().all())
         finally:
             db.close()
 
-    def update_vscode_port(self, task_id: str, vscode_port: int) -> None:
+    async def get_tasks_count_by_stage_async(self, stage: str, status: list[TaskStatus],
+                                             package_name: Optional[str] = None) -> Dict[str, int]:
+        async with AsyncSessionLocal() as db:
+            return dict((await db.execute(select_tasks_count_by_stage(stage, status, package_name))).tuples().all())
+
+    def get_tasks_by_deployment_id(self, deployment_id: str, status: list[TaskStatus]) -> list[TaskEntity]:
         db = self._get_db_session()
         try:
-            task = (db.query(TaskEntity)
-                    .filter(TaskEntity.task_id == task_id)
-                    .first())
-            if task:
-                task.vscode_port = vscode_port  # type: ignore
-                db.commit()
+            return list(db.scalars(select_tasks_by_deployment_id(deployment_id, status)).all())
         finally:
             db.close()
+
+    async def get_tasks_by_deployment_id_async(self, deployment_id: str,
+                                               status: list[TaskStatus]) -> list[TaskEntity]:
+        async with AsyncSessionLocal() as db:
+            return list((await db.scalars(select_tasks_by_deployment_id(deployment_id, status))).all())
+
+    def update_vscode_port(self, task_id: str, vscode_port: int) -> None:
+        self._update_tasks([TaskEntity.task_id == task_id], {"vscode_port": vscode_port})
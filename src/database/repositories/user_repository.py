@@ -1,8 +1,8 @@
 import uuid
 from typing import List, Optional
 
-from sqlalchemy import update
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.authentication.roles_type import RoleType
 from src.database.models.user_entity import UserEntity
@@ -11,8 +11,8 @@ from src.utils.hasher import verify_password
 
 class UserRepository:
     @staticmethod
-    def create_user(
-        db_session: Session,
+    async def create_user(
+        db_session: AsyncSession,
         name: str,
         hashed_password: str,
         role: RoleType,
@@ -27,83 +27,76 @@ class UserRepository:
             is_ldap=is_ldap
         )
         db_session.add(user)
-        db_session.commit()
+        await db_session.commit()
         return user
 
     @staticmethod
-    def get_user_by_id(
-        db_session: Session,
+    async def get_user_by_id(
+        db_session: AsyncSession,
         user_id: str
     ) -> Optional[UserEntity]:
-        return db_session.query(UserEntity).filter(
+        return (await db_session.scalars(select(UserEntity).where(
             UserEntity.id == user_id
-        ).first()
+        ))).first()
 
     @staticmethod
-    def get_user_by_name(
-        db_session: Session,
+    async def get_user_by_name(
+        db_session: AsyncSession,
         name: str
     ) -> Optional[UserEntity]:
-        return db_session.query(UserEntity).filter(
+        return (await db_session.scalars(select(UserEntity).where(
             UserEntity.name == name
-        ).first()
+        ))).first()
 
     @staticmethod
-    def list_users(
-        db_session: Session,
+    async def list_users(
+        db_session: AsyncSession,
     ) -> List[UserEntity]:
-        return db_session.query(UserEntity).all()
+        return list((await db_session.scalars(select(UserEntity))).all())
 
     @staticmethod
-    def update_user(
-        db_session: Session,
+    async def update_user(
+        db_session: AsyncSession,
         user_id: str,
         name: Optional[str] = None,
         hashed_password: Optional[str] = None,
         role: Optional[str] = None,
         is_ldap: Optional[bool] = None
     ) -> Optional[UserEntity]:
-        update_values = {}
-        if name is not None:
-            update_values['name'] = name
-        if hashed_password is not None:
-            update_values['hashed_password'] = hashed_password
-        if role is not None:
-            update_values['role'] = role
-        if is_ldap is not None:
-            update_values['is_ldap'] = is_ldap
+        user = await UserRepository.get_user_by_id(db_session, user_id)
+        if user:
+            if name is not None:
+                user.name = name  # type: ignore
+            if hashed_password is not None:
+                user.hashed_password = hashed_password  # type: ignore
+            if role is not None:
+                user.role = role  # type: ignore
+            if is_ldap is not None:
+                user.is_ldap = is_ldap  # type: ignore
 
-        if update_values:
-            db_session.execute(
-                update(UserEntity)  # type: ignore
-                .where(UserEntity.id == user_id)
-                .values(**update_values)
-            )
-            db_session.commit()
+            await db_session.commit()
 
-        return UserRepository.get_user(db_session, user_id)
+        return user
 
     @staticmethod
-    def delete_user(
-        db_session: Session,
+    async def delete_user(
+        db_session: AsyncSession,
         user_id: str
     ) -> bool:
-        user = UserRepository.get_user(db_session, user_id)
+        user = await UserRepository.get_user_by_id(db_session, user_id)
         if user:
-            db_session.delete(user)
-            db_session.commit()
+            await db_session.delete(user)
+            await db_session.commit()
             return True
         return False
 
     @staticmethod
-    def login_user(
-        db_session: Session,
+    async def login_user(
+        db_session: AsyncSession,
         name: str,
         password: str
     ) -> Optional[UserEntity]:
-        user = db_session.query(UserEntity).filter(
-            UserEntity.name == name
-        ).first()
+        user = await UserRepository.get_user_by_name(db_session, name)
 
         if user and verify_password(password, user.hashed_password):
             return user
@@ -111,11 +104,8 @@ class UserRepository:
         return None
 
     @staticmethod
-    def get_user(
-        db_session: Session,
+    async def get_user(
+        db_session: AsyncSession,
         name: str
     ) -> Optional[UserEntity]:
-        user = db_session.query(UserEntity).filter(
-            UserEntity.name == name
-        ).first()
-        return user
+        return await UserRepository.get_user_by_name(db_session, name)
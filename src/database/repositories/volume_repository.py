@@ -1,7 +1,7 @@
 from typing import List, Optional
 
-from sqlalchemy import update
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.database_access import get_db_session
 from src.database.models.volume_entity import VolumeEntity
@@ -11,8 +11,8 @@ from src.models.yaml_config import Volume
 
 class VolumeRepository:
     @staticmethod
-    def create_volume(
-        db_session: Session,
+    async def create_volume(
+        db_session: AsyncSession,
         volume_id: str,
         name: str,
         pvc_name: str,
@@ -23,17 +23,15 @@ class VolumeRepository:
             pvc_name=pvc_name
         )
         db_session.add(volume)
-        db_session.commit()
+        await db_session.commit()
         return volume
 
     @staticmethod
-    def get_volume(
-        db_session: Session,
+    async def get_volume(
+        db_session: AsyncSession,
         volume_id: str
     ) -> Optional[VolumeEntity]:
-        return db_session.query(VolumeEntity).filter(
-            VolumeEntity.id == volume_id
-        ).first()
+        return await db_session.get(VolumeEntity, volume_id)
 
     @staticmethod
     def get_volume_maps(
@@ -66,75 +64,52 @@ class VolumeRepository:
             db_session.close()
 
     @staticmethod
-    def get_non_existing_volumes(
+    async def get_non_existing_volumes(
+        db_session: AsyncSession,
         volumes: List[Volume]
     ) -> list[str]:
-        result = []
-        db_session = next(get_db_session())
-        try:
-            if len(volumes) == 0:
-                return []
+        if len(volumes) == 0:
+            return []
 
-            all_volumes = db_session.query(VolumeEntity).filter(
-                VolumeEntity.name.in_([v.name for v in volumes])
-            ).all()
+        existing_names = set((await db_session.scalars(select(VolumeEntity.name).where(
+            VolumeEntity.name.in_([v.name for v in volumes])
+        ))).all())
 
-            for volume in volumes:
-                volume_entity = next((v for v in all_volumes if v.name == volume.name), None)
-                if not volume_entity:
-                    result.append(volume.name)
-
-            return result
-        finally:
-            db_session.close()
+        return [volume.name for volume in volumes if volume.name not in existing_names]
 
     @staticmethod
-    def list_volumes(
-        db_session: Session,
+    async def list_volumes(
+        db_session: AsyncSession,
     ) -> List[VolumeEntity]:
-        return db_session.query(VolumeEntity).all()
+        return list((await db_session.scalars(select(VolumeEntity))).all())
 
     @staticmethod
-    def update_volume(
-        db_session: Session,
+    async def update_volume(
+        db_session: AsyncSession,
         volume_id: str,
         name: Optional[str] = None,
         pvc_name: Optional[str] = None
     ) -> Optional[VolumeEntity]:
-        volume = db_session.query(VolumeEntity).filter(
-            VolumeEntity.id == volume_id
-        ).first()
+        volume = await VolumeRepository.get_volume(db_session, volume_id)
 
         if volume:
-            update_dict = {}
             if name is not None:
-                update_dict["name"] = name
+                volume.name = name  # type: ignore
             if pvc_name is not None:
-                update_dict["pvc_name"] = pvc_name
-
-            if update_dict:
-                db_session.execute(
-                    update(VolumeEntity)  # type: ignore
-                    .where(VolumeEntity.id == volume_id)
-                    .values(**update_dict)
-                )
-                db_session.commit()
-                volume = db_session.query(VolumeEntity).filter(
-                    VolumeEntity.id == volume_id
-                ).first()
+                volume.pvc_name = pvc_name  # type: ignore
+
+            await db_session.commit()
 
         return volume
 
     @staticmethod
-    def delete_volume(
-        db_session: Session,
+    async def delete_volume(
+        db_session: AsyncSession,
         volume_id: str
     ) -> bool:
-        volume = db_session.query(VolumeEntity).filter(
-            VolumeEntity.id == volume_id
-        ).first()
+        volume = await VolumeRepository.get_volume(db_session, volume_id)
         if volume:
-            db_session.delete(volume)
-            db_session.commit()
+            await db_session.delete(volume)
+            await db_session.commit()
             return True
         return False
@@ -1,12 +1,12 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.authentication.roles_type import RoleType
 from src.database.repositories.user_repository import UserRepository
 from src.utils.hasher import get_password_hash
 
 
-def seed_default_users(db: Session):
-    users = UserRepository.list_users(db)
+async def seed_default_users(db: AsyncSession):
+    users = await UserRepository.list_users(db)
     if len(users) > 0:
         print("Users already exist in the database, skipping seeding.")
         return
@@ -19,10 +19,10 @@ def seed_default_users(db: Session):
         ]
 
         for user in default_users:
-            existing_user = UserRepository.get_user_by_name(db, user["name"])
+            existing_user = await UserRepository.get_user_by_name(db, user["name"])
             if not existing_user:
                 hashed_password = get_password_hash(user["password"])
-                UserRepository.create_user(
+                await UserRepository.create_user(
                     db,
                     name=user["name"],
                     hashed_password=hashed_password,
@@ -36,4 +36,4 @@ def seed_default_users(db: Session):
     except Exception as e:
         print(f"Error seeding users: {str(e)}")
     finally:
-        db.close()
+        await db.close()
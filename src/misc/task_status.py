@@ -2,9 +2,14 @@ from enum import Enum
 
 
 class TaskStatus(str, Enum):
+    QUEUED = "queued"
     INITIALIZING = "initializing"
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
     TIMEOUT = "timeout"
+
+
+ACTIVE_TASK_STATUSES = [TaskStatus.QUEUED, TaskStatus.INITIALIZING, TaskStatus.RUNNING]
+FINISHED_TASK_STATUSES = [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED, TaskStatus.TIMEOUT]
@@ -12,3 +12,4 @@ class ExecutionRequest(BaseModel):
     stage: str = Field(..., pattern=constants.stage_regex_pattern)
     arguments: List[PackageRequestArgument] = []
     wait_for_completion: bool = True
+    priority: int = 0
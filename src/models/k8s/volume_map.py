@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -6,3 +7,5 @@ class VolumeMap:
     name: str
     path: str
     pvc_name: str
+    sub_path: Optional[str] = None
+    read_only: bool = False
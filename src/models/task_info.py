@@ -25,3 +25,8 @@ class TaskInfo(BaseModel):
     vscode_port: Optional[int] = None
     metrics: Optional[PodMetrics] = None
     arguments: list[PackageRequestArgument] = []
+
+
+class TaskPage(BaseModel):
+    tasks: list[TaskInfo]
+    next_cursor: Optional[str] = None
@@ -24,6 +24,13 @@ class Volume:
     path: str
 
 
+@dataclass
+class PortDetection:
+    port: Optional[int] = None
+    pattern: Optional[str] = None
+    readiness_path: Optional[str] = None
+
+
 @dataclass
 class PackageConfig:
     package_name: str
@@ -33,10 +40,12 @@ class PackageConfig:
     runtime: Optional[RuntimeType] = RuntimeType.PYTHON
     image: Optional[str] = None
     timeout: Optional[int] = None
+    max_concurrency: Optional[int] = None
     description: Optional[str] = None
     args: List[Argument] = field(default_factory=list)
     environment: List[Environment] = field(default_factory=list)
     volumes: List[Volume] = field(default_factory=list)
+    port_detection: PortDetection = field(default_factory=PortDetection)
 
 
 def parse_config(yaml_content: str) -> PackageConfig:
@@ -45,12 +54,14 @@ def parse_config(yaml_content: str) -> PackageConfig:
     args = [Argument(**arg) for arg in data.get('args', [])]
     env = [Environment(**env) for env in data.get('environment', [])]
     volumes = [Volume(**volume) for volume in data.get('volumes', [])]
+    port_detection = PortDetection(**(data.get('port_detection') or {}))
     package_name = data.get('package_name', '')
     entrypoint = data.get('entrypoint', '')
     version = data.get('version', '')
     python_version = data.get('python_version', '')
     description = data.get('description')
     timeout = data.get('timeout')
+    max_concurrency = data.get('max_concurrency')
     image = data.get('image', None)
     runtime = data.get('runtime', RuntimeType.PYTHON)
 
@@ -61,9 +72,11 @@ def parse_config(yaml_content: str) -> PackageConfig:
         python_version=python_version,
         description=description,
         timeout=timeout,
+        max_concurrency=max_concurrency,
         args=args,
         environment=env,
         volumes=volumes,
+        port_detection=port_detection,
         image=image,
         runtime=RuntimeType(runtime)
     )
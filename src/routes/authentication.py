@@ -4,12 +4,12 @@ from typing import Union
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.authentication import active_directory
 from src.authentication import schemas_authentication as schemas
 from src.authentication.roles_type import RoleType
-from src.database.database_access import get_db_session
+from src.database.database_access import get_async_db_session
 from src.database.repositories.user_repository import UserRepository
 from src.utils import config
 from src.utils.hasher import get_password_hash, verify_password
@@ -137,9 +137,9 @@ async def is_authentication_enabled():
 
 @router.post("/register", response_model=schemas.Token)
 async def register_user(
-        db: Session = Depends(get_db_session),
+        db: AsyncSession = Depends(get_async_db_session),
         form_data: OAuth2PasswordRequestForm = Depends()):
-    user = UserRepository.get_user_by_name(db, form_data.username)
+    user = await UserRepository.get_user_by_name(db, form_data.username)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -147,7 +147,7 @@ async def register_user(
         )
 
     hashed_password = get_password_hash(form_data.password)
-    user = UserRepository.create_user(db, form_data.username, hashed_password, RoleType.UNAOTHORIZED)
+    user = await UserRepository.create_user(db, form_data.username, hashed_password, RoleType.UNAOTHORIZED)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -159,12 +159,12 @@ async def register_user(
 
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
-        db: Session = Depends(get_db_session),
+        db: AsyncSession = Depends(get_async_db_session),
         form_data: OAuth2PasswordRequestForm = Depends()):
     if not config.ENABLE_AUTH:
         return await generate_token_async(form_data.username, RoleType.ADMIN)
 
-    user = UserRepository.login_user(db, form_data.username, form_data.password)
+    user = await UserRepository.login_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -178,7 +178,7 @@ async def login_for_access_token(
 
 @router.post("/token/ldap", response_model=schemas.Token)
 async def login_for_access_token_via_ldap(
-        db: Session = Depends(get_db_session),
+        db: AsyncSession = Depends(get_async_db_session),
         form_data: OAuth2PasswordRequestForm = Depends()):
     if not config.ENABLE_AUTH:
         return await generate_token_async(form_data.username, RoleType.ADMIN)
@@ -191,9 +191,9 @@ async def login_for_access_token_via_ldap(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = UserRepository.get_user(db, form_data.username)
+    user = await UserRepository.get_user(db, form_data.username)
     if not user:
-        user = UserRepository.create_user(db, form_data.username, "", RoleType.UNAOTHORIZED, True)
+        user = await UserRepository.create_user(db, form_data.username, "", RoleType.UNAOTHORIZED, True)
 
     role = RoleType(user.role) if user.role else RoleType.UNAOTHORIZED
     return await generate_token_async(form_data.username, role)
@@ -10,64 +10,72 @@ from src.models.async_execution_response import AsyncExecutionResponse
 from src.models.execution_request import ExecutionRequest
 from src.models.package_request_argument import PackageRequestArgument
 from src.models.sync_execution_response import SyncExecutionResponse
+from src.services.task_event_bus import TaskEventBus
 from src.services.task_manager_service import TaskManagerService
 from src.utils import config
 from src.utils.singleton_meta import get_service
 
 router = APIRouter(prefix="/execute", tags=["execute"])
 
+TASK_EVENT_RECHECK_INTERVAL = 5.0
+
 
 async def execute_package(package_name: str, version: Optional[str], stage: str, arguments: list,
                           wait_for_completion: bool,
                           redirect_to_ui: bool,
                           task_manager: TaskRepository,
                           k8s_manager_service: TaskManagerService,
-                          empty_instance: bool
+                          empty_instance: bool,
+                          priority: int = 0
                           ) -> Union[SyncExecutionResponse, AsyncExecutionResponse, RedirectResponse]:
-    task_id = await k8s_manager_service.execute_package_async(package_name, stage, version, arguments, empty_instance)
+    task_id = await k8s_manager_service.execute_package_async(package_name, stage, version, arguments, empty_instance,
+                                                              priority)
 
     if wait_for_completion:
-        while True:
-            task = task_manager.get_task(task_id)
-            if not task:
-                raise HTTPException(status_code=404, detail="Task not found")
-
-            task_is_not_running = task.status != TaskStatus.RUNNING and task.status != TaskStatus.INITIALIZING
-            if task_is_not_running:
-                if task.status == TaskStatus.FAILED:
-                    raise HTTPException(status_code=400, detail=task.result['error'])  # type: ignore
-
-                return SyncExecutionResponse(
-                    success=True,
-                    output=task.result['output'],  # type: ignore
-                    error='',
-                    task_id=task_id
-                )
-            await asyncio.sleep(0.1)
+        with TaskEventBus().subscribe(task_id) as task_events:
+            while True:
+                task = await task_manager.get_task_async(task_id)
+                if not task:
+                    raise HTTPException(status_code=404, detail="Task not found")
+
+                task_is_not_running = task.status not in [TaskStatus.QUEUED, TaskStatus.RUNNING,
+                                                          TaskStatus.INITIALIZING]
+                if task_is_not_running:
+                    if task.status == TaskStatus.FAILED:
+                        raise HTTPException(status_code=400, detail=task.result['error'])  # type: ignore
+
+                    return SyncExecutionResponse(
+                        success=True,
+                        output=task.result['output'],  # type: ignore
+                        error='',
+                        task_id=task_id
+                    )
+                await task_events.wait(TASK_EVENT_RECHECK_INTERVAL)
     elif redirect_to_ui:
         start_time = asyncio.get_running_loop().time()
-        while True:
-            task = task_manager.get_task(task_id)
-            if not task:
-                raise HTTPException(status_code=404, detail="Task not found")
-
-            task_is_running = task.status == TaskStatus.RUNNING and task.is_ui_app and task.ui_port
-            if task_is_running:
-                await asyncio.sleep(1)
-                return RedirectResponse(
-                    f"{config.OPENAPI_PREFIX_PATH}/proxy/{task_id}",
-                    status_code=303
-                )
-
-            current_time = asyncio.get_running_loop().time()
-            if current_time - start_time > 30:
-                return AsyncExecutionResponse(
-                    task_id=task_id,
-                    message=f"Package {package_name} execution started, but UI not ready after 30 seconds",
-                    status="running"
-                )
-
-            await asyncio.sleep(0.1)
+        with TaskEventBus().subscribe(task_id) as task_events:
+            while True:
+                task = await task_manager.get_task_async(task_id)
+                if not task:
+                    raise HTTPException(status_code=404, detail="Task not found")
+
+                task_is_running = task.status == TaskStatus.RUNNING and task.is_ui_app and task.ui_port
+                if task_is_running:
+                    await asyncio.sleep(1)
+                    return RedirectResponse(
+                        f"{config.OPENAPI_PREFIX_PATH}/proxy/{task_id}",
+                        status_code=303
+                    )
+
+                remaining_time = 30 - (asyncio.get_running_loop().time() - start_time)
+                if remaining_time <= 0:
+                    return AsyncExecutionResponse(
+                        task_id=task_id,
+                        message=f"Package {package_name} execution started, but UI not ready after 30 seconds",
+                        status="running"
+                    )
+
+                await task_events.wait(min(remaining_time, TASK_EVENT_RECHECK_INTERVAL))
     else:
         return AsyncExecutionResponse(
             task_id=task_id,
@@ -143,7 +151,8 @@ async def execute_package_post(
         redirect_to_ui=False,
         task_manager=task_manager,
         k8s_manager_service=k8s_manager_service,
-        empty_instance=False
+        empty_instance=False,
+        priority=request.priority
     )
 
 
@@ -161,5 +170,6 @@ async def execute_empty_instance(
         redirect_to_ui=False,
         task_manager=task_manager,
         k8s_manager_service=k8s_manager_service,
-        empty_instance=True
+        empty_instance=True,
+        priority=request.priority
     )
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import shutil
 from datetime import datetime
@@ -8,9 +9,9 @@ import semver
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from fastapi.responses import JSONResponse
 from pipe import groupby
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.database_access import get_db_session
+from src.database.database_access import get_async_db_session
 from src.database.models.package_entity import PackageEntity
 from src.database.repositories.package_repository import PackageRepository
 from src.database.repositories.task_repository import (
@@ -24,7 +25,9 @@ from src.models.package_info import PackageDetail, PackageInfo, PackageInstance
 from src.models.task_info import TaskInfo
 from src.models.yaml_config import Environment, parse_config
 from src.routes import authentication
+from src.services.image_build_service import ImageBuildService
 from src.services.task_manager_service import TaskManagerService
+from src.services.venv_cache_service import VenvCacheService
 from src.utils.path_manager import PathManager
 from src.utils.singleton_meta import get_service
 
@@ -38,7 +41,7 @@ async def deploy_package(
     stage=Form(..., regex=constants.stage_regex_pattern),
     set_as_default: bool = Form(False),
     delete_previous_versions: bool = Form(False),
-    db_session: Session = Depends(get_db_session),
+    db_session: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_operator_or_admin)
 ):
     config_yaml_bytes = await config_yaml.read()
@@ -52,7 +55,7 @@ async def deploy_package(
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid Python version format. Use semver (e.g., 3.8.10)")
 
-    existing_package = PackageRepository.get_package(
+    existing_package = await PackageRepository.get_package(
         db_session, package_config.package_name, stage, package_config.version)
     if existing_package:
         raise HTTPException(
@@ -63,8 +66,8 @@ async def deploy_package(
             )
         )
 
-    non_existing_volumes = VolumeRepository.get_non_existing_volumes(
-        package_config.volumes)
+    non_existing_volumes = await VolumeRepository.get_non_existing_volumes(
+        db_session, package_config.volumes)
     non_existing_volumes_count = len(non_existing_volumes)
     if non_existing_volumes_count > 0:
         raise HTTPException(
@@ -87,14 +90,14 @@ async def deploy_package(
         patoolib.extract_archive(file_path, outdir=str(package_dir))
 
     set_active = set_as_default or delete_previous_versions
-    metadata = PackageRepository.create_package(
+    metadata = await PackageRepository.create_package(
         db_session, package_config.package_name, package_config.version,
         package_config.python_version, stage,
         config_yaml_content, package_config.description, set_active
     )
 
     if delete_previous_versions:
-        other_versions = PackageRepository.list_other_package_version(
+        other_versions = await PackageRepository.list_other_package_version(
             db_session, package_config.package_name, stage, package_config.version)
         for other_version in other_versions:
             package_dir = PathManager.get_package_path(
@@ -106,9 +109,14 @@ async def deploy_package(
             if os.path.exists(venv_dir):
                 shutil.rmtree(venv_dir, ignore_errors=True)
 
-        PackageRepository.delete_other_package_versions(
+            VenvCacheService().remove_references(other_version.package_name, other_version.version,
+                                                 other_version.stage)
+
+        await PackageRepository.delete_other_package_versions(
             db_session, package_config.package_name, stage, package_config.version)
 
+    ImageBuildService().build_async(metadata.package_name, metadata.version, metadata.stage)  # type: ignore
+
     response_data = {
         "package_name": metadata.package_name,
         "python_version": metadata.python_version,
@@ -134,10 +142,10 @@ async def set_active_package(
     package_name: str = Form(...),
     version: str = Form(...),
     stage: str = Form(..., regex=constants.stage_regex_pattern),
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_operator_or_admin)
 ):
-    success = PackageRepository.set_active_package(db, package_name, version, stage)
+    success = await PackageRepository.set_active_package(db, package_name, version, stage)
     if not success:
         raise HTTPException(status_code=404, detail="Package not found")
 
@@ -148,9 +156,9 @@ async def set_active_package(
 async def list_packages(
     package_name: Optional[str] = None,
     stage: Optional[str] = None,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    packages = PackageRepository.list_packages(db, package_name, stage)
+    packages = await PackageRepository.list_packages(db, package_name, stage)
 
     result = []
     for package in packages:
@@ -191,13 +199,13 @@ async def delete_package(
     package_name: str,
     stage: str,
     version: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_admin)
 ):
     package_dir = PathManager.get_package_path(package_name, version, stage)
     venv_dir = PathManager.get_venv_path(package_name, version, stage)
 
-    success = PackageRepository.delete_package(db, package_name, version, stage)
+    success = await PackageRepository.delete_package(db, package_name, version, stage)
     if success:
         if os.path.exists(package_dir):
             shutil.rmtree(package_dir, ignore_errors=True)
@@ -205,17 +213,21 @@ async def delete_package(
         if os.path.exists(venv_dir):
             shutil.rmtree(venv_dir, ignore_errors=True)
 
+        VenvCacheService().remove_references(package_name, version, stage)
+
     return {"message": "Package deleted successfully"}
 
 
 @router.get("/{stage}")
 async def get_packages_by_stage(
     stage: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     task_manager_service: TaskRepository = get_service(TaskRepository)
 ):
     package_infos: list[PackageInfo] = []
-    packages = PackageRepository.list_packages(db, None, stage)
+    packages = await PackageRepository.list_packages(db, None, stage)
+    running_counts = await task_manager_service.get_tasks_count_by_stage_async(
+        stage, [TaskStatus.RUNNING, TaskStatus.INITIALIZING])
 
     # pylint: disable=E1120
     grouped_packages: list[tuple[str, list[PackageEntity]]] = packages | groupby(lambda x: x.package_name)
@@ -225,11 +237,7 @@ async def get_packages_by_stage(
         deployment_ids = [deployment.deployment_id for deployment in deployments]
         deployment_dates = [deployment.deployed_at for deployment in deployments]
 
-        running_instances = 0
-        for deployment_id in deployment_ids:
-            tasks_count = task_manager_service.get_tasks_count_by_deployment_id(
-                deployment_id, [TaskStatus.RUNNING, TaskStatus.INITIALIZING])
-            running_instances += tasks_count
+        running_instances = sum(running_counts.get(deployment_id, 0) for deployment_id in deployment_ids)
 
         package_status = PackageStatus.RUNNING if running_instances > 0 else PackageStatus.IDLE
         oldest_package = min(deployment_dates)
@@ -248,15 +256,16 @@ async def get_packages_by_stage(
 async def get_package_by_stage(
     package_name: str,
     stage: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     task_manager_service: TaskRepository = get_service(TaskRepository)
 ):
     package_details: list[PackageDetail] = []
-    packages = PackageRepository.list_packages(db, package_name, stage)
+    packages = await PackageRepository.list_packages(db, package_name, stage)
+    running_counts = await task_manager_service.get_tasks_count_by_stage_async(
+        stage, [TaskStatus.RUNNING, TaskStatus.INITIALIZING], package_name)
 
     for package in packages:
-        tasks_count = task_manager_service.get_tasks_count_by_deployment_id(
-            package.deployment_id, [TaskStatus.RUNNING, TaskStatus.INITIALIZING])
+        tasks_count = running_counts.get(package.deployment_id, 0)  # type: ignore
 
         package_status = PackageStatus.RUNNING if tasks_count > 0 else PackageStatus.IDLE
         package_info = PackageDetail(
@@ -277,24 +286,24 @@ async def get_package_by_version(
     package_name: str,
     stage: str,
     version: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     task_repository: TaskRepository = get_service(TaskRepository),
     task_manager_service: TaskManagerService = get_service(TaskManagerService)
 ):
-    package = PackageRepository.get_package(db, package_name, stage, version)
+    package = await PackageRepository.get_package(db, package_name, stage, version)
     if not package:
         raise HTTPException(status_code=404, detail="Package not found")
 
-    tasks = task_repository.get_tasks_by_deployment_id(package.deployment_id, [])
-    task_infos: list[TaskInfo] = []
-    for task in tasks:
-        task_info = map_task_entity_to_task_info(task, None)
-        if task.status == TaskStatus.RUNNING or task.status == TaskStatus.INITIALIZING:
-            metrics = task_manager_service.get_task_metrics(task.task_id)
-            if metrics:
-                task_info.metrics = metrics
-
-        task_infos.append(task_info)
+    tasks = await task_repository.get_tasks_by_deployment_id_async(package.deployment_id, [])
+    task_infos: list[TaskInfo] = [map_task_entity_to_task_info(task, None) for task in tasks]
+    # each lookup is a blocking metrics api call, they run side by side off the event loop
+    active_task_infos = [task_info for task_info in task_infos
+                         if task_info.status in (TaskStatus.RUNNING, TaskStatus.INITIALIZING)]
+    all_metrics = await asyncio.gather(*(asyncio.to_thread(task_manager_service.get_task_metrics, task_info.task_id)
+                                         for task_info in active_task_infos))
+    for task_info, metrics in zip(active_task_infos, all_metrics):
+        if metrics:
+            task_info.metrics = metrics
 
     task_infos.sort(key=lambda x: (x.status == TaskStatus.RUNNING, x.started_at), reverse=True)
 
@@ -322,10 +331,10 @@ async def get_package_environment(
     package_name: str,
     stage: str,
     version: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_admin)
 ):
-    package = PackageRepository.get_package(db, package_name, stage, version)
+    package = await PackageRepository.get_package(db, package_name, stage, version)
     if not package:
         raise HTTPException(status_code=404, detail="Package not found")
 
@@ -342,13 +351,13 @@ async def set_default_package(
     package_name: str,
     stage: str,
     version: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_admin)
 ):
-    package = PackageRepository.get_package(db, package_name, stage, version)
+    package = await PackageRepository.get_package(db, package_name, stage, version)
     if not package:
         raise HTTPException(status_code=404, detail="Package not found")
 
-    PackageRepository.set_active_package(db, package_name, version, stage)
+    await PackageRepository.set_active_package(db, package_name, version, stage)
 
     return {"message": "Package set as default successfully"}
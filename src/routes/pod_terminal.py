@@ -4,10 +4,12 @@ import logging
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from fastapi.websockets import WebSocketState
-from kubernetes import client
 from kubernetes.stream import stream
 
+from src.services.kubernetes.k8s_api import K8sApi
 from src.services.kubernetes.pod_executor import PodExecutor
+from src.services.kubernetes.pod_pool import PodPool
+from src.utils.singleton_meta import get_service_instance
 
 logger = logging.getLogger(__name__)
 
@@ -24,21 +26,22 @@ async def pod_terminal_websocket(
     output_task = None
 
     try:
-        v1 = client.CoreV1Api()
+        pod_name = get_service_instance(PodPool).get_pod_name(pod_name)
         await websocket.accept()
-        exec_command = PodExecutor.get_available_shell(v1, namespace, pod_name)
+        exec_command = PodExecutor.get_available_shell(namespace, pod_name)
 
-        resp = stream(
-            v1.connect_get_namespaced_pod_exec,
-            pod_name,
-            namespace,
-            command=exec_command,
-            stderr=True,
-            stdin=True,
-            stdout=True,
-            tty=True,
-            _preload_content=False
-        )
+        with K8sApi().exec_api() as exec_api:
+            resp = stream(
+                exec_api.connect_get_namespaced_pod_exec,
+                pod_name,
+                namespace,
+                command=exec_command,
+                stderr=True,
+                stdin=True,
+                stdout=True,
+                tty=True,
+                _preload_content=False
+            )
 
         async def read_output():
             try:
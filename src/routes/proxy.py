@@ -1,17 +1,20 @@
-import asyncio
-import os
+import logging
 from enum import Enum
 from typing import Optional, TypeVar
 
 import httpx
 import websockets
-from fastapi import APIRouter, BackgroundTasks, Request, WebSocket
-from fastapi.responses import StreamingResponse
+from fastapi import BackgroundTasks, Request, WebSocket
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from src.database.models.task_entity import TaskEntity
 from src.database.repositories.task_repository import TaskRepository
+from src.misc.task_status import TaskStatus
+from src.services.proxy_client_pool import ProxyClientPool
+from src.services.proxy_route_table import ProxyRoute, ProxyRouteTable
+from src.services.websocket_relay import WebSocketRelay, WebSocketRelayStats, get_requested_subprotocols
 from src.utils import config
-from src.utils.singleton_meta import get_service, get_service_instance
+from src.utils.singleton_meta import get_service_instance
 
 
 class ProxyCacheType(Enum):
@@ -19,38 +22,32 @@ class ProxyCacheType(Enum):
     VSCODE = "vscode"
 
 
-router = APIRouter(prefix="/proxy", include_in_schema=False)
-vscode_router = APIRouter(prefix="/vscode", include_in_schema=False)
+logger = logging.getLogger(__name__)
 
-_proxy_task_id_cache = {}
-_vscode_task_id_cache = {}
+PROXY_PREFIXES = {f"/{cache_type.value}/": cache_type for cache_type in ProxyCacheType}
 
 T = TypeVar('T')
 
 
-def get_task_info(task_id: str, task_manager: TaskRepository, cache_type: ProxyCacheType) -> Optional[dict]:
-    cache_map = {
-        ProxyCacheType.PROXY: (_proxy_task_id_cache, lambda t: t.ui_port if isinstance(t, TaskEntity) else None),
-        ProxyCacheType.VSCODE: (_vscode_task_id_cache, lambda t: t.vscode_port if isinstance(t, TaskEntity) else None)
+async def get_task_info(task_id: str, task_manager: TaskRepository,
+                        cache_type: ProxyCacheType) -> Optional[ProxyRoute]:
+    port_getters = {
+        ProxyCacheType.PROXY: lambda t: t.ui_port,
+        ProxyCacheType.VSCODE: lambda t: t.vscode_port
     }
 
-    cache, port_getter = cache_map[cache_type]
-
-    if task_id not in cache:
-        task = task_manager.get_task(task_id)
-        if not task:
+    async def load_route() -> Optional[ProxyRoute]:
+        task = await task_manager.get_task_async(task_id)
+        if not task or task.status != TaskStatus.RUNNING:
             return None
 
-        port = port_getter(task)
+        port = port_getters[cache_type](task)
         if not port:
             return None
 
-        cache[task_id] = {
-            'port': port,
-            'ip': task.ui_ip_address
-        }
+        return ProxyRoute(ip=task.ui_ip_address, port=port)  # type: ignore
 
-    return cache[task_id]
+    return await ProxyRouteTable().resolve(task_id, cache_type.value, load_route)
 
 
 def generate_prefix_suffix(task_id: str, request: Request, cache_type: ProxyCacheType):
@@ -68,189 +65,170 @@ async def _handle_proxy_request(request: Request,
                                 task_id: str,
                                 task_manager: TaskRepository,
                                 proxy_type: ProxyCacheType):
-    HTTP_SERVER = None
+    client_pool = ProxyClientPool()
+    upstream = None
     try:
-        task_info = get_task_info(task_id, task_manager, proxy_type)
+        task_info = await get_task_info(task_id, task_manager, proxy_type)
         if task_info is None:
             return StreamingResponse("Task not found", status_code=404)
 
         prefix, suffix = generate_prefix_suffix(task_id, request, proxy_type)
 
-        address = task_info['ip'] if not config.IS_DEBUG else "localhost"
-        port = task_info['port']
+        address = task_info.ip if not config.IS_DEBUG else "localhost"
+        port = task_info.port
 
         url = httpx.URL(path=suffix, query=request.url.query.encode("utf-8"))
 
-        if not config.IS_DEBUG:
-            ip = address.split(":")[0]
-            no_proxy = os.environ.get("no_proxy", "").split(",")
-
-            if ip not in no_proxy:
-                no_proxy.append(ip)
-                os.environ["no_proxy"] = ",".join(no_proxy)
-
-        base_url = f"http://{address}:{port}/"
-        HTTP_SERVER = httpx.AsyncClient(base_url=base_url, cookies=request.cookies,
-                                        follow_redirects=True)
+        http_server = client_pool.acquire(task_id, address, port)
+        upstream = (address, port)
 
         headers = dict(request.headers.raw)
         headers[b'X-Forwarded-Prefix'] = prefix.encode()
-        reverse_proxy_request = HTTP_SERVER.build_request(
+        # the body is pulled from the client only as fast as the upstream accepts it
+        has_body = b"content-length" in headers or b"transfer-encoding" in headers
+        reverse_proxy_request = http_server.build_request(
             request.method, url,
             headers=headers,
-            content=await request.body()
+            content=request.stream() if has_body else None
         )
 
-        reverse_proxy_response = await HTTP_SERVER.send(reverse_proxy_request, stream=True)
+        reverse_proxy_response = await http_server.send(reverse_proxy_request, stream=True)
+        upstream = None
+
+        released = False
+
+        async def close_response():
+            # aiter_raw closes the response itself once the body is read, the lease is tracked separately
+            nonlocal released
+            try:
+                if not reverse_proxy_response.is_closed:
+                    await reverse_proxy_response.aclose()
+            finally:
+                if not released:
+                    released = True
+                    client_pool.release(address, port)
+
+        async def stream_response():
+            try:
+                async for chunk in reverse_proxy_response.aiter_raw():
+                    yield chunk
+            finally:
+                await close_response()
 
         tasks = BackgroundTasks()
-        tasks.add_task(reverse_proxy_response.aclose)
+        tasks.add_task(close_response)
+
+        response_headers = reverse_proxy_response.headers
+        location = response_headers.get("location")
+        upstream_url = f"http://{address}:{port}"
+        if location is not None and (location == upstream_url or location.startswith(f"{upstream_url}/")):
+            # redirects to the pod address are only reachable through the proxy
+            response_headers = response_headers.copy()
+            response_headers["location"] = prefix + (location[len(upstream_url):] or "/")
 
         return StreamingResponse(
-            reverse_proxy_response.aiter_raw(),
+            stream_response(),
             status_code=reverse_proxy_response.status_code,
-            headers=reverse_proxy_response.headers,
+            headers=response_headers,
             background=tasks)
     except Exception as e:
-        print(f"Proxy error: {e}")
-        if HTTP_SERVER and not HTTP_SERVER.is_closed:
-            await HTTP_SERVER.aclose()
+        logger.error(f"Proxy error for task {task_id}: {str(e)}")
+        if upstream is not None:
+            client_pool.release(*upstream)
         return StreamingResponse("Proxy error", status_code=500)
 
 
-@router.api_route("/{task_id}/{path:path}", methods=["GET", "POST"])
-async def _reverse_proxy(task_id: str,
-                         request: Request,
-                         task_manager: TaskRepository = get_service(TaskRepository)):
-    return await _handle_proxy_request(request, task_id, task_manager, ProxyCacheType.PROXY)
-
-
-@vscode_router.api_route("/{task_id}/{path:path}", methods=["GET", "POST"])
-async def _vscode_proxy(task_id: str,
-                        request: Request,
-                        task_manager: TaskRepository = get_service(TaskRepository)):
-    return await _handle_proxy_request(request, task_id, task_manager, ProxyCacheType.VSCODE)
-
-
 async def _handle_websocket_proxy(websocket: WebSocket, task_id: str, path: str,
                                   task_manager: TaskRepository,
                                   cache_type: ProxyCacheType):
-    task_info = get_task_info(task_id, task_manager, cache_type)
+    task_info = await get_task_info(task_id, task_manager, cache_type)
     if task_info is None:
         await websocket.close(code=1008, reason="Task not found")
-        return StreamingResponse("Task not found", status_code=404)
+        return
 
-    address_to_use = task_info['ip'] if not config.IS_DEBUG else "localhost"
+    address_to_use = task_info.ip if not config.IS_DEBUG else "localhost"
 
-    ws_protocol = None
-    if "sec-websocket-protocol" in websocket.headers:
-        ws_protocol = websocket.headers["sec-websocket-protocol"]
-        if "," in ws_protocol:
-            ws_protocol = ws_protocol.split(",")[0].strip()
-
-    await websocket.accept(subprotocol=ws_protocol)
-
-    port = task_info['port']
+    port = task_info.port
     query_string = websocket.scope.get("query_string", b"").decode()
     target_url = f"ws://{address_to_use}:{port}/{path}"
     if query_string:
         target_url += f"?{query_string}"
 
     try:
-        async with websockets.connect(target_url) as target_ws:
-            forward_client_to_server = asyncio.create_task(
-                forward_ws(websocket, target_ws, "client → server")
-            )
-
-            forward_server_to_client = asyncio.create_task(
-                forward_ws(target_ws, websocket, "server → client")
-            )
-
-            _, pending = await asyncio.wait(
-                [forward_client_to_server, forward_server_to_client],
-                return_when=asyncio.FIRST_COMPLETED
-            )
-
-            for task in pending:
-                task.cancel()
-
+        upstream = await websockets.connect(
+            target_url,
+            subprotocols=get_requested_subprotocols(websocket) or None,  # type: ignore
+            compression="deflate" if config.PROXY_WS_UPSTREAM_COMPRESSION else None,
+            max_size=config.PROXY_WS_MAX_MESSAGE_SIZE,
+            max_queue=config.PROXY_WS_QUEUE_SIZE,
+            ping_interval=config.PROXY_WS_PING_INTERVAL_SECONDS,
+            ping_timeout=config.PROXY_WS_PING_INTERVAL_SECONDS)
     except Exception as e:
-        print(f"WebSocket proxy error: {e}")
-        await websocket.close(code=1011, reason=str(e))
-
-
-@router.websocket("/{task_id}/{path:path}")
-async def websocket_proxy(
-    websocket: WebSocket,
-    task_id: str,
-    path: str,
-    task_manager: TaskRepository = get_service(TaskRepository)
-):
-    await _handle_websocket_proxy(websocket, task_id, path, task_manager, ProxyCacheType.PROXY)
+        logger.warning(f"WebSocket proxy could not connect to task {task_id}: {str(e)}")
+        await websocket.close(code=1011, reason="Upstream unavailable")
+        return
 
-
-@vscode_router.websocket("/{task_id}/{path:path}")
-async def vscode_websocket_proxy(
-    websocket: WebSocket,
-    task_id: str,
-    path: str,
-    task_manager: TaskRepository = get_service(TaskRepository)
-):
-    await _handle_websocket_proxy(websocket, task_id, path, task_manager, ProxyCacheType.VSCODE)
-
-
-async def forward_ws(source, destination, direction):
     try:
-        if isinstance(source, WebSocket):
-            while True:
-                message = await source.receive()
-                if "text" in message:
-                    await destination.send(message["text"])
-                elif "bytes" in message:
-                    await destination.send(message["bytes"])
-        else:
-            while True:
-                message = await source.recv()
-                if isinstance(message, str):
-                    await destination.send_text(message)
-                else:
-                    await destination.send_bytes(message)
+        # the client gets the subprotocol the app actually picked
+        await websocket.accept(subprotocol=upstream.subprotocol)
+        await WebSocketRelay(websocket, upstream, WebSocketRelayStats(task_id, path)).run()
     except Exception as e:
-        print(f"Error in {direction}: {e}")
-        raise
-
-
-async def proxy_404_forwarder(
-        request: Request,
-        referer: str) -> Optional[StreamingResponse]:
-    task_manager = get_service_instance(TaskRepository)
-    cache_type_map = {
-        "/proxy/": ProxyCacheType.PROXY,
-        "/vscode/": ProxyCacheType.VSCODE
-    }
-    cache_type = next((ct for path, ct in cache_type_map.items() if path in referer), None)
-    if not cache_type:
-        return None
-
-    if f"/{cache_type.value}/" in referer and not request.url.path.startswith(f"/{cache_type.value}/"):
-        referer_parts = referer.split(f"/{cache_type.value}/")[1].split("/")
-        if referer_parts:
-            task_id = referer_parts[0]
-            proxy_response = await _handle_proxy_request(request, task_id, task_manager, cache_type)
-            return proxy_response
-
-
-async def handle_proxy_404_middleware(request: Request, call_next):
-    if "referer" not in request.headers:
-        return await call_next(request)
-
-    referer = request.headers["referer"]
-
-    if not any(cache_type.value in referer for cache_type in ProxyCacheType):
-        return await call_next(request)
-
-    response = await call_next(request)
-    if response.status_code == 404:
-        return await proxy_404_forwarder(request, referer)
-
-    return response
+        logger.error(f"WebSocket proxy error for task {task_id}: {str(e)}")
+    finally:
+        await upstream.close()
+
+
+class ProxyDispatcher:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(f"{root_path}/"):
+            path = path[len(root_path):]
+
+        cache_type = PROXY_PREFIXES.get(path[:path.find("/", 1) + 1])
+        task_id, separator, upstream_path = path[path.find("/", 1) + 1:].partition("/")
+        if cache_type is None or not task_id:
+            await self.app(scope, receive, send)
+            return
+
+        task_manager = get_service_instance(TaskRepository)
+        if scope["type"] == "websocket":
+            await _handle_websocket_proxy(WebSocket(scope, receive, send), task_id, upstream_path, task_manager,
+                                          cache_type)
+            return
+
+        request = Request(scope, receive)
+        if not separator:
+            # relative asset urls of the app only resolve below the trailing slash
+            response = RedirectResponse(request.url.replace(path=f"{request.url.path}/"))
+        else:
+            response = await _handle_proxy_request(request, task_id, task_manager, cache_type)
+        await response(scope, receive, send)
+
+
+class ProxyRefererFallback:
+    # apps that request absolute paths like /static/app.js are found through the page that loaded them
+    def __init__(self, not_found: ASGIApp):
+        self.not_found = not_found
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            request = Request(scope, receive)
+            referer = request.headers.get("referer", "")
+            for cache_type in ProxyCacheType:
+                marker = f"/{cache_type.value}/"
+                if marker in referer:
+                    task_id = referer.split(marker, 1)[1].split("/", 1)[0]
+                    response = await _handle_proxy_request(request, task_id, get_service_instance(TaskRepository),
+                                                           cache_type)
+                    await response(scope, receive, send)
+                    return
+
+        await self.not_found(scope, receive, send)
@@ -1,5 +1,8 @@
 from fastapi import APIRouter
 
+from src.services.proxy_route_table import ProxyRouteTable
+from src.services.websocket_relay import WebSocketRelayMetrics
+
 router = APIRouter(tags=["Status"])
 
 
@@ -11,3 +14,13 @@ def health_check():
 @router.get("/liveness", include_in_schema=False)
 def liveness_check():
     return {"status": "UP"}
+
+
+@router.get("/metrics/proxy-routes", include_in_schema=False)
+def proxy_route_stats():
+    return ProxyRouteTable().get_stats()
+
+
+@router.get("/metrics/proxy-websockets", include_in_schema=False)
+def proxy_websocket_stats():
+    return WebSocketRelayMetrics().get_stats()
@@ -1,16 +1,19 @@
+import asyncio
 import logging
+from datetime import datetime, timezone
+from typing import List, Optional
 
 import psutil
 from aiohttp import ClientSession
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 
 from src.database.repositories.task_repository import TaskRepository
-from src.misc.runtime_type import RuntimeType
 from src.misc.task_status import TaskStatus
 from src.models.async_execution_response import AsyncExecutionResponse
-from src.models.yaml_config import parse_config
 from src.routes import authentication
+from src.services.task_event_bus import TaskEventBus
 from src.services.task_manager_service import TaskManagerService
+from src.utils import config
 from src.utils.singleton_meta import get_service
 from src.utils.task_logger import TaskLogger
 
@@ -19,16 +22,29 @@ task_logger = TaskLogger()
 
 router = APIRouter(prefix="/task", tags=["task"])
 
+MAX_STATUS_WAIT_SECONDS = 60
+
 
 @router.get("/status/{task_id}")
 async def get_task_status(
         task_id: str,
+        wait_seconds: float = Query(0, ge=0, le=MAX_STATUS_WAIT_SECONDS),
         task_manager: TaskRepository = get_service(TaskRepository)):
-    task = task_manager.get_task(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    deadline = asyncio.get_running_loop().time() + wait_seconds
+    with TaskEventBus().subscribe(task_id) as task_events:
+        while True:
+            task = await task_manager.get_task_async(task_id)
+            if not task:
+                raise HTTPException(status_code=404, detail="Task not found")
+
+            task_is_not_running = task.status not in [TaskStatus.QUEUED, TaskStatus.RUNNING,
+                                                      TaskStatus.INITIALIZING]
+            remaining_time = deadline - asyncio.get_running_loop().time()
+            if task_is_not_running or remaining_time <= 0:
+                break
+
+            await task_events.wait(remaining_time)
 
-    task_is_not_running = task.status != TaskStatus.RUNNING and task.status != TaskStatus.INITIALIZING
     return task.result if task_is_not_running else AsyncExecutionResponse(
         task_id=task_id,
         message=f"Package {task.package.package_name} is still running",
@@ -41,12 +57,12 @@ async def delete_task(
         task_id: str,
         task_manager: TaskRepository = get_service(TaskRepository),
         _=Depends(authentication.require_operator_or_admin)):
-    task = task_manager.get_task(task_id)
+    task = await task_manager.get_task_async(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task.status == TaskStatus.RUNNING or task.status == TaskStatus.INITIALIZING:
-        raise HTTPException(status_code=400, detail="Cannot delete running or initializing task")
-    task_manager.delete_task(task_id)
+    if task.status in [TaskStatus.QUEUED, TaskStatus.RUNNING, TaskStatus.INITIALIZING]:
+        raise HTTPException(status_code=400, detail="Cannot delete queued, running or initializing task")
+    await task_manager.delete_task_async(task_id)
     return {"message": "Task deleted"}
 
 
@@ -57,16 +73,16 @@ async def cancel_task(
         k8s_manager_service=get_service(TaskManagerService),
         _=Depends(authentication.require_operator_or_admin)):
     try:
-        task = task_manager.get_task(task_id)
+        task = await task_manager.get_task_async(task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        if task.status != TaskStatus.RUNNING and task.status != TaskStatus.INITIALIZING:
+        if task.status not in [TaskStatus.QUEUED, TaskStatus.RUNNING, TaskStatus.INITIALIZING]:
             raise HTTPException(status_code=400, detail=f"Task cannot be cancelled (status: {task.status})")
 
         current_pod_ip = task_manager.get_ip_address()
         if task.ip_address == current_pod_ip:
-            return k8s_manager_service.cancel_task(task_id)
+            return await asyncio.to_thread(k8s_manager_service.cancel_task, task_id)
         else:
             try:
                 async with ClientSession() as session:
@@ -76,10 +92,10 @@ async def cancel_task(
                         else:
                             error_text = await response.text()
                             logger.error(f"Error cancelling task: {error_text}")
-                            return k8s_manager_service.cancel_task(task_id)
+                            return await asyncio.to_thread(k8s_manager_service.cancel_task, task_id)
             except Exception as e:
                 logger.error(f"Error cancelling task: {str(e)}")
-                return k8s_manager_service.cancel_task(task_id)
+                return await asyncio.to_thread(k8s_manager_service.cancel_task, task_id)
     except psutil.NoSuchProcess:
         pass
     except Exception as e:
@@ -87,32 +103,67 @@ async def cancel_task(
         raise HTTPException(status_code=500, detail=f"Failed to cancel task: {str(e)}")
 
 
+@router.post("/{task_id}/extend")
+async def extend_task_timeout(
+        task_id: str,
+        seconds: int = Query(..., gt=0),
+        task_manager: TaskRepository = get_service(TaskRepository),
+        k8s_manager_service: TaskManagerService = get_service(TaskManagerService),
+        _=Depends(authentication.require_operator_or_admin)):
+    task = await task_manager.get_task_async(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if task.ip_address != task_manager.get_ip_address():
+        async with ClientSession() as session:
+            async with session.post(f"http://{task.ip_address}:8000/task/{task_id}/extend",
+                                    params={"seconds": seconds}) as response:
+                if response.status != 200:
+                    raise HTTPException(status_code=response.status, detail=await response.text())
+                return await response.json()
+
+    deadline = k8s_manager_service.extend_task_timeout(task_id, seconds)
+    if deadline is None:
+        raise HTTPException(status_code=400, detail="Task has no active timeout")
+
+    return {"task_id": task_id, "deadline": datetime.fromtimestamp(deadline, timezone.utc).isoformat()}
+
+
 @router.get("s/{stage}")
-async def list_tasks(stage: str, task_manager: TaskRepository = get_service(TaskRepository)):
-    response = task_manager.list_tasks(stage)
-    return response
+async def list_tasks(
+    stage: str,
+    limit: int = Query(config.TASK_LIST_DEFAULT_LIMIT, ge=1, le=config.TASK_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    status: Optional[List[TaskStatus]] = Query(None),
+    package_name: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    task_manager: TaskRepository = get_service(TaskRepository)
+):
+    try:
+        return await task_manager.list_tasks_async(stage, limit, cursor, status, package_name, started_after,
+                                                   started_before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{task_id}/logs")
 async def get_task_logs(
     task_id: str,
-    task_repository: TaskRepository = get_service(TaskRepository),
-    task_manager_service: TaskManagerService = get_service(TaskManagerService)
+    cursor: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0),
+    tail: Optional[int] = Query(None, ge=0)
 ):
-    task = task_repository.get_task(task_id)
-    config_yaml_content = parse_config(task.package.config)  # type: ignore
-    is_container_runtime = config_yaml_content.runtime == RuntimeType.CONTAINER
-
-    logs = task_logger.get_logs(task_id)
-
-    if is_container_runtime:
-        pod_logs = task_manager_service.get_task_logs(task_id)
-        if pod_logs:
-            logs.append(pod_logs)
+    if since is not None and cursor is None:
+        cursor = task_logger.get_cursor(task_id, since)
+    if cursor is None and tail is None and since is None:
+        tail = config.TASK_LOG_TAIL_LINES
 
+    chunk = await asyncio.to_thread(task_logger.read_logs, task_id, cursor, tail)
+    logs = chunk.lines
     logs.reverse()
 
-    return {"logs": logs}
+    return {"logs": logs, "cursor": chunk.cursor, "reset": chunk.reset}
 
 
 @router.post("/{task_id}/install-ssh")
@@ -3,9 +3,9 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.database_access import get_db_session
+from src.database.database_access import get_async_db_session
 from src.database.repositories.volume_repository import VolumeRepository
 from src.routes import authentication
 
@@ -34,11 +34,11 @@ class VolumeResponse(BaseModel):
 @router.post("/", response_model=VolumeResponse)
 async def create_volume(
     volume: VolumeCreate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_admin)
 ):
     volume_id = str(uuid.uuid4())
-    return VolumeRepository.create_volume(
+    return await VolumeRepository.create_volume(
         db,
         volume_id=volume_id,
         name=volume.name,
@@ -48,17 +48,17 @@ async def create_volume(
 
 @router.get("/", response_model=List[VolumeResponse])
 async def list_volumes(
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    return VolumeRepository.list_volumes(db)
+    return await VolumeRepository.list_volumes(db)
 
 
 @router.get("/{volume_id}", response_model=VolumeResponse)
 async def get_volume(
     volume_id: str,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    volume = VolumeRepository.get_volume(db, volume_id)
+    volume = await VolumeRepository.get_volume(db, volume_id)
     if not volume:
         raise HTTPException(status_code=404, detail="Volume not found")
     return volume
@@ -68,10 +68,10 @@ async def get_volume(
 async def update_volume(
     volume_id: str,
     volume: VolumeUpdate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_admin)
 ):
-    updated_volume = VolumeRepository.update_volume(
+    updated_volume = await VolumeRepository.update_volume(
         db,
         volume_id=volume_id,
         name=volume.name,
@@ -85,10 +85,10 @@ async def update_volume(
 @router.delete("/{volume_id}")
 async def delete_volume(
     volume_id: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(authentication.require_admin)
 ):
-    success = VolumeRepository.delete_volume(db, volume_id)
+    success = await VolumeRepository.delete_volume(db, volume_id)
     if not success:
         raise HTTPException(status_code=404, detail="Volume not found")
     return {"message": "Volume deleted successfully"}
@@ -1,15 +1,22 @@
 import asyncio
 import logging
-from typing import Any, Dict, Set
+import re
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
 
 from fastapi import APIRouter, WebSocket
 from fastapi.encoders import jsonable_encoder
 
-from src.database.database_access import get_db_session
+from src.database.database_access import AsyncSessionLocal
 from src.database.repositories.task_repository import TaskRepository
 from src.routes.package import get_package_by_version
-from src.routes.task import get_task_logs
+from src.routes.task import task_logger
+from src.services.task_event_bus import ALL_TASKS, TaskEventBus
 from src.services.task_manager_service import TaskManagerService
+from src.utils import config
+from src.utils.name_generator import sanitize_name
 from src.utils.singleton_meta import get_service_instance
 
 from . import cluster
@@ -17,65 +24,166 @@ from . import cluster
 router = APIRouter(prefix="/ws", tags=["websocket"])
 logger = logging.getLogger(__name__)
 
+MAX_OTHER_TASK_IDS = 1024
+
+
+def compute_diff(previous: Dict[str, Any], current: Dict[str, Any], keys: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    changes: Dict[str, Any] = {}
+    removed: Dict[str, List[Any]] = {}
+    prepended: Dict[str, List[Any]] = {}
+
+    for name, value in current.items():
+        old_value = previous.get(name)
+        if value == old_value:
+            continue
+
+        key = keys.get(name)
+        if key is not None and isinstance(value, list) and isinstance(old_value, list):
+            # keyed lists only carry new items and the changed fields of existing ones
+            old_items = {item[key]: item for item in old_value}
+            changed_items = []
+            for item in value:
+                old_item = old_items.pop(item[key], None)
+                if old_item is None:
+                    changed_items.append(item)
+                elif old_item != item:
+                    changed_items.append({key: item[key],
+                                          **{k: v for k, v in item.items() if old_item.get(k) != v}})
+
+            if changed_items:
+                changes[name] = changed_items
+            if old_items:
+                removed[name] = list(old_items)
+        elif (isinstance(value, list) and isinstance(old_value, list) and len(value) > len(old_value)
+              and value[len(value) - len(old_value):] == old_value):
+            # newest first lists like logs only grow at the front
+            prepended[name] = value[:len(value) - len(old_value)]
+        else:
+            changes[name] = value
+
+    if not changes and not removed and not prepended:
+        return None
+
+    diff = {"partial": True, **changes}
+    if removed:
+        diff["removed"] = removed
+    if prepended:
+        diff["prepended"] = prepended
+    return diff
+
+
+@dataclass
+class Topic:
+    name: str
+    fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    keys: Dict[str, str]
+    task_id: Optional[str]
+    diff: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]] = None
+    accept: Optional[Callable[[Optional[str]], bool]] = None
+    subscribers: Set[WebSocket] = field(default_factory=set)
+    joining: Set[WebSocket] = field(default_factory=set)
+    snapshot: Optional[Dict[str, Any]] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    producer: Optional[asyncio.Task] = None
+
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        self.topics: Dict[str, Topic] = {}
         self.max_connections_per_type = 50
-        self.last_broadcast: Dict[str, float] = {}
-        self.min_broadcast_interval = 1.0
-
-    async def connect(self, websocket: WebSocket, client_type: str):
-        if client_type not in self.active_connections:
-            self.active_connections[client_type] = set()
-
-        if len(self.active_connections[client_type]) >= self.max_connections_per_type:
+        self.refresh_interval = 2.0
+
+    async def serve(self, websocket: WebSocket, client_type: str, fetch: Callable[[], Awaitable[Dict[str, Any]]],
+                    keys: Optional[Dict[str, str]] = None, task_id: Optional[str] = None,
+                    diff: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+                    accept: Optional[Callable[[Optional[str]], bool]] = None):
+        topic = self.topics.get(client_type)
+        if topic is not None and len(topic.subscribers) + len(topic.joining) >= self.max_connections_per_type:
             await websocket.close(code=1008, reason="Too many connections")
             return
 
         await websocket.accept()
-        self.active_connections[client_type].add(websocket)
-
-    def disconnect(self, websocket: WebSocket, client_type: str):
-        if client_type in self.active_connections and websocket in self.active_connections[client_type]:
-            self.active_connections[client_type].remove(websocket)
-            if not self.active_connections[client_type]:
-                del self.active_connections[client_type]
-                if client_type in self.last_broadcast:
-                    del self.last_broadcast[client_type]
-
-    def has_connections(self, client_type: str) -> bool:
-        return client_type in self.active_connections and bool(self.active_connections[client_type])
-
-    async def broadcast(self, data: Any, client_type: str) -> bool:
-        if not self.has_connections(client_type):
-            return False
-
-        current_time = asyncio.get_event_loop().time()
-        if client_type in self.last_broadcast:
-            time_since_last = current_time - self.last_broadcast[client_type]
-            if time_since_last < self.min_broadcast_interval:
-                return True
-
-        connections = list(self.active_connections[client_type])
-        if not connections:
-            return False
-
-        json_data = jsonable_encoder(data)
-        dead_connections = set()
-
-        for connection in connections:
-            if await self._safe_send(connection, json_data):
-                self.last_broadcast[client_type] = current_time
-            else:
-                dead_connections.add(connection)
+        while True:
+            topic = self.topics.get(client_type)
+            if topic is None:
+                topic = self.topics[client_type] = Topic(client_type, fetch, keys or {}, task_id, diff, accept)
+
+            async with topic.lock:
+                # the last subscriber may have torn the topic down while we waited for the lock
+                if self.topics.get(client_type) is not topic:
+                    continue
+
+                # diffs are computed against the last snapshot, so a client only gets them after that snapshot
+                if topic.snapshot is not None and await self._safe_send(websocket, topic.snapshot):
+                    topic.subscribers.add(websocket)
+                else:
+                    topic.joining.add(websocket)
+
+                if topic.producer is None or topic.producer.done():
+                    topic.producer = asyncio.create_task(self._produce(topic))
+                break
 
-        if dead_connections:
-            for dead in dead_connections:
-                logger.warning(f"Removing dead connection for client_type {client_type}")
-                self.disconnect(dead, client_type)
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        except Exception as e:
+            logger.debug(f"Websocket of {client_type} closed: {str(e)}")
+        finally:
+            self.disconnect(websocket, topic)
+
+    def disconnect(self, websocket: WebSocket, topic: Topic):
+        topic.subscribers.discard(websocket)
+        topic.joining.discard(websocket)
+        if topic.subscribers or topic.joining:
+            return
 
-        return self.has_connections(client_type)
+        if topic.producer is not None:
+            topic.producer.cancel()
+            topic.producer = None
+        if self.topics.get(topic.name) is topic:
+            del self.topics[topic.name]
+
+    async def _produce(self, topic: Topic):
+        loop = asyncio.get_running_loop()
+        with (TaskEventBus().subscribe(topic.task_id, topic.accept) if topic.task_id
+              else nullcontext()) as task_events:
+            while True:
+                started = loop.time()
+                try:
+                    data = jsonable_encoder(await topic.fetch())
+                    async with topic.lock:
+                        diff = None
+                        if topic.snapshot is not None:
+                            diff = (topic.diff(topic.snapshot, data) if topic.diff is not None
+                                    else compute_diff(topic.snapshot, data, topic.keys))
+                        topic.snapshot = data
+                        if diff is not None:
+                            await self._broadcast(topic, topic.subscribers, diff)
+
+                        joining, topic.joining = topic.joining, set()
+                        topic.subscribers |= joining
+                        await self._broadcast(topic, joining, data)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error refreshing websocket topic {topic.name}: {str(e)}")
+
+                if task_events is not None:
+                    await task_events.wait(self.refresh_interval)
+                    # events arriving meanwhile stay set, so a burst of them refreshes once per interval
+                    await asyncio.sleep(started + self.refresh_interval - loop.time())
+                else:
+                    await asyncio.sleep(self.refresh_interval)
+
+    async def _broadcast(self, topic: Topic, connections: Set[WebSocket], data: Any):
+        targets = list(connections)
+        results = await asyncio.gather(*(self._safe_send(connection, data) for connection in targets))
+        for connection, sent in zip(targets, results):
+            if not sent:
+                logger.warning(f"Removing dead connection for client_type {topic.name}")
+                topic.subscribers.discard(connection)
 
     async def _safe_send(self, connection: WebSocket, data: Any) -> bool:
         try:
@@ -94,29 +202,77 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+class TaskLogTail:
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.lines: Deque[str] = deque(maxlen=config.TASK_LOG_TAIL_LINES)
+        self.cursor: Optional[str] = None
+        self.new_lines: List[str] = []
+        self.reset = True
+
+    async def fetch(self) -> Dict[str, Any]:
+        chunk = await asyncio.to_thread(task_logger.read_logs, self.task_id, self.cursor, self.lines.maxlen)
+        self.reset = self.cursor is None or chunk.reset
+        if chunk.reset:
+            self.lines.clear()
+
+        self.cursor = chunk.cursor
+        self.new_lines = chunk.lines
+        self.lines.extend(chunk.lines)
+        return {"logs": list(reversed(self.lines))}
+
+    def diff(self, _: Dict[str, Any], current: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.reset:
+            return current
+        if not self.new_lines:
+            return None
+
+        return {"partial": True, "prepended": {"logs": self.new_lines[::-1]}}
+
+
+class PackageInstanceTasks:
+    def __init__(self, package_name: str, stage: str, version: str):
+        self.package_name = package_name
+        self.stage = stage
+        self.version = version
+        # task ids are generated from the package name, see TaskManagerService.execute_package_async
+        self.pattern = re.compile(rf"{re.escape(sanitize_name(package_name))}-[0-9a-f]{{7}}")
+        self.task_ids: Set[str] = set()
+        self.other_task_ids: Set[str] = set()
+        self.unknown_task_ids: Set[str] = set()
+
+    async def fetch(self) -> Dict[str, Any]:
+        unknown_task_ids, self.unknown_task_ids = self.unknown_task_ids, set()
+        async with AsyncSessionLocal() as session:
+            package_instance = await get_package_by_version(
+                self.package_name, self.stage, self.version, session,
+                get_service_instance(TaskRepository), get_service_instance(TaskManagerService))
+
+        self.task_ids = {task.task_id for task in package_instance.tasks}
+        # tasks of other versions or stages of the same package never wake this view again
+        if len(self.other_task_ids) > MAX_OTHER_TASK_IDS:
+            self.other_task_ids.clear()
+        self.other_task_ids |= unknown_task_ids - self.task_ids
+        return {"tasks": package_instance.tasks}
+
+    def accept(self, task_id: Optional[str]) -> bool:
+        if task_id is None or task_id in self.task_ids:
+            return True
+        if task_id in self.other_task_ids or not self.pattern.fullmatch(task_id):
+            return False
+
+        # a new task, it belongs to this deployment if the next fetch returns it
+        self.unknown_task_ids.add(task_id)
+        return True
+
+
 async def get_cluster_data():
-    return await cluster.get_nodes()
+    return {"nodes": await cluster.get_nodes()}
 
 
 @router.websocket("/cluster")
 async def websocket_cluster_endpoint(websocket: WebSocket):
-    client_type = "cluster"
-    await manager.connect(websocket, client_type)
-    try:
-        while True:
-            try:
-                data = await get_cluster_data()
-                if not await manager.broadcast(data, client_type):
-                    break
-
-                await asyncio.sleep(2)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in cluster websocket: {str(e)}")
-                break
-    finally:
-        manager.disconnect(websocket, client_type)
+    await manager.serve(websocket, "cluster", get_cluster_data, {"nodes": "name"})
 
 
 @router.websocket("/namespace/{namespace}/{resource_type}")
@@ -125,9 +281,6 @@ async def websocket_namespace_resource_endpoint(
     namespace: str,
     resource_type: str
 ):
-    client_type = f"namespace_{namespace}_{resource_type}"
-    await manager.connect(websocket, client_type)
-
     resource_fetchers = {
         "pods": cluster.get_pods_for_namespace,
         "services": cluster.get_services_for_namespace,
@@ -138,72 +291,30 @@ async def websocket_namespace_resource_endpoint(
         "pvcs": cluster.get_pvcs_for_namespace,
     }
 
-    try:
-        if resource_type not in resource_fetchers:
-            await websocket.send_json({"error": f"Invalid resource type: {resource_type}"})
-            return
+    if resource_type not in resource_fetchers:
+        await websocket.accept()
+        await websocket.send_json({"error": f"Invalid resource type: {resource_type}"})
+        await websocket.close()
+        return
 
-        fetcher = resource_fetchers[resource_type]
-        while True:
-            try:
-                data = await fetcher(namespace)
-                if not await manager.broadcast({resource_type: data}, client_type):
-                    break
+    fetcher = resource_fetchers[resource_type]
 
-                await asyncio.sleep(2)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in namespace resource websocket: {str(e)}")
-                break
-    finally:
-        manager.disconnect(websocket, client_type)
+    async def fetch():
+        return {resource_type: await fetcher(namespace)}
+
+    await manager.serve(websocket, f"namespace_{namespace}_{resource_type}", fetch, {resource_type: "name"})
 
 
 @router.websocket("/task/{task_id}")
 async def websocket_task_endpoint(websocket: WebSocket, task_id: str):
-    client_type = f"task_{task_id}"
-    await manager.connect(websocket, client_type)
-    try:
-        task_repository: TaskRepository = get_service_instance(TaskRepository)
-        task_manager_service: TaskManagerService = get_service_instance(TaskManagerService)
-
-        while True:
-            try:
-                task_logs = await get_task_logs(task_id, task_repository, task_manager_service)
-                data = {**task_logs}
-                if not await manager.broadcast(data, client_type):
-                    break
-
-                await asyncio.sleep(2)
-            except Exception as e:
-                logger.error(f"Error in task websocket: {str(e)}")
-                break
-    finally:
-        manager.disconnect(websocket, client_type)
+    # only lines appended since the last read are sent, the task events refresh right away
+    log_tail = TaskLogTail(task_id)
+    await manager.serve(websocket, f"task_{task_id}", log_tail.fetch, task_id=task_id, diff=log_tail.diff)
 
 
 @router.websocket("/{package_name}/{stage}/{version}")
 async def websocket_package_instance_endpoint(websocket: WebSocket, package_name: str, stage: str, version: str):
-    client_type = f"{package_name}_{stage}_{version}"
-    await manager.connect(websocket, client_type)
-    session = next(get_db_session())
-    try:
-        task_repository: TaskRepository = get_service_instance(TaskRepository)
-        task_manager_service: TaskManagerService = get_service_instance(TaskManagerService)
-
-        while True:
-            try:
-                package_instance = await get_package_by_version(
-                    package_name, stage, version, session, task_repository, task_manager_service)
-                data = {"tasks": package_instance.tasks}
-                if not await manager.broadcast(data, client_type):
-                    break
-
-                await asyncio.sleep(2)
-            except Exception as e:
-                logger.error(f"Error in package websocket: {str(e)}")
-                break
-    finally:
-        session.close()
-        manager.disconnect(websocket, client_type)
+    # only events of this deployment's tasks refresh the view
+    instance_tasks = PackageInstanceTasks(package_name, stage, version)
+    await manager.serve(websocket, f"{package_name}_{stage}_{version}", instance_tasks.fetch, {"tasks": "task_id"},
+                        task_id=ALL_TASKS, accept=instance_tasks.accept)
@@ -0,0 +1,125 @@
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.database.repositories.task_repository import TaskRepository
+from src.utils import config
+from src.utils.singleton_meta import SingletonMeta, get_service_instance
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler(metaclass=SingletonMeta):
+    def __init__(self):
+        # HOME_PATH is shared by all replicas, each one keeps the deadlines of the tasks it adopts on restart
+        ip_address = get_service_instance(TaskRepository).ip_address
+        self.path = os.path.join(config.HOME_PATH, f"deadlines-{ip_address}.json")  # type: ignore
+        self._deadlines: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._condition = threading.Condition()
+        self._handler: Optional[Callable[[str], None]] = None
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deadline")
+        self._thread: Optional[threading.Thread] = None
+        self._restored = self._load()
+
+    def start(self, handler: Callable[[str], None], task_ids: Iterable[str]):
+        active_task_ids = set(task_ids)
+        with self._condition:
+            self._handler = handler
+            for task_id, deadline in self._restored.items():
+                if task_id in active_task_ids and task_id not in self._deadlines:
+                    self._push(task_id, deadline)
+            self._restored = {}
+            self._save()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def schedule(self, task_id: str, timeout: float):
+        with self._condition:
+            self._push(task_id, time.time() + timeout)
+            self._save()
+            self._condition.notify()
+
+    def extend(self, task_id: str, seconds: float) -> Optional[float]:
+        with self._condition:
+            deadline = self._deadlines.get(task_id)
+            if deadline is None:
+                return None
+
+            self._push(task_id, deadline + seconds)
+            self._save()
+            self._condition.notify()
+            return deadline + seconds
+
+    def cancel(self, task_id: str):
+        with self._condition:
+            if self._deadlines.pop(task_id, None) is not None:
+                self._save()
+
+    def get_deadline(self, task_id: str) -> Optional[float]:
+        with self._condition:
+            return self._deadlines.get(task_id)
+
+    def _push(self, task_id: str, deadline: float):
+        # superseded heap entries are skipped when they come up, see _pop_expired
+        self._deadlines[task_id] = deadline
+        heapq.heappush(self._heap, (deadline, task_id))
+
+    def _pop_expired(self, now: float) -> List[str]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, task_id = heapq.heappop(self._heap)
+            if self._deadlines.get(task_id) == deadline:
+                del self._deadlines[task_id]
+                expired.append(task_id)
+
+        return expired
+
+    def _run(self):
+        while True:
+            with self._condition:
+                expired = self._pop_expired(time.time())
+                while not expired:
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._condition.wait(timeout)
+                    expired = self._pop_expired(time.time())
+
+                self._save()
+                handler = self._handler
+
+            for task_id in expired:
+                if handler is not None:
+                    self._executor.submit(self._fire, handler, task_id)
+
+    @staticmethod
+    def _fire(handler: Callable[[str], None], task_id: str):
+        try:
+            handler(task_id)
+        except Exception as e:
+            logger.error(f"Error handling deadline of task {task_id}: {str(e)}")
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return {task_id: float(deadline) for task_id, deadline in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading task deadlines: {str(e)}")
+            return {}
+
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({**self._restored, **self._deadlines}, f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving task deadlines: {str(e)}")
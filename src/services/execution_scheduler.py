@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from src.utils import config
+from src.utils.singleton_meta import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScheduledExecution:
+    task_id: str
+    package_name: str
+    stage: str
+    priority: int
+    package_limit: Optional[int]
+    run: Callable[[], None]
+
+
+class ExecutionScheduler(metaclass=SingletonMeta):
+    def __init__(self):
+        self.max_concurrent = config.EXECUTION_MAX_CONCURRENT
+        self.stage_limits = config.EXECUTION_MAX_CONCURRENT_PER_STAGE
+        self.package_limit = config.EXECUTION_MAX_CONCURRENT_PER_PACKAGE
+        self._queues: Dict[Tuple[str, str], List[Tuple[int, int, ScheduledExecution]]] = {}
+        self._running = 0
+        self._running_by_stage: Dict[str, int] = {}
+        self._running_by_package: Dict[str, int] = {}
+        self._running_tasks: Dict[str, ScheduledExecution] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="execution")
+        self._thread: Optional[threading.Thread] = None
+        self._detached: Dict[str, threading.Event] = {}
+        # released executions are watched on one loop, their completions share a few threads
+        self._watcher_executor = ThreadPoolExecutor(max_workers=config.EXECUTION_WATCHER_THREADS,
+                                                    thread_name_prefix="execution-watcher")
+        self._watcher_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def submit(self, execution: ScheduledExecution):
+        with self._condition:
+            queue = self._queues.setdefault((execution.package_name, execution.stage), [])
+            heapq.heappush(queue, (-execution.priority, next(self._sequence), execution))
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+            self._condition.notify()
+
+    def cancel(self, task_id: str) -> bool:
+        with self._condition:
+            for key, queue in self._queues.items():
+                for index, (_, _, execution) in enumerate(queue):
+                    if execution.task_id != task_id:
+                        continue
+
+                    queue.pop(index)
+                    if queue:
+                        heapq.heapify(queue)
+                    else:
+                        del self._queues[key]
+                    return True
+
+        return False
+
+    def release(self, task_id: str):
+        # long-running instances (ui apps, empty instances, vs code) give their slot back once they are up
+        with self._condition:
+            execution = self._running_tasks.pop(task_id, None)
+            if execution is None:
+                return
+
+            self._running -= 1
+            self._running_by_stage[execution.stage] -= 1
+            self._running_by_package[execution.package_name] -= 1
+            detached = self._detached.get(task_id)
+            if detached is not None:
+                detached.set()
+            self._condition.notify()
+
+    def watch(self, task_id: str, run: Coroutine[Any, Any, Any], on_done: Callable[[Future], None]):
+        # called by a running execution, it blocks its worker until the run ends or the execution is released
+        with self._condition:
+            if self._watcher_loop is None:
+                self._watcher_loop = asyncio.new_event_loop()
+                self._watcher_loop.set_default_executor(self._watcher_executor)
+                threading.Thread(target=self._watcher_loop.run_forever, daemon=True,
+                                 name="execution-watcher-loop").start()
+
+            detached = threading.Event()
+            if task_id not in self._running_tasks:
+                detached.set()
+            self._detached[task_id] = detached
+
+        future = asyncio.run_coroutine_threadsafe(run, self._watcher_loop)
+        future.add_done_callback(lambda _: detached.set())
+        detached.wait()
+        with self._condition:
+            self._detached.pop(task_id, None)
+
+        if future.done():
+            on_done(future)
+        else:
+            future.add_done_callback(lambda done: self._watcher_executor.submit(on_done, done))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                execution = self._next()
+                while execution is None:
+                    self._condition.wait()
+                    execution = self._next()
+
+                self._running += 1
+                self._running_by_stage[execution.stage] = self._running_by_stage.get(execution.stage, 0) + 1
+                self._running_by_package[execution.package_name] = \
+                    self._running_by_package.get(execution.package_name, 0) + 1
+                self._running_tasks[execution.task_id] = execution
+
+            self._executor.submit(self._execute, execution)
+
+    def _next(self) -> Optional[ScheduledExecution]:
+        if self._running >= self.max_concurrent:
+            return None
+
+        selected_key = None
+        selected_order = None
+        for key, queue in self._queues.items():
+            priority, sequence, execution = queue[0]
+            if not self._is_admissible(execution):
+                continue
+
+            # highest priority first, then the package with the fewest running tasks, then the oldest request
+            order = (priority, self._running_by_package.get(execution.package_name, 0), sequence)
+            if selected_order is None or order < selected_order:
+                selected_key, selected_order = key, order
+
+        if selected_key is None:
+            return None
+
+        queue = self._queues[selected_key]
+        _, _, execution = heapq.heappop(queue)
+        if not queue:
+            del self._queues[selected_key]
+
+        return execution
+
+    def _is_admissible(self, execution: ScheduledExecution) -> bool:
+        stage_limit = self.stage_limits.get(execution.stage, 0)
+        if stage_limit > 0 and self._running_by_stage.get(execution.stage, 0) >= stage_limit:
+            return False
+
+        package_limit = execution.package_limit or self.package_limit
+        if package_limit > 0 and self._running_by_package.get(execution.package_name, 0) >= package_limit:
+            return False
+
+        return True
+
+    def _execute(self, execution: ScheduledExecution):
+        try:
+            execution.run()
+        except Exception as e:
+            logger.error(f"Error executing task {execution.task_id}: {str(e)}")
+        finally:
+            self.release(execution.task_id)
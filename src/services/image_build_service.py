@@ -0,0 +1,242 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Callable, List, Optional, Set, Tuple
+
+from src.misc.runtime_type import RuntimeType
+from src.models.yaml_config import PackageConfig, parse_config
+from src.services.kubernetes.k8s_api import K8sApi
+from src.services.kubernetes.pod_manager import PodManager
+from src.services.kubernetes.runtimes import python_pod
+from src.services.package_service import PackageInfo, PackageService
+from src.services.registry_client import LAYER_MEDIA_TYPES, ImageReference, RegistryClient
+from src.services.venv_cache_service import VenvCacheService
+from src.utils import config
+from src.utils.name_generator import generate_name
+from src.utils.path_manager import PathManager
+from src.utils.singleton_meta import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+IMAGE_REF_FILE = "image"
+BAKED_RUNTIMES = (RuntimeType.PYTHON, RuntimeType.BINARY)
+
+
+@dataclass
+class Layer:
+    name: str
+    file: IO[bytes]
+    digest: str
+    diff_id: str
+    size: int
+
+
+class _HashingWriter:
+    def __init__(self, target: Any):
+        self.target = target
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        self.size += len(data)
+        return self.target.write(data)
+
+
+class ImageBuildService(metaclass=SingletonMeta):
+    def __init__(self):
+        self.enabled = bool(config.IMAGE_REGISTRY)
+        self.repository = config.IMAGE_REGISTRY_REPOSITORY
+        self._executor = ThreadPoolExecutor(max_workers=config.IMAGE_BUILD_MAX_CONCURRENT,
+                                            thread_name_prefix="image-build")
+        self._in_flight: Set[Tuple[str, str, str]] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_image_ref(package_name: str, version: str, stage: str) -> Optional[str]:
+        image_ref_path = PathManager.get_venv_path(package_name, version, stage) / IMAGE_REF_FILE
+        if not image_ref_path.is_file():
+            return None
+
+        return image_ref_path.read_text().strip() or None
+
+    def build_async(self, package_name: str, version: str, stage: str):
+        if not self.enabled:
+            return
+
+        key = (package_name, version, stage)
+        with self._lock:
+            if key in self._in_flight:
+                logger.info(f"Image build for {package_name} {version} in {stage} is already in progress")
+                return
+            self._in_flight.add(key)
+
+        self._executor.submit(self._build_in_flight, key)
+
+    def _build_in_flight(self, key: Tuple[str, str, str]):
+        try:
+            self.build(*key)
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def build(self, package_name: str, version: str, stage: str):
+        try:
+            package_info = PackageService.get_package_info(package_name, stage, version)
+            if package_info is None:
+                return
+
+            package_config = parse_config(package_info.package_entity.config)
+            if package_config.runtime not in BAKED_RUNTIMES:
+                return
+
+            logger.info(f"Building image for {package_name} {version} in {stage}")
+            image_ref = self._build_image(package_name, stage, package_info, package_config)
+
+            image_ref_path = PathManager.get_venv_path(package_name, version, stage) / IMAGE_REF_FILE
+            image_ref_path.parent.mkdir(parents=True, exist_ok=True)
+            image_ref_path.write_text(image_ref)
+            logger.info(f"Built image {image_ref} for {package_name} {version} in {stage}")
+        except Exception as e:
+            logger.error(f"Error building image for {package_name} {version} in {stage}: {str(e)}")
+
+    def _build_image(self, package_name: str, stage: str, package_info: PackageInfo,
+                     package_config: PackageConfig) -> str:
+        python_version = package_info.package_entity.python_version
+        base_image = PodManager.get_image(python_version, package_config.image)
+        layers = []
+
+        if package_config.runtime == RuntimeType.PYTHON:
+            venv_cache = VenvCacheService()
+            api = K8sApi().core
+            namespace = config.K8S_NAMESPACE
+            pod_name = generate_name("lotse-build")
+            try:
+                venv_key = python_pod.prepare_environment(api, namespace, pod_name, logger, package_name, stage,
+                                                          package_info, package_config)
+            except Exception:
+                PodManager.delete_pod(api, namespace, pod_name)
+                raise
+
+            try:
+                archive_path = venv_cache.get_archive_path(venv_key)
+                layers.append(self._create_layer("venv", lambda tar: self._add_venv(tar, archive_path)))
+            finally:
+                venv_cache.release(venv_key)
+
+        layers.append(self._create_layer("package", lambda tar: tar.add(package_info.package_dir, arcname="app",
+                                                                        filter=self._reset_owner)))
+
+        tag = re.sub(r"[^A-Za-z0-9_.-]", "-",
+                     f"{package_name}-{package_info.package_entity.version}-{stage}")[:128]
+        try:
+            return self._push_image(base_image, layers, tag)
+        finally:
+            for layer in layers:
+                layer.file.close()
+
+    def _push_image(self, base_image: str, layers: List[Layer], tag: str) -> str:
+        base = ImageReference.parse(base_image)
+        source = RegistryClient(base.registry,
+                                insecure=config.IMAGE_REGISTRY_INSECURE and base.registry == config.IMAGE_REGISTRY)
+        target = RegistryClient(config.IMAGE_REGISTRY, config.IMAGE_REGISTRY_USER,  # type: ignore
+                                config.IMAGE_REGISTRY_PASSWORD, config.IMAGE_REGISTRY_INSECURE, "pull,push")
+
+        manifest, media_type = source.get_manifest(base.repository, base.reference, config.IMAGE_PLATFORM)
+        layer_media_type = LAYER_MEDIA_TYPES.get(media_type)
+        if layer_media_type is None:
+            raise RuntimeError(f"Unsupported manifest type {media_type} for {base_image}")
+
+        for blob in manifest["layers"]:
+            self._copy_blob(source, base.repository, target, blob["digest"])
+
+        with source.get_blob(base.repository, manifest["config"]["digest"]) as response:
+            image_config = response.json()
+
+        now = datetime.now(timezone.utc).isoformat()
+        image_config["created"] = now
+        image_config.setdefault("config", {})["WorkingDir"] = "/app"
+        image_config["rootfs"]["diff_ids"].extend(layer.diff_id for layer in layers)
+        image_config.setdefault("history", []).extend(
+            {"created": now, "created_by": f"lotse: add {layer.name}"} for layer in layers)
+
+        for layer in layers:
+            if not target.has_blob(self.repository, layer.digest):
+                target.upload_blob(self.repository, layer.digest, layer.file, layer.size)
+
+        config_blob = json.dumps(image_config, separators=(",", ":")).encode()
+        config_digest = f"sha256:{hashlib.sha256(config_blob).hexdigest()}"
+        with tempfile.TemporaryFile() as config_file:
+            config_file.write(config_blob)
+            target.upload_blob(self.repository, config_digest, config_file, len(config_blob))
+
+        manifest = {
+            "schemaVersion": 2,
+            "mediaType": media_type,
+            "config": {"mediaType": manifest["config"]["mediaType"], "digest": config_digest,
+                       "size": len(config_blob)},
+            "layers": manifest["layers"] + [
+                {"mediaType": layer_media_type, "digest": layer.digest, "size": layer.size} for layer in layers
+            ]
+        }
+        digest = target.put_manifest(self.repository, tag, manifest)
+        return f"{config.IMAGE_REGISTRY}/{self.repository}@{digest}"
+
+    def _copy_blob(self, source: RegistryClient, source_repository: str, target: RegistryClient, digest: str):
+        if target.has_blob(self.repository, digest):
+            return
+
+        with tempfile.TemporaryFile() as blob_file:
+            with source.get_blob(source_repository, digest) as response:
+                shutil.copyfileobj(response.raw, blob_file)
+            target.upload_blob(self.repository, digest, blob_file, blob_file.tell())
+
+    @staticmethod
+    def _create_layer(name: str, add: Callable[[tarfile.TarFile], None]) -> Layer:
+        layer_file = tempfile.TemporaryFile()
+        try:
+            compressed = _HashingWriter(layer_file)
+            # a fixed gzip timestamp keeps identical content on identical digests across builds
+            with gzip.GzipFile(fileobj=compressed, mode="wb", mtime=0) as gzip_file:  # type: ignore
+                uncompressed = _HashingWriter(gzip_file)
+                with tarfile.open(fileobj=uncompressed, mode="w|", format=tarfile.PAX_FORMAT) as tar:  # type: ignore
+                    add(tar)
+        except Exception:
+            layer_file.close()
+            raise
+
+        return Layer(name, layer_file, f"sha256:{compressed.hash.hexdigest()}",
+                     f"sha256:{uncompressed.hash.hexdigest()}", compressed.size)
+
+    @staticmethod
+    def _reset_owner(member: tarfile.TarInfo) -> tarfile.TarInfo:
+        member.uid = member.gid = 0
+        member.uname = member.gname = "root"
+        return member
+
+    @staticmethod
+    def _add_venv(tar: tarfile.TarFile, archive_path: Path):
+        app_dir = tarfile.TarInfo("app")
+        app_dir.type = tarfile.DIRTYPE
+        app_dir.mode = 0o755
+        tar.addfile(app_dir)
+
+        with tarfile.open(archive_path, mode="r|gz") as venv:
+            for member in venv:
+                name = os.path.normpath(member.name)
+                member.name = "app/venv" if name == "." else f"app/venv/{name}"
+                if member.islnk():
+                    member.linkname = f"app/venv/{os.path.normpath(member.linkname)}"
+
+                tar.addfile(member, venv.extractfile(member) if member.isfile() else None)
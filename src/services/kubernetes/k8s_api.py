@@ -0,0 +1,55 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Generator
+
+from kubernetes import client, config
+
+from src.utils import config as framework_config
+from src.utils.singleton_meta import SingletonMeta
+
+OPERATIONS = ["read", "list", "write", "logs", "metrics"]
+
+
+class K8sApi(metaclass=SingletonMeta):
+    def __init__(self):
+        if framework_config.IS_DEBUG:
+            config.load_kube_config()
+        else:
+            config.load_incluster_config()
+
+        self.max_concurrent_requests = framework_config.K8S_MAX_CONCURRENT_REQUESTS
+        self.core = client.CoreV1Api(self.create_api_client())
+        self.custom = client.CustomObjectsApi(self.create_api_client())
+
+        self._limits: Dict[str, threading.BoundedSemaphore] = {
+            operation: threading.BoundedSemaphore(self.max_concurrent_requests) for operation in OPERATIONS
+        }
+
+        # exec streams swap the request method of their api client while the websocket is opened,
+        # so every concurrent exec handshake needs a client of its own
+        self._exec_clients: queue.LifoQueue[client.CoreV1Api] = queue.LifoQueue()
+        for _ in range(framework_config.K8S_EXEC_POOL_SIZE):
+            self._exec_clients.put(client.CoreV1Api(self.create_api_client()))
+
+    def create_api_client(self) -> client.ApiClient:
+        configuration = client.Configuration.get_default_copy()
+        configuration.connection_pool_maxsize = self.max_concurrent_requests
+        return client.ApiClient(configuration)
+
+    @contextmanager
+    def limit(self, operation: str) -> Generator[None, None, None]:
+        semaphore = self._limits[operation]
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    @contextmanager
+    def exec_api(self) -> Generator[client.CoreV1Api, None, None]:
+        api = self._exec_clients.get()
+        try:
+            yield api
+        finally:
+            self._exec_clients.put(api)
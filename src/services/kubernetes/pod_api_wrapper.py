@@ -1,7 +1,7 @@
 import asyncio
-import re
+import shlex
 from logging import Logger
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from kubernetes import client
 
@@ -9,75 +9,68 @@ from src.database.repositories.task_repository import TaskRepository
 from src.misc.runtime_type import RuntimeType
 from src.misc.task_status import TaskStatus
 from src.models.sync_execution_response import SyncExecutionResponse
-from src.utils import config
+from src.models.yaml_config import Environment, PortDetection
+from src.utils.singleton_meta import get_service_instance
 
-from .pod_executor import PodExecutor
+from .pod_executor import OutputPipeline, PodExecutor
+from .pod_informer import PodInformer, get_pod_phase
+from .pod_log_stream import PodLogStream
 from .pod_manager import PodManager
-from .pod_port_manager import PodPortManager
+from .port_detector import PortDetector
+
+
+def is_container_ready(pod: Optional[Any]) -> bool:
+    if pod and pod.status.container_statuses:  # type: ignore
+        return all(container.ready for container in pod.status.container_statuses)  # type: ignore
+    return False
 
 
 async def wait_for_pod_running(api: client.CoreV1Api, namespace: str, pod_name: str,
                                task_logger: Logger):
+    informer = get_service_instance(PodInformer)
+    last_phase = None
     while True:
-        pod = PodManager.get_pod(api, namespace, pod_name)
-        if pod and pod.status.phase == 'Running':  # type: ignore
+        pod = await informer.wait_for(pod_name, lambda p: get_pod_phase(p) != last_phase)
+        phase = get_pod_phase(pod)
+        if phase == 'Running':
             return True
 
-        # type: ignore
-        task_logger.info(f"Waiting for pod to be running... Current status: {pod.status.phase if pod else 'Unknown'}")
-        await asyncio.sleep(1)
+        if phase in ('Failed', 'Succeeded'):
+            raise RuntimeError(f"Pod {pod_name} stopped before running. Current status: {phase}")
+
+        task_logger.info(f"Waiting for pod to be running... Current status: {phase or 'Unknown'}")
+        last_phase = phase
 
 
 async def check_container_exists(api: client.CoreV1Api, namespace: str, pod_name: str) -> bool:
-    pod = PodManager.get_pod(api, namespace, pod_name)
-    if pod and pod.status.container_statuses:  # type: ignore
-        return all(container.ready for container in pod.status.container_statuses)  # type: ignore
-    return False
+    return is_container_ready(get_service_instance(PodInformer).get_pod(pod_name))
 
 
-async def match_port(pod_name: str, line: str, api: client.CoreV1Api,
-                     namespace: str, task_logger: Logger, task_id: str,
-                     task_manager: TaskRepository) -> bool:
+async def watch_pod(api: client.CoreV1Api, namespace: str, pod_name: str,
+                    task_logger: Logger, task_id: str, task_manager: TaskRepository,
+                    port_detection: Optional[PortDetection] = None) -> Optional[int]:
+    informer = get_service_instance(PodInformer)
+    detector = PortDetector(port_detection or PortDetection(), namespace, pod_name, task_id, task_manager,
+                            task_logger)
+
+    # one follow stream writes the container output to the task log and feeds the port detection
+    log_stream = PodLogStream(namespace, pod_name, OutputPipeline(task_logger.info, detector.feed))
+    log_stream.start()
     try:
-        match = re.search(
-            r'((?:\d{1,3}\.){3}\d{1,3}|(?:\[?[0-9a-fA-F]{1,4}(?::[0-9a-fA-F]{1,4}){7}\]?)):(\d+)', line)
-        if match:
-            url = match.group(1)
-            port = match.group(2)
-            pod = PodManager.get_pod(api, namespace, pod_name)
-            task_logger.info(f"Detected URL: {url}, Port: {port}")
-            task_manager.update_task_ui_info(
-                task_id, True, pod.status.pod_ip, int(port))  # type: ignore
-
-            if config.IS_DEBUG:
-                await PodPortManager.port_forward_local(namespace, pod_name, task_logger,
-                                                        task_id, task_manager, int(port))
-            return True
-    except Exception:
-        pass
-    return False
+        while await check_container_exists(api, namespace, pod_name):
+            await informer.wait_for(pod_name, lambda p: not is_container_ready(p))
 
+        await asyncio.to_thread(PodManager.delete_pod, api, namespace, pod_name, task_logger)
+        return 0
+    finally:
+        log_stream.stop()
 
-async def watch_pod(api: client.CoreV1Api, namespace: str, pod_name: str,
-                    task_logger: Logger, task_id: str, task_manager: TaskRepository) -> Optional[int]:
-    port_matched = False
-    while True:
-        container_exists = await check_container_exists(api, namespace, pod_name)
-        if container_exists:
-            if not port_matched:
-                logs = PodManager.get_pod_logs(api, namespace, pod_name)
-                port_matched = await match_port(
-                    pod_name, logs, api, namespace, task_logger, task_id, task_manager)
-
-            await asyncio.sleep(0.1)
-        else:
-            PodManager.delete_pod(api, namespace, pod_name, task_logger)
-            return 0
-
-
-def start_app(api: client.CoreV1Api, namespace: str, pod_name: str, entry_point: str,
-              args: List[str], task_logger: Logger, task_id: str, task_manager: TaskRepository,
-              runtime: Optional[RuntimeType] = RuntimeType.PYTHON) -> Optional[int]:
+
+async def start_app(api: client.CoreV1Api, namespace: str, pod_name: str, entry_point: str,
+                    args: List[str], task_logger: Logger, task_id: str, task_manager: TaskRepository,
+                    runtime: Optional[RuntimeType] = RuntimeType.PYTHON,
+                    env_vars: Optional[List[Environment]] = None,
+                    port_detection: Optional[PortDetection] = None) -> Optional[int]:
     pre_start_command = None
     match runtime:
         case RuntimeType.PYTHON:
@@ -85,40 +78,45 @@ def start_app(api: client.CoreV1Api, namespace: str, pod_name: str, entry_point:
         case RuntimeType.BINARY:
             pre_start_command = f"chmod +x {entry_point} && ./{entry_point}"
 
-    shell = PodExecutor.get_available_shell(api, namespace, pod_name)
-    exec_command = [shell, '-c', f'cd /app && {pre_start_command} {" ".join(args)}']
+    shell = await asyncio.to_thread(PodExecutor.get_available_shell, namespace, pod_name)
+    exports = "".join(f"export {env_var.name}={shlex.quote(str(env_var.value))} && " for env_var in env_vars or [])
+    exec_command = [shell, '-c', f'{exports}cd /app && {pre_start_command} {" ".join(args)}']
 
     exit_code = None
 
     try:
-        def line_callback(line: str) -> bool:
-            port_matched = False
-            task_logger.info(line)
-            if not port_matched:
-                port_matched = asyncio.run(match_port(
-                    pod_name, line, api, namespace, task_logger, task_id, task_manager))
-            return False
-
-        exit_code = PodExecutor.run_command(api, namespace, pod_name, exec_command, line_callback)
+        detector = PortDetector(port_detection or PortDetection(), namespace, pod_name, task_id, task_manager,
+                                task_logger)
+        line_callback = OutputPipeline(task_logger.info, detector.feed)
+        exit_code = await PodExecutor.exec_command(namespace, pod_name, exec_command, line_callback, line_callback)
     finally:
-        task = task_manager.get_task(task_id)
-        if task is not None and (task.status == TaskStatus.CANCELLED):
-            exit_code = 0
-        else:
-            PodManager.delete_pod(api, namespace, pod_name, task_logger)
-
-            if exit_code is not None and exit_code != 0:
-                task_logger.info(f"Package execution failed with exit code {exit_code}")
-                task_manager.update_task_status(
-                    task_id,
-                    TaskStatus.FAILED,
-                    SyncExecutionResponse(
-                        success=False,
-                        task_id=task_id,
-                        output="",
-                        error=f"Package execution failed with exit code {exit_code}"
-                    ).__dict__
-                )
+        exit_code = await asyncio.to_thread(finish_app, api, namespace, pod_name, task_logger, task_id,
+                                            task_manager, exit_code)
 
     task_logger.info("Application finished")
     return exit_code
+
+
+def finish_app(api: client.CoreV1Api, namespace: str, pod_name: str, task_logger: Logger, task_id: str,
+               task_manager: TaskRepository, exit_code: Optional[int]) -> Optional[int]:
+    task = task_manager.get_task(task_id)
+    if task is not None and (task.status == TaskStatus.CANCELLED):
+        return 0
+
+    PodManager.delete_pod(api, namespace, pod_name, task_logger)
+
+    if exit_code is not None and exit_code != 0:
+        task_logger.info(f"Package execution failed with exit code {exit_code}")
+        task_manager.update_task_status(
+            task_id,
+            TaskStatus.FAILED,
+            SyncExecutionResponse(
+                success=False,
+                task_id=task_id,
+                output="",
+                error=f"Package execution failed with exit code {exit_code}"
+            ).__dict__,
+            [TaskStatus.RUNNING]
+        )
+
+    return exit_code
@@ -1,12 +1,9 @@
-import threading
 from logging import Logger
 
 from kubernetes import client
 
 from .pod_executor import PodExecutor
 
-k8s_api_lock = threading.Lock()
-
 
 class PodEnvironment:
     @staticmethod
@@ -31,7 +28,7 @@ class PodEnvironment:
             logger.info(line)
             return False
 
-        PodExecutor.run_command(api, namespace, pod_name, exec_command, line_callback)
+        PodExecutor.run_command(namespace, pod_name, exec_command, line_callback)
         logger.info(f"SSH server installed in pod {pod_name}")
 
     @staticmethod
@@ -68,5 +65,5 @@ class PodEnvironment:
 
             return False
 
-        PodExecutor.run_command(api, namespace, pod_name, exec_command, line_callback)
+        PodExecutor.run_command(namespace, pod_name, exec_command, line_callback)
         logger.info(f"VSCode server installed and running in pod {pod_name}")
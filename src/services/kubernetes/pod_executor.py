@@ -1,21 +1,34 @@
-import threading
-from typing import Callable, List, Optional
+import asyncio
+import functools
+import inspect
+import json
+import ssl
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from urllib.parse import urlencode
 
-from kubernetes import client
-from kubernetes.stream import stream
+from aiohttp import ClientSession, WSMsgType
+from kubernetes.stream import stream, ws_client
 
-k8s_api_lock = threading.Lock()
+from .k8s_api import K8sApi
+
+EXEC_PROTOCOL = "v4.channel.k8s.io"
+STDOUT_CHANNEL = 1
+STDERR_CHANNEL = 2
+ERROR_CHANNEL = 3
+MAX_LINE_BYTES = 64 * 1024
+
+LineCallback = Callable[[str], Union[Optional[bool], Awaitable[Optional[bool]]]]
 
 
 class PodExecutor:
     @staticmethod
-    def get_available_shell(api: client.CoreV1Api, namespace: str, pod_name: str) -> str:
+    def get_available_shell(namespace: str, pod_name: str) -> str:
         shells = ["/bin/bash", "/bin/sh"]
         for shell in shells:
             try:
-                with k8s_api_lock:
+                with K8sApi().exec_api() as exec_api:
                     check_resp = stream(
-                        api.connect_get_namespaced_pod_exec,
+                        exec_api.connect_get_namespaced_pod_exec,
                         pod_name,
                         namespace,
                         command=["ls", shell],
@@ -24,54 +37,152 @@ class PodExecutor:
                         _preload_content=False
                     )
 
-                    check_resp.run_forever(timeout=2)
-                    if check_resp.returncode == 0:
-                        return shell
+                check_resp.run_forever(timeout=2)
+                if check_resp.returncode == 0:
+                    return shell
             except Exception:
                 continue
 
         return "/bin/sh"
 
     @staticmethod
-    def run_command(api: client.CoreV1Api, namespace: str, pod_name: str,
-                    command: List[str], callback: Optional[Callable[[str], bool]] = None) -> Optional[int]:
-        with k8s_api_lock:
-            resp = stream(
-                api.connect_get_namespaced_pod_exec,
-                pod_name,
-                namespace,
-                command=command,
-                stderr=True,
-                stdin=True,
-                stdout=True,
-                tty=False,
-                _preload_content=False
-            )
-
-        exit_code = None
-        try:
-            while resp.is_open():
-                line = None
-                if resp.peek_stdout():
-                    line = resp.read_stdout()
-
-                if resp.peek_stderr():
-                    line = resp.read_stderr()
-
-                if line:
-                    line = line.strip()
-                    if line is None:
+    def open_stream(namespace: str, pod_name: str, command: List[str], stdin: bool = False,
+                    binary: bool = False, capture_all: bool = True) -> Any:
+        with K8sApi().exec_api() as exec_api:
+            # stream() does not forward capture_all, so the exec client gets the websocket request function itself
+            api_client = exec_api.api_client
+            request = api_client.request
+            api_client.request = functools.partial(ws_client.websocket_call, api_client.configuration,
+                                                   binary=binary, capture_all=capture_all)
+            try:
+                return exec_api.connect_get_namespaced_pod_exec(
+                    pod_name,
+                    namespace,
+                    command=command,
+                    stderr=True,
+                    stdin=stdin,
+                    stdout=True,
+                    tty=False,
+                    _preload_content=False
+                )
+            finally:
+                api_client.request = request
+
+    @staticmethod
+    def run_command(namespace: str, pod_name: str, command: List[str], callback: Optional[LineCallback] = None,
+                    error_callback: Optional[LineCallback] = None) -> Optional[int]:
+        # for worker threads, the exec itself runs on an event loop of the calling thread
+        return asyncio.run(PodExecutor.exec_command(namespace, pod_name, command, callback,
+                                                    error_callback or callback))
+
+    @staticmethod
+    async def exec_command(namespace: str, pod_name: str, command: List[str],
+                           stdout_callback: Optional[LineCallback] = None,
+                           stderr_callback: Optional[LineCallback] = None) -> Optional[int]:
+        configuration = K8sApi().core.api_client.configuration
+        query = urlencode([("command", part) for part in command] + [("stdout", "true"), ("stderr", "true")])
+        url = f"{configuration.host}/api/v1/namespaces/{namespace}/pods/{pod_name}/exec?{query}"
+
+        headers = {}
+        authorization = configuration.get_api_key_with_prefix("authorization")
+        if authorization:
+            headers["Authorization"] = authorization
+
+        streams = {
+            STDOUT_CHANNEL: (LineBuffer(), stdout_callback),
+            STDERR_CHANNEL: (LineBuffer(), stderr_callback),
+        }
+        status = None
+        async with ClientSession() as session:
+            async with session.ws_connect(url, protocols=(EXEC_PROTOCOL,), headers=headers, max_msg_size=0,
+                                          ssl=PodExecutor._get_ssl_context(configuration)) as ws:
+                async for message in ws:
+                    if message.type != WSMsgType.BINARY or not message.data:
                         continue
 
-                    if callback:
-                        close_response = callback(line)
-                        if close_response:
-                            resp.close()
+                    channel, data = message.data[0], message.data[1:]
+                    if channel == ERROR_CHANNEL:
+                        status = json.loads(data)
+                    elif channel in streams:
+                        line_buffer, callback = streams[channel]
+                        if await PodExecutor._deliver(line_buffer.feed(data), callback):
                             return 0
 
-            resp.update(timeout=1)
-            exit_code = resp.returncode
-        finally:
-            resp.close()
+        for line_buffer, callback in streams.values():
+            if await PodExecutor._deliver(line_buffer.flush(), callback):
+                return 0
+
+        return PodExecutor._get_exit_code(status)
+
+    @staticmethod
+    async def _deliver(lines: List[str], callback: Optional[LineCallback]) -> bool:
+        if callback is None:
+            return False
+
+        for line in lines:
+            close_response = callback(line)
+            if inspect.isawaitable(close_response):
+                close_response = await close_response
+            if close_response:
+                return True
+
+        return False
+
+    @staticmethod
+    def _get_ssl_context(configuration: Any) -> Optional[ssl.SSLContext]:
+        if not configuration.host.startswith("https"):
+            return None
+
+        context = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+        if configuration.cert_file:
+            context.load_cert_chain(configuration.cert_file, configuration.key_file)
+        if not configuration.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+        return context
+
+    @staticmethod
+    def _get_exit_code(status: Optional[Dict[str, Any]]) -> Optional[int]:
+        # the status arrives on the error channel right before the exec websocket is closed
+        if status is None:
+            return None
+        if status.get("status") == "Success":
+            return 0
+
+        for cause in (status.get("details") or {}).get("causes") or []:
+            if cause.get("reason") == "ExitCode":
+                return int(cause.get("message"))
+
+        raise RuntimeError(f"Command could not be executed: {status.get('message')}")
+
+
+class LineBuffer:
+    def __init__(self):
+        self.pending = b""
+
+    def feed(self, data: bytes) -> List[str]:
+        *lines, self.pending = (self.pending + data).split(b"\n")
+        if len(self.pending) > MAX_LINE_BYTES:
+            lines.append(self.pending)
+            self.pending = b""
+
+        return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+    def flush(self) -> List[str]:
+        lines = [self.pending.decode("utf-8", errors="replace").rstrip("\r")] if self.pending else []
+        self.pending = b""
+        return lines
+
+
+class OutputPipeline:
+    # stages return True once they need no further lines, they are dropped from then on
+    def __init__(self, *stages: Callable[[str], Optional[bool]]):
+        self.stages = list(stages)
+
+    def __call__(self, line: str) -> bool:
+        for stage in self.stages:
+            if stage(line):
+                self.stages = [other for other in self.stages if other is not stage]
 
-        return exit_code
+        return False
@@ -1,46 +1,188 @@
+import io
+import logging
 import os
-import subprocess
-
-from kubernetes import client
+import shlex
+import tarfile
+import zlib
+from functools import lru_cache
+from typing import Any, List, Optional
 
 from src.services.kubernetes.pod_executor import PodExecutor
+from src.utils import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+DECOMPRESS_COMMANDS = {
+    "gzip": "gzip -dc",
+    "zstd": "zstd -dc",
+}
+
+
+class _FramedStdinWriter(io.RawIOBase):
+    # stdin of an exec websocket cannot be half closed, so the remote side never sees EOF. Compressed data is
+    # therefore sent as the members of a plain tar stream, which tar recognizes as finished by itself.
+    def __init__(self, resp: Any, compression: Optional[str] = None, framed: bool = False):
+        super().__init__()
+        self.resp = resp
+        self.framed = framed or compression is not None
+        self.compressor = None
+        if compression == "gzip":
+            self.compressor = zlib.compressobj(wbits=31)
+        elif compression == "zstd":
+            self.compressor = zstandard.ZstdCompressor().compressobj()  # type: ignore
+
+        self.buffer = bytearray()
+        self.frame_index = 0
+        self.bytes_sent = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore
+        chunk = bytes(data)
+        self.buffer += self.compressor.compress(chunk) if self.compressor else chunk
+        while len(self.buffer) >= CHUNK_SIZE:
+            self._send(bytes(self.buffer[:CHUNK_SIZE]))
+            del self.buffer[:CHUNK_SIZE]
+        return len(chunk)
+
+    def finish(self):
+        if self.compressor:
+            self.buffer += self.compressor.flush()
+        if self.buffer:
+            self._send(bytes(self.buffer))
+            self.buffer.clear()
+
+        if self.framed:
+            end_of_archive = tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+            padding = -(self.bytes_sent + len(end_of_archive)) % tarfile.RECORDSIZE
+            self._write_stdin(end_of_archive + tarfile.NUL * padding)
+
+    def _send(self, data: bytes):
+        if not self.framed:
+            self._write_stdin(data)
+            return
+
+        frame = tarfile.TarInfo(f"{self.frame_index:08d}")
+        frame.size = len(data)
+        self.frame_index += 1
+        padding = -len(data) % tarfile.BLOCKSIZE
+        self._write_stdin(frame.tobuf(format=tarfile.GNU_FORMAT) + data + tarfile.NUL * padding)
+
+    def _write_stdin(self, data: bytes):
+        self.resp.update(timeout=0)
+        self.resp.write_stdin(data)
+        self.bytes_sent += len(data)
 
 
 class PodFileOperations:
+    @staticmethod
+    def _open_stream(namespace: str, pod_name: str, command: str, stdin: bool = False) -> Any:
+        # without capture_all=False the client keeps a copy of all output, which would hold whole archives in memory
+        return PodExecutor.open_stream(namespace, pod_name, ["sh", "-c", command], stdin=stdin, binary=True,
+                                       capture_all=False)
+
+    @staticmethod
+    def _wait_for_completion(resp: Any, command: str, output: Optional[io.BufferedIOBase] = None):
+        errors: List[bytes] = []
+        try:
+            while resp.is_open():
+                resp.update(timeout=1)
+                if output is not None and resp.peek_stdout():
+                    output.write(resp.read_stdout())
+                if resp.peek_stderr():
+                    errors.append(resp.read_stderr())
+
+            if output is not None and resp.peek_stdout():
+                output.write(resp.read_stdout())
+
+            exit_code = resp.returncode
+        finally:
+            resp.close()
+
+        if exit_code != 0:
+            error = b"".join(errors).decode("utf-8", "replace").strip()
+            raise RuntimeError(f"Command '{command}' failed with exit code {exit_code}: {error}")
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _has_zstd(namespace: str, pod_name: str) -> bool:
+        return PodExecutor.run_command(namespace, pod_name, ["sh", "-c", "command -v zstd"]) == 0
+
+    @staticmethod
+    def _get_compression(namespace: str, pod_name: str) -> Optional[str]:
+        compression = config.FILE_TRANSFER_COMPRESSION
+        if compression == "zstd":
+            if zstandard is None or not PodFileOperations._has_zstd(namespace, pod_name):
+                logger.warning("zstd is not available, falling back to gzip compression")
+                compression = "gzip"
+
+        return compression if compression in DECOMPRESS_COMMANDS else None
+
+    @staticmethod
+    def _get_extract_command(dest_path: str, compression: Optional[str]) -> str:
+        extract = f"mkdir -p {shlex.quote(dest_path)} && "
+        if compression is None:
+            return extract + f"tar -xmf - -C {shlex.quote(dest_path)}"
+
+        return extract + (f"tar -xOf - | {DECOMPRESS_COMMANDS[compression]} | "
+                          f"tar -xmf - -C {shlex.quote(dest_path)}")
+
     @staticmethod
     def copy_files_to_pod(namespace: str, pod_name: str, file_to_copy: str, dest_path: str = "/app"):
         is_directory = os.path.isdir(file_to_copy)
+        arcname = "." if is_directory else os.path.basename(file_to_copy)
+
+        compression = PodFileOperations._get_compression(namespace, pod_name)
+        command = PodFileOperations._get_extract_command(dest_path, compression)
 
-        source_dir = os.path.dirname(file_to_copy) if not is_directory else file_to_copy
-        file_name = os.path.basename(file_to_copy) if not is_directory else '.'
+        resp = PodFileOperations._open_stream(namespace, pod_name, command, stdin=True)
+        try:
+            writer = _FramedStdinWriter(resp, compression)
+            with tarfile.open(fileobj=writer, mode="w|", format=tarfile.GNU_FORMAT) as tar:  # type: ignore
+                tar.add(file_to_copy, arcname=arcname)
+            writer.finish()
+        except Exception:
+            resp.close()
+            raise
 
-        kubectl_command = [
-            'kubectl', 'cp',
-            file_name,
-            f"{namespace}/{pod_name}:{dest_path}",
-        ]
-        subprocess.run(kubectl_command, check=True, cwd=source_dir)
+        PodFileOperations._wait_for_completion(resp, command)
 
     @staticmethod
-    def copy_file_from_pod(api: client.CoreV1Api, namespace: str, pod_name: str,
-                           src_path: str, dest_path: str):
-        tar_command = ['tar', 'czf', '/tmp/venv.tar.gz', '-C', src_path, '.']
+    def copy_file_from_pod(namespace: str, pod_name: str, src_path: str, dest_path: str):
+        command = f"tar -czf - -C {shlex.quote(src_path)} ."
+        partial_path = f"{dest_path}.part"
 
-        PodExecutor.run_command(api, namespace, pod_name, tar_command)
+        resp = PodFileOperations._open_stream(namespace, pod_name, command)
+        try:
+            with open(partial_path, "wb") as output:
+                PodFileOperations._wait_for_completion(resp, command, output)
+            os.replace(partial_path, dest_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
 
-        is_directory = os.path.isdir(dest_path)
-        directory_path = os.path.dirname(dest_path) if not is_directory else dest_path
-        file_name = os.path.basename(dest_path) if not is_directory else '.'
+    @staticmethod
+    def extract_archive_to_pod(namespace: str, pod_name: str, archive_path: str, dest_path: str):
+        compression = "zstd" if archive_path.endswith(".zst") else "gzip"
+        command = PodFileOperations._get_extract_command(dest_path, compression)
 
-        kubectl_command = [
-            'kubectl', 'cp',
-            f"{namespace}/{pod_name}:/tmp/venv.tar.gz",
-            file_name
-        ]
-        subprocess.run(kubectl_command, check=True, cwd=directory_path)
+        resp = PodFileOperations._open_stream(namespace, pod_name, command, stdin=True)
+        try:
+            writer = _FramedStdinWriter(resp, framed=True)
+            with open(archive_path, "rb") as archive:
+                while chunk := archive.read(CHUNK_SIZE):
+                    writer.write(chunk)
+            writer.finish()
+        except Exception:
+            resp.close()
+            raise
 
-    @staticmethod
-    def extract_tar_gz(api: client.CoreV1Api, namespace: str, pod_name: str,
-                       src_path: str, dest_path: str):
-        tar_command = ['tar', 'xzf', src_path, '-C', dest_path]
-        PodExecutor.run_command(api, namespace, pod_name, tar_command)
+        PodFileOperations._wait_for_completion(resp, command)
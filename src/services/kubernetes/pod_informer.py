@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
+
+from src.utils.singleton_meta import SingletonMeta
+
+from .k8s_api import K8sApi
+from .pod_manager import APP_LABEL, POOL_POD_APP, TASK_POD_APP, PodManager
+
+logger = logging.getLogger(__name__)
+
+
+def get_pod_phase(pod: Optional[Any]) -> Optional[str]:
+    return pod.status.phase if pod is not None and pod.status else None
+
+
+class PodInformer(metaclass=SingletonMeta):
+    def __init__(self, api: client.CoreV1Api, namespace: str):
+        # a dedicated api client keeps the long running watch off the shared connection pool
+        self.api = client.CoreV1Api(K8sApi().create_api_client())
+        self.fallback_api = api
+        self.namespace = namespace
+        self.label_selector = f"{APP_LABEL} in ({TASK_POD_APP},{POOL_POD_APP})"
+        self._pods: Dict[str, Any] = {}
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_synced(self) -> bool:
+        return self._synced.is_set()
+
+    def start(self, sync_timeout: float = 10):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        if not self._synced.wait(sync_timeout):
+            logger.warning("Pod informer not synced yet, falling back to direct API reads")
+
+    def get_pod(self, pod_name: str) -> Optional[Any]:
+        if not self.is_synced:
+            return PodManager.get_pod(self.fallback_api, self.namespace, pod_name)
+
+        with self._lock:
+            return self._pods.get(pod_name)
+
+    def list_pods(self, predicate: Callable[[Any], bool]) -> Optional[List[Any]]:
+        if not self.is_synced:
+            return None
+
+        with self._lock:
+            return [pod for pod in self._pods.values() if predicate(pod)]
+
+    async def wait_for(self, pod_name: str, predicate: Callable[[Optional[Any]], bool],
+                       timeout: Optional[float] = None) -> Optional[Any]:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        while True:
+            event = asyncio.Event()
+            waiter = (loop, event)
+            with self._lock:
+                self._waiters.setdefault(pod_name, set()).add(waiter)
+
+            try:
+                pod = self.get_pod(pod_name)
+                if predicate(pod):
+                    return pod
+
+                # re-check periodically so callers still make progress while the watch is reconnecting
+                wait_time = 5.0 if self.is_synced else 1.0
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        return pod
+                    wait_time = min(wait_time, remaining)
+
+                try:
+                    await asyncio.wait_for(event.wait(), wait_time)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(pod_name)
+                    if waiters is not None:
+                        waiters.discard(waiter)
+                        if not waiters:
+                            del self._waiters[pod_name]
+
+    def _notify(self, pod_name: str):
+        with self._lock:
+            waiters = list(self._waiters.get(pod_name, ()))
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    def _relist(self) -> str:
+        pods = self.api.list_namespaced_pod(namespace=self.namespace, label_selector=self.label_selector)
+        current = {pod.metadata.name: pod for pod in pods.items}
+        with self._lock:
+            changed = set(self._pods) | set(current)
+            self._pods = current
+
+        self._synced.set()
+        for pod_name in changed:
+            self._notify(pod_name)
+
+        return pods.metadata.resource_version
+
+    def _run(self):
+        resource_version = None
+        while True:
+            try:
+                if resource_version is None:
+                    resource_version = self._relist()
+
+                pod_watch = watch.Watch()
+                for event in pod_watch.stream(self.api.list_namespaced_pod,
+                                              namespace=self.namespace,
+                                              label_selector=self.label_selector,
+                                              resource_version=resource_version,
+                                              timeout_seconds=300):
+                    pod = event['object']
+                    pod_name = pod.metadata.name
+                    resource_version = pod.metadata.resource_version
+                    with self._lock:
+                        if event['type'] == 'DELETED':
+                            self._pods.pop(pod_name, None)
+                        else:
+                            self._pods[pod_name] = pod
+
+                    self._notify(pod_name)
+            except ApiException as e:
+                if e.status == 410:
+                    resource_version = None
+                    continue
+
+                logger.error(f"Pod informer watch failed: {e}")
+                resource_version = None
+                time.sleep(1)
+            except Exception as e:
+                logger.error(f"Pod informer watch failed: {str(e)}")
+                resource_version = None
+                time.sleep(1)
@@ -0,0 +1,111 @@
+import logging
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from kubernetes import client
+
+from src.utils import config
+from src.utils.singleton_meta import get_service_instance
+
+from .k8s_api import K8sApi
+from .pod_informer import PodInformer, get_pod_phase
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class PodLogStream:
+    def __init__(self, namespace: str, pod_name: str, on_line: Callable[[str], Any],
+                 since: Optional[datetime] = None):
+        # a dedicated api client keeps the long running stream off the shared connection pool
+        self.api = client.CoreV1Api(K8sApi().create_api_client())
+        self.namespace = namespace
+        self.pod_name = pod_name
+        self.on_line = on_line
+        self.last_timestamp = since
+        self._lines_at_last_timestamp = 0
+        self._skip_at_last_timestamp = 0
+        self._response: Optional[Any] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._follow()
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.debug(f"Log stream of pod {self.pod_name} interrupted: {str(e)}")
+
+            # the stream also ends when the container restarts, it is only over with the pod
+            phase = get_pod_phase(get_service_instance(PodInformer).get_pod(self.pod_name))
+            if phase is None or phase in ("Failed", "Succeeded"):
+                break
+
+            self._stop.wait(config.POD_LOG_RECONNECT_DELAY_SECONDS)
+
+    def _follow(self):
+        since_seconds = None
+        if self.last_timestamp is not None:
+            # the api only resumes at whole seconds, lines up to the last timestamp are dropped again below
+            elapsed = (datetime.now(timezone.utc) - self.last_timestamp).total_seconds()
+            since_seconds = max(1, math.ceil(elapsed) + 1)
+            self._skip_at_last_timestamp = self._lines_at_last_timestamp
+
+        with K8sApi().limit("logs"):
+            response = self.api.read_namespaced_pod_log(name=self.pod_name, namespace=self.namespace, follow=True,
+                                                        timestamps=True, since_seconds=since_seconds,
+                                                        _preload_content=False)
+        self._response = response
+        try:
+            pending = b""
+            for chunk in response.stream(STREAM_CHUNK_SIZE):
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    self._handle_line(line.decode("utf-8", errors="replace"))
+
+            if pending:
+                self._handle_line(pending.decode("utf-8", errors="replace"))
+        finally:
+            self._response = None
+            response.release_conn()
+
+    def _handle_line(self, line: str):
+        raw_timestamp, _, message = line.partition(" ")
+        try:
+            timestamp = datetime.fromisoformat(raw_timestamp)
+        except ValueError:
+            self.on_line(line.rstrip("\r"))
+            return
+
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            if timestamp < self.last_timestamp:
+                return
+
+            if self._skip_at_last_timestamp > 0:
+                self._skip_at_last_timestamp -= 1
+                return
+            self._lines_at_last_timestamp += 1
+        else:
+            self.last_timestamp = timestamp
+            self._lines_at_last_timestamp = 1
+            self._skip_at_last_timestamp = 0
+
+        self.on_line(message.rstrip("\r"))
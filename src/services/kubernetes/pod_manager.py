@@ -1,7 +1,6 @@
 import os
-import threading
 from logging import Logger
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 from kubernetes import client
 from kubernetes.client.rest import ApiException
@@ -13,16 +12,22 @@ from src.models.yaml_config import Environment
 from src.services.kubernetes.pod_port_manager import PodPortManager
 from src.utils import config
 
+from .k8s_api import K8sApi
 from .pod_resource_parser import PodResourceParser
 
-k8s_api_lock = threading.Lock()
+APP_LABEL = "app"
+TASK_ID_LABEL = "lotse/task-id"
+POOL_KEY_LABEL = "lotse/pool-key"
+TASK_POD_APP = "lotse-package"
+POOL_POD_APP = "lotse-pool"
+VENV_PATH = "/app/venv"
 
 
 class PodManager:
     @staticmethod
     def get_pod(api: client.CoreV1Api, namespace: str, pod_name: str) -> Optional[Any]:
         try:
-            with k8s_api_lock:
+            with K8sApi().limit("read"):
                 pod = api.read_namespaced_pod(name=pod_name, namespace=namespace)
                 return pod
         except ApiException as e:
@@ -34,16 +39,17 @@ class PodManager:
     @staticmethod
     def get_running_pods(api: client.CoreV1Api, namespace: str) -> List[str]:
         try:
-            with k8s_api_lock:
-                pods = api.list_namespaced_pod(namespace=namespace, label_selector="app=lotse-package")
-                return [pod.metadata.name for pod in pods.items if pod.status.phase == 'Running']
+            with K8sApi().limit("list"):
+                pods = api.list_namespaced_pod(namespace=namespace, label_selector=f"{APP_LABEL}={TASK_POD_APP}")
+                return [(pod.metadata.labels or {}).get(TASK_ID_LABEL, pod.metadata.name)
+                        for pod in pods.items if pod.status.phase == 'Running']
         except ApiException as e:
             raise RuntimeError(f"Error fetching running pods: {e}") from e
 
     @staticmethod
     def get_pod_metrics(api: client.CustomObjectsApi, namespace: str, pod_name: str) -> Optional[PodMetrics]:
         try:
-            with k8s_api_lock:
+            with K8sApi().limit("metrics"):
                 metrics = api.get_namespaced_custom_object(
                     group="metrics.k8s.io",
                     version="v1beta1",
@@ -63,12 +69,12 @@ class PodManager:
                 raise RuntimeError(f"Error fetching pod metrics: {e}") from e
 
     @staticmethod
-    def create_pod(api: client.CoreV1Api, namespace: str, pod_name: str, python_version: str,
-                   env_vars: List[Environment], logger: Logger, volumes: List[VolumeMap],
-                   image: Optional[str], runtime: Optional[RuntimeType], empty_instance: bool):
-        if env_vars is None:
-            env_vars = []
+    def get_image(python_version: str, image: Optional[str]) -> str:
+        return image if image else f"python:{python_version}-slim"
 
+    @staticmethod
+    def get_env_vars(pod_name: str, env_vars: Optional[List[Environment]]) -> List[Environment]:
+        env_vars = list(env_vars) if env_vars else []
         env_vars.append(Environment("PYTHONUNBUFFERED", "1"))
         env_vars.append(Environment("PROXY_PREFIX", f"{config.OPENAPI_PREFIX_PATH}/proxy/{pod_name}/"))
 
@@ -76,49 +82,61 @@ class PodManager:
             if os.environ.get(env_var):
                 env_vars.append(Environment(env_var, os.environ[env_var]))
 
+        return env_vars
+
+    @staticmethod
+    def build_pod_manifest(pod_name: str, image: str, env_vars: List[Environment], volumes: List[VolumeMap],
+                           labels: Dict[str, str], command: Optional[List[str]] = None,
+                           mount_workdir: bool = True, mount_venv_dir: bool = True) -> Dict[str, Any]:
         env_var_list = [{"name": env_var.name, "value": env_var.value} for env_var in env_vars]
 
-        volume_mounts = [
-            {"name": "workdir", "mountPath": "/app"},
-            {"name": "venv", "mountPath": "/app/venv"}
-        ]
-        volumes_list = [
-            {"name": "workdir", "emptyDir": {}},
-            {"name": "venv", "emptyDir": {}}
-        ]
+        volume_mounts: List[Dict[str, Any]] = []
+        volumes_list: List[Dict[str, Any]] = []
+        if mount_workdir:
+            volume_mounts.append({"name": "workdir", "mountPath": "/app"})
+            volumes_list.append({"name": "workdir", "emptyDir": {}})
+
+        if mount_workdir and mount_venv_dir and not any(volume.path == VENV_PATH for volume in volumes):
+            volume_mounts.append({"name": "venv", "mountPath": VENV_PATH})
+            volumes_list.append({"name": "venv", "emptyDir": {}})
 
         for volume in volumes:
-            volume_mounts.append({
-                "name": volume.name.lower(),
+            volume_name = volume.name.lower()
+            volume_mount: Dict[str, Any] = {
+                "name": volume_name,
                 "mountPath": volume.path
-            })
-            volumes_list.append({
-                "name": volume.name.lower(),
-                "persistentVolumeClaim": {
-                    "claimName": volume.pvc_name
-                }
-            })
-
-        image_to_use = image if image else f"python:{python_version}-slim"
+            }
+            if volume.sub_path:
+                volume_mount["subPath"] = volume.sub_path
+            if volume.read_only:
+                volume_mount["readOnly"] = True
+            volume_mounts.append(volume_mount)
+
+            if not any(existing["name"] == volume_name for existing in volumes_list):
+                volumes_list.append({
+                    "name": volume_name,
+                    "persistentVolumeClaim": {
+                        "claimName": volume.pvc_name
+                    }
+                })
+
         container = {
             "name": pod_name,
-            "image": image_to_use,
+            "image": image,
             "volumeMounts": volume_mounts,
             "env": env_var_list,
             "imagePullPolicy": "IfNotPresent"
         }
 
-        if runtime != RuntimeType.CONTAINER or empty_instance:
-            container["command"] = ["sleep", "infinity"]
+        if command:
+            container["command"] = command
 
-        pod_manifest = {
+        return {
             "apiVersion": "v1",
             "kind": "Pod",
             "metadata": {
                 "name": pod_name,
-                "labels": {
-                    "app": "lotse-package",
-                }
+                "labels": labels
             },
             "spec": {
                 "containers": [container],
@@ -126,21 +144,92 @@ class PodManager:
             }
         }
 
+    @staticmethod
+    def create_pod(api: client.CoreV1Api, namespace: str, pod_name: str, python_version: str,
+                   env_vars: List[Environment], logger: Logger, volumes: List[VolumeMap],
+                   image: Optional[str], runtime: Optional[RuntimeType], empty_instance: bool,
+                   baked_image: bool = False):
+        command = None
+        if runtime != RuntimeType.CONTAINER or empty_instance:
+            command = ["sleep", "infinity"]
+
+        pod_manifest = PodManager.build_pod_manifest(
+            pod_name,
+            PodManager.get_image(python_version, image),
+            PodManager.get_env_vars(pod_name, env_vars),
+            volumes,
+            {APP_LABEL: TASK_POD_APP, TASK_ID_LABEL: pod_name},
+            command,
+            mount_workdir=not baked_image
+        )
+
         try:
-            with k8s_api_lock:
+            with K8sApi().limit("write"):
                 api.create_namespaced_pod(namespace=namespace, body=pod_manifest)
             logger.info(f"Pod created successfully in namespace {namespace}")
         except ApiException as e:
             logger.error(f"Error creating pod: {e}")
             raise
 
+    @staticmethod
+    def create_pool_pod(api: client.CoreV1Api, namespace: str, pod_name: str, image: str, pool_key: str,
+                        volumes: List[VolumeMap], mount_venv_dir: bool = True):
+        pod_manifest = PodManager.build_pod_manifest(
+            pod_name,
+            image,
+            PodManager.get_env_vars(pod_name, []),
+            volumes,
+            {APP_LABEL: POOL_POD_APP, POOL_KEY_LABEL: pool_key},
+            ["sleep", "infinity"],
+            mount_venv_dir=mount_venv_dir
+        )
+
+        with K8sApi().limit("write"):
+            api.create_namespaced_pod(namespace=namespace, body=pod_manifest)
+
+    @staticmethod
+    def list_pool_pods(api: client.CoreV1Api, namespace: str, pool_key: Optional[str] = None) -> List[Any]:
+        label_selector = f"{APP_LABEL}={POOL_POD_APP}"
+        if pool_key:
+            label_selector += f",{POOL_KEY_LABEL}={pool_key}"
+
+        with K8sApi().limit("list"):
+            pods = api.list_namespaced_pod(namespace=namespace, label_selector=label_selector)
+        return [pod for pod in pods.items if pod.metadata.deletion_timestamp is None]
+
+    @staticmethod
+    def list_claimed_pool_pods(api: client.CoreV1Api, namespace: str) -> Dict[str, str]:
+        with K8sApi().limit("list"):
+            pods = api.list_namespaced_pod(namespace=namespace,
+                                           label_selector=f"{APP_LABEL}={TASK_POD_APP},{POOL_KEY_LABEL}")
+        return {pod.metadata.labels[TASK_ID_LABEL]: pod.metadata.name for pod in pods.items
+                if TASK_ID_LABEL in pod.metadata.labels}
+
+    @staticmethod
+    def claim_pool_pod(api: client.CoreV1Api, namespace: str, pod: Any, task_id: str) -> bool:
+        body = {
+            "metadata": {
+                "resourceVersion": pod.metadata.resource_version,
+                "labels": {APP_LABEL: TASK_POD_APP, TASK_ID_LABEL: task_id}
+            }
+        }
+
+        try:
+            with K8sApi().limit("write"):
+                api.patch_namespaced_pod(name=pod.metadata.name, namespace=namespace, body=body)
+            return True
+        except ApiException as e:
+            if e.status in (404, 409):
+                return False
+            raise
+
     @staticmethod
     def delete_pod(api: client.CoreV1Api, namespace: str, pod_name: str,
                    logger: Optional[Logger] = None):
         try:
             PodPortManager.terminate_port_forward(pod_name)
 
-            with k8s_api_lock:
+            with K8sApi().limit("write"):
                 api.delete_namespaced_pod(
                     name=pod_name,
                     namespace=namespace,
@@ -156,12 +245,3 @@ class PodManager:
         except ApiException as e:
             if logger:
                 logger.error(f"Error deleting pod: {e}")
-
-    @staticmethod
-    def get_pod_logs(api: client.CoreV1Api, namespace: str, pod_name: str) -> str:
-        try:
-            with k8s_api_lock:
-                logs = api.read_namespaced_pod_log(name=pod_name, namespace=namespace)
-                return logs
-        except Exception:
-            return ""
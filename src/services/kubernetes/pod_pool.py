@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from logging import Logger
+from typing import Any, Dict, List, Optional
+
+from kubernetes import client
+
+from src.misc.runtime_type import RuntimeType
+from src.models.k8s.volume_map import VolumeMap
+from src.utils import config
+from src.utils.name_generator import generate_name
+from src.utils.singleton_meta import SingletonMeta
+
+from .pod_informer import PodInformer
+from .pod_manager import APP_LABEL, POOL_KEY_LABEL, POOL_POD_APP, TASK_ID_LABEL, PodManager
+from .runtimes import python_pod
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolEntry:
+    image: str
+    python_version: Optional[str]
+    last_used: float
+    pinned: bool = False
+
+
+class PodPool(metaclass=SingletonMeta):
+    def __init__(self, api: client.CoreV1Api, namespace: str):
+        self.api = api
+        self.namespace = namespace
+        self.size = config.POD_POOL_SIZE
+        self.idle_timeout = config.POD_POOL_IDLE_TIMEOUT_SECONDS
+        self.refill_interval = config.POD_POOL_REFILL_INTERVAL_SECONDS
+        self._entries: Dict[str, PoolEntry] = {}
+        self._claimed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._refill_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.informer = PodInformer(api, namespace)
+
+        for image in config.POD_POOL_IMAGES:
+            self._entries[self.get_pool_key(image)] = PoolEntry(image, None, time.time(), pinned=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    @staticmethod
+    def get_pool_key(image: str) -> str:
+        return hashlib.sha256(image.encode()).hexdigest()[:16]
+
+    def is_eligible(self, runtime: Optional[RuntimeType], volumes: List[VolumeMap], empty_instance: bool) -> bool:
+        return (self.enabled and not empty_instance and len(volumes) == 0 and
+                runtime in (RuntimeType.PYTHON, RuntimeType.BINARY))
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info(f"Pod pool started with {self.size} idle pod(s) per image")
+
+    def restore_claims(self):
+        if not self.enabled:
+            return
+
+        claimed = PodManager.list_claimed_pool_pods(self.api, self.namespace)
+        with self._lock:
+            self._claimed.update(claimed)
+
+    def get_pod_name(self, task_id: str) -> str:
+        with self._lock:
+            pod_name = self._claimed.get(task_id)
+        if pod_name is not None or not self.enabled:
+            return pod_name or task_id
+
+        # a pod claimed by another replica is only known through the claim labels on the pod itself
+        def is_claimed_by_task(pod: Any) -> bool:
+            labels = pod.metadata.labels or {}
+            return labels.get(TASK_ID_LABEL) == task_id and POOL_KEY_LABEL in labels
+
+        pods = self.informer.list_pods(is_claimed_by_task)
+        if pods is None:
+            return PodManager.list_claimed_pool_pods(self.api, self.namespace).get(task_id, task_id)
+        return pods[0].metadata.name if pods else task_id
+
+    def release(self, task_id: str):
+        with self._lock:
+            self._claimed.pop(task_id, None)
+
+    def claim(self, python_version: str, image: Optional[str], task_id: str,
+              task_logger: Logger) -> Optional[str]:
+        image_to_use = PodManager.get_image(python_version, image)
+        pool_key = self.get_pool_key(image_to_use)
+
+        with self._lock:
+            entry = self._entries.get(pool_key)
+            if entry is None:
+                self._entries[pool_key] = PoolEntry(image_to_use, python_version, time.time())
+            else:
+                entry.last_used = time.time()
+
+        try:
+            candidates = [pod for pod in self._list_pool_pods(pool_key) if pod.status.phase == 'Running']
+            for pod in candidates:
+                if PodManager.claim_pool_pod(self.api, self.namespace, pod, task_id):
+                    with self._lock:
+                        self._claimed[task_id] = pod.metadata.name
+                    task_logger.info(f"Claimed warm pod {pod.metadata.name} for image {image_to_use}")
+                    return pod.metadata.name
+        except Exception as e:
+            logger.error(f"Error claiming pod from pool: {str(e)}")
+        finally:
+            self._refill_event.set()
+
+        task_logger.info(f"No warm pod available for image {image_to_use}")
+        return None
+
+    def _run(self):
+        while True:
+            try:
+                self._refill()
+            except Exception as e:
+                logger.error(f"Error refilling pod pool: {str(e)}")
+
+            self._refill_event.wait(self.refill_interval)
+            self._refill_event.clear()
+
+    def _refill(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items()
+                       if not entry.pinned and now - entry.last_used > self.idle_timeout]
+            for key in expired:
+                del self._entries[key]
+            entries = dict(self._entries)
+
+        pool_pods = self._list_pool_pods()
+        pods_by_key: Dict[str, list] = {}
+        for pod in pool_pods:
+            if pod.status.phase not in ('Pending', 'Running'):
+                PodManager.delete_pod(self.api, self.namespace, pod.metadata.name)
+                continue
+
+            pods_by_key.setdefault(pod.metadata.labels.get(POOL_KEY_LABEL), []).append(pod)
+
+        for key, pods in pods_by_key.items():
+            if key in entries:
+                continue
+
+            for pod in pods:
+                age = (datetime.now(timezone.utc) - pod.metadata.creation_timestamp).total_seconds()
+                if key in expired or age > self.idle_timeout:
+                    PodManager.delete_pod(self.api, self.namespace, pod.metadata.name)
+
+        shared_volume = None
+        if any(self.size > len(pods_by_key.get(key, [])) for key in entries):
+            shared_volume = python_pod.get_shared_venv_volume()
+            if shared_volume is not None:
+                shared_volume = replace(shared_volume, read_only=True)
+
+        volumes = [shared_volume] if shared_volume is not None else []
+        for key, entry in entries.items():
+            for _ in range(self.size - len(pods_by_key.get(key, []))):
+                pod_name = generate_name("lotse-pool")
+                # pods with the shared venv volume link the venv into place instead of extracting it
+                PodManager.create_pool_pod(self.api, self.namespace, pod_name, entry.image, key,
+                                           volumes, shared_volume is None)
+                logger.info(f"Created warm pod {pod_name} for image {entry.image}")
+
+    def _list_pool_pods(self, pool_key: Optional[str] = None) -> List[Any]:
+        def is_pool_pod(pod: Any) -> bool:
+            labels = pod.metadata.labels or {}
+            return (labels.get(APP_LABEL) == POOL_POD_APP and pod.metadata.deletion_timestamp is None and
+                    (pool_key is None or labels.get(POOL_KEY_LABEL) == pool_key))
+
+        pods = self.informer.list_pods(is_pool_pod)
+        if pods is None:
+            pods = PodManager.list_pool_pods(self.api, self.namespace, pool_key)
+        return pods
@@ -1,12 +1,10 @@
 import asyncio
 import re
-import threading
 from logging import Logger
 from typing import Dict, Optional, Tuple
 
 from src.database.repositories.task_repository import TaskRepository
 
-k8s_api_lock = threading.Lock()
 port_forwards: Dict[str, asyncio.subprocess.Process] = {}  # pylint: disable=E1101
 
 
@@ -0,0 +1,106 @@
+import asyncio
+import re
+from logging import Logger
+from typing import Optional
+
+import httpx
+
+from src.database.repositories.task_repository import TaskRepository
+from src.misc.task_status import TaskStatus
+from src.models.yaml_config import PortDetection
+from src.services.execution_scheduler import ExecutionScheduler
+from src.utils import config, global_queue_handler
+from src.utils.singleton_meta import get_service_instance
+
+from .pod_informer import PodInformer
+from .pod_port_manager import PodPortManager
+
+DEFAULT_PORT_PATTERN = r'((?:\d{1,3}\.){3}\d{1,3}|(?:\[?[0-9a-fA-F]{1,4}(?::[0-9a-fA-F]{1,4}){7}\]?)):(\d+)'
+
+
+class PortDetector:
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def bind_loop(cls):
+        # readiness probes run on the application loop, the async engine's connections belong to it
+        cls.loop = asyncio.get_running_loop()
+
+    def __init__(self, settings: PortDetection, namespace: str, pod_name: str, task_id: str,
+                 task_manager: TaskRepository, task_logger: Logger):
+        self.settings = settings
+        self.namespace = namespace
+        self.pod_name = pod_name
+        self.task_id = task_id
+        self.task_manager = task_manager
+        self.task_logger = task_logger
+        self.pattern = re.compile(settings.pattern or DEFAULT_PORT_PATTERN)
+        # a group named port wins, otherwise the last group of the pattern holds the port
+        self.port_group = "port" if "port" in self.pattern.groupindex else self.pattern.groups
+        self.detected = False
+
+        if settings.port is not None:
+            self._on_port(settings.port)
+
+    def feed(self, line: str) -> bool:
+        if self.detected:
+            return True
+
+        match = self.pattern.search(line)
+        if match is None:
+            return False
+
+        try:
+            port = int(match.group(self.port_group))
+        except (IndexError, TypeError, ValueError):
+            return False
+
+        self._on_port(port)
+        return True
+
+    def _on_port(self, port: int):
+        self.detected = True
+        pod = get_service_instance(PodInformer).get_pod(self.pod_name)
+        if pod is None or not pod.status.pod_ip:
+            self.task_logger.warning(f"Detected port {port}, but pod {self.pod_name} has no address")
+            return
+
+        if self.settings.readiness_path and not config.IS_DEBUG and PortDetector.loop is not None:
+            self.task_logger.info(f"Detected port {port}, waiting for {self.settings.readiness_path} to be ready")
+            # a probe can wait for minutes, so it runs as its own task instead of holding a global queue slot
+            asyncio.run_coroutine_threadsafe(self._probe(pod.status.pod_ip, port), PortDetector.loop)
+        else:
+            self._publish(pod.status.pod_ip, port)
+
+    def _publish(self, address: str, port: int):
+        self.task_logger.info(f"Detected URL: {address}, Port: {port}")
+        self.task_manager.update_task_ui_info(self.task_id, True, address, port)
+        ExecutionScheduler().release(self.task_id)
+
+        if config.IS_DEBUG:
+            global_queue_handler.GlobalQueueHandlerSingleton.get_instance().enqueue(
+                PodPortManager.port_forward_local, self.namespace, self.pod_name, self.task_logger,
+                self.task_id, self.task_manager, port)
+
+    async def _probe(self, address: str, port: int):
+        url = f"http://{address}:{port}/{(self.settings.readiness_path or '').lstrip('/')}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.PORT_PROBE_TIMEOUT_SECONDS
+
+        async with httpx.AsyncClient(timeout=config.PORT_PROBE_INTERVAL_SECONDS * 5, trust_env=False) as client:
+            while loop.time() < deadline:
+                task = await self.task_manager.get_task_async(self.task_id)
+                if task is None or task.status != TaskStatus.RUNNING:
+                    return
+
+                try:
+                    response = await client.get(url)
+                    if response.status_code < 500:
+                        await asyncio.to_thread(self._publish, address, port)
+                        return
+                except httpx.HTTPError:
+                    pass
+
+                await asyncio.sleep(config.PORT_PROBE_INTERVAL_SECONDS)
+
+        self.task_logger.warning(f"Port {port} did not get ready within {config.PORT_PROBE_TIMEOUT_SECONDS:.0f}s")
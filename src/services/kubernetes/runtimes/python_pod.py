@@ -1,23 +1,31 @@
 import asyncio
 import logging
-import os
+from dataclasses import replace
 from logging import Logger
+from typing import Optional
 
 from kubernetes import client
 
+from src.database.repositories.volume_repository import VolumeRepository
 from src.misc.runtime_type import RuntimeType
-from src.models.yaml_config import PackageConfig
+from src.models.k8s.volume_map import VolumeMap
+from src.models.yaml_config import PackageConfig, Volume
 from src.services.kubernetes import pod_api_wrapper
 from src.services.kubernetes.pod_executor import PodExecutor
 from src.services.kubernetes.pod_file_operations import PodFileOperations
-from src.services.kubernetes.pod_manager import PodManager
+from src.services.kubernetes.pod_manager import VENV_PATH, PodManager
 from src.services.package_service import PackageInfo
-from src.utils.path_manager import PathManager
+from src.services.venv_cache_service import VenvCacheService
+from src.utils import config
+
+logger = logging.getLogger(__name__)
+
+SHARED_VENVS_PATH = "/opt/lotse/venvs"
 
 
 def setup_venv(api: client.CoreV1Api, namespace: str, pod_name: str,
                requirements_path: str, logger: Logger):
-    shell_to_use = PodExecutor.get_available_shell(api, namespace, pod_name)
+    shell_to_use = PodExecutor.get_available_shell(namespace, pod_name)
     exec_command = [
         shell_to_use, '-c',
         f'python -m venv /app/venv && . /app/venv/bin/activate && '
@@ -32,7 +40,7 @@ def setup_venv(api: client.CoreV1Api, namespace: str, pod_name: str,
 
         return False
 
-    exit_code = PodExecutor.run_command(api, namespace, pod_name, exec_command, line_callback)
+    exit_code = PodExecutor.run_command(namespace, pod_name, exec_command, line_callback)
     if exit_code is not None and exit_code != 0:
         message = f"Virtual environment setup failed with exit code {exit_code}"
         logger.error(message)
@@ -48,42 +56,106 @@ def prepare_environment(v1: client.CoreV1Api,
                         package_name: str,
                         stage: str,
                         package_info: PackageInfo,
-                        package_config: PackageConfig) -> None:
-    venv_path = PathManager.get_venv_path(
-        package_name,
-        package_info.package_entity.version,
-        stage)
-    if not os.path.exists(venv_path):
-        os.makedirs(venv_path, exist_ok=True)
-
-    tar_file_path = os.path.join(venv_path, "venv.tar.gz")
-    if not os.path.exists(tar_file_path):
-        PodManager.create_pod(v1, namespace, task_id,
-                              package_info.package_entity.python_version, [], task_logger, [],
-                              package_config.image, RuntimeType.PYTHON, False)
-        asyncio.run(pod_api_wrapper.wait_for_pod_running(v1, namespace, task_id, task_logger))
-        PodFileOperations.copy_files_to_pod(namespace, task_id, str(package_info.package_dir), "/app")
-        setup_venv(v1, namespace, task_id, "/app/requirements.txt", task_logger)
-        PodFileOperations.copy_file_from_pod(v1, namespace, task_id, "/app/venv",
-                                             tar_file_path)
-        PodManager.delete_pod(v1, namespace, task_id, task_logger)
-
-
-def prepare_runtime(v1: client.CoreV1Api,
-                    namespace: str,
-                    task_id: str,
+                        package_config: PackageConfig) -> str:
+    venv_cache = VenvCacheService()
+    python_version = package_info.package_entity.python_version
+    image = PodManager.get_image(python_version, package_config.image)
+    venv_key = venv_cache.get_cache_key(python_version, image, package_info.requirements_path)
+    venv_cache.acquire(venv_key)
+
+    try:
+        tar_file_path = venv_cache.get_archive_path(venv_key)
+        built = False
+        with venv_cache.build_lock(venv_key):
+            shared_volume = get_shared_venv_volume()
+            needs_build = not tar_file_path.exists()
+            needs_publish = shared_volume is not None and not venv_cache.is_published(venv_key)
+
+            if not needs_build:
+                task_logger.info(f"Using cached virtual environment {venv_key[:12]}")
+
+            if needs_build or needs_publish:
+                volumes = [shared_volume] if shared_volume is not None and needs_publish else []
+                PodManager.create_pod(v1, namespace, task_id, python_version, [], task_logger, volumes,
+                                      package_config.image, RuntimeType.PYTHON, False)
+                asyncio.run(pod_api_wrapper.wait_for_pod_running(v1, namespace, task_id, task_logger))
+
+                if needs_build:
+                    task_logger.info(f"Building virtual environment {venv_key[:12]}")
+                    tar_file_path.parent.mkdir(parents=True, exist_ok=True)
+                    PodFileOperations.copy_files_to_pod(namespace, task_id, str(package_info.package_dir), "/app")
+                    setup_venv(v1, namespace, task_id, "/app/requirements.txt", task_logger)
+                    PodFileOperations.copy_file_from_pod(namespace, task_id, VENV_PATH, str(tar_file_path))
+                    built = True
+                else:
+                    PodFileOperations.extract_archive_to_pod(namespace, task_id, str(tar_file_path), VENV_PATH)
+
+                if needs_publish:
+                    publish_venv(namespace, task_id, venv_key, task_logger)
+
+                PodManager.delete_pod(v1, namespace, task_id, task_logger)
+
+        venv_cache.add_reference(venv_key, package_name, package_info.package_entity.version, stage)
+        if built:
+            venv_cache.evict()
+    except Exception:
+        venv_cache.release(venv_key)
+        raise
+
+    return venv_key
+
+
+def get_shared_venv_volume(venv_key: Optional[str] = None) -> Optional[VolumeMap]:
+    if not config.VENV_VOLUME_NAME:
+        return None
+
+    volume_maps = VolumeRepository.get_volume_maps([Volume(config.VENV_VOLUME_NAME, SHARED_VENVS_PATH)])
+    if len(volume_maps) == 0:
+        logger.warning(f"Shared venv volume {config.VENV_VOLUME_NAME} is not registered")
+        return None
+
+    if venv_key is None:
+        return volume_maps[0]
+
+    if not VenvCacheService().is_published(venv_key):
+        return None
+
+    return replace(volume_maps[0], path=VENV_PATH, sub_path=venv_key, read_only=True)
+
+
+def publish_venv(namespace: str, pod_name: str, venv_key: str, task_logger: logging.Logger):
+    target_path = f"{SHARED_VENVS_PATH}/{venv_key}"
+    # copy next to the target first so pods never mount a partially written venv
+    exec_command = [
+        "sh", "-c",
+        f"if [ ! -d {target_path} ]; then rm -rf {target_path}.tmp && cp -a {VENV_PATH} {target_path}.tmp && "
+        f"mv {target_path}.tmp {target_path}; fi"
+    ]
+
+    exit_code = PodExecutor.run_command(namespace, pod_name, exec_command)
+    if exit_code is not None and exit_code != 0:
+        raise RuntimeError(f"Publishing virtual environment failed with exit code {exit_code}")
+
+    VenvCacheService().mark_published(venv_key)
+    task_logger.info(f"Published virtual environment {venv_key[:12]} to shared volume")
+
+
+def prepare_runtime(namespace: str,
+                    pod_name: str,
                     task_logger: logging.Logger,
-                    package_name: str,
-                    stage: str,
-                    package_info: PackageInfo) -> None:
-    venv_path = PathManager.get_venv_path(
-        package_name,
-        package_info.package_entity.version,
-        stage
-    )
-    tar_file_path = os.path.join(venv_path, "venv.tar.gz")
-
-    task_logger.info(f"Copying venv files to pod {task_id}")
-    PodFileOperations.copy_files_to_pod(namespace, task_id, tar_file_path, "/tmp")
-    task_logger.info(f"Extracting venv files in pod {task_id}")
-    PodFileOperations.extract_tar_gz(v1, namespace, task_id, "/tmp/venv.tar.gz", "/app/venv")
+                    venv_key: str,
+                    venv_mounted: bool = False) -> None:
+    if venv_mounted:
+        task_logger.info(f"Using shared virtual environment {venv_key[:12]}")
+        return
+
+    venv_cache = VenvCacheService()
+    if venv_cache.is_published(venv_key):
+        shared_path = f"{SHARED_VENVS_PATH}/{venv_key}"
+        exec_command = ["sh", "-c", f"[ ! -e {VENV_PATH} ] && [ -d {shared_path} ] && ln -s {shared_path} {VENV_PATH}"]
+        if PodExecutor.run_command(namespace, pod_name, exec_command) == 0:
+            task_logger.info(f"Linked shared virtual environment {venv_key[:12]}")
+            return
+
+    task_logger.info(f"Copying venv files to pod {pod_name}")
+    PodFileOperations.extract_archive_to_pod(namespace, pod_name, str(venv_cache.get_archive_path(venv_key)), VENV_PATH)
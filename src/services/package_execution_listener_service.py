@@ -32,20 +32,22 @@ class PackageExecutionListenerService(stomp.ConnectionListener):
             request = ExecutionRequest(**message)
             logger.info(f"Received message for script: {request.package_name}")
             self.executor.submit(self._run_task, request.package_name, request.stage,
-                                 request.version, request.arguments)
+                                 request.version, request.arguments, request.priority)
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}", exc_info=True)
 
-    def _run_task(self, package_name: str, stage: str, version: Optional[str], arguments: list):
+    def _run_task(self, package_name: str, stage: str, version: Optional[str], arguments: list, priority: int):
         loop = get_event_loop()
         try:
-            loop.run_until_complete(self._process_message(package_name, stage, version, arguments))
+            loop.run_until_complete(self._process_message(package_name, stage, version, arguments, priority))
         except Exception as e:
             logger.error(f"Error in async task execution: {str(e)}", exc_info=True)
 
-    async def _process_message(self, package_name: str, stage: str, version: Optional[str], arguments: list):
+    async def _process_message(self, package_name: str, stage: str, version: Optional[str], arguments: list,
+                               priority: int):
         try:
-            await self.k8s_manager_service.execute_package_async(package_name, stage, version, arguments, False)
+            await self.k8s_manager_service.execute_package_async(package_name, stage, version, arguments, False,
+                                                                 priority)
         except Exception as e:
             logger.error(f"Error executing script: {str(e)}", exc_info=True)
 
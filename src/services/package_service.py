@@ -3,9 +3,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
-from src.database.database_access import get_db_session
+from src.database.database_access import AsyncSessionLocal, get_db_session
 from src.database.models.package_entity import PackageEntity
-from src.database.repositories.package_repository import PackageRepository
+from src.database.repositories.package_repository import (
+    PackageRepository, select_package)
 from src.misc.runtime_type import RuntimeType
 from src.models.yaml_config import parse_config
 from src.utils.path_manager import PathManager
@@ -19,6 +20,38 @@ class PackageInfo:
     requirements_path: Path
 
 
+def to_package_info(package_name: str, stage: str, package_entity: Optional[PackageEntity]) -> Optional[PackageInfo]:
+    if not package_entity:
+        return None
+
+    config_content = parse_config(package_entity.config)
+    if not config_content:
+        return None
+
+    package_dir = PathManager.get_package_path(package_name, package_entity.version, stage)
+    if not package_dir.exists() and config_content.runtime != RuntimeType.CONTAINER:
+        return None
+
+    entry_file_path = os.path.join(package_dir, config_content.entrypoint)
+    if os.path.exists(entry_file_path):
+        return PackageInfo(
+            package_entity=package_entity,
+            package_dir=Path(package_dir),
+            entry_point_path=Path(entry_file_path),
+            requirements_path=Path(os.path.join(package_dir, "requirements.txt"))
+        )
+
+    if config_content.runtime == RuntimeType.CONTAINER:
+        return PackageInfo(
+            package_entity=package_entity,
+            package_dir=Path(),
+            entry_point_path=Path(),
+            requirements_path=Path()
+        )
+
+    return None
+
+
 class PackageService:
     @staticmethod
     def get_package_info(
@@ -28,39 +61,21 @@ class PackageService:
     ) -> Optional[PackageInfo]:
         db_session = next(get_db_session())
         try:
-            package_info = PackageRepository.get_package(db_session, package_name, stage, version)
-            if not package_info:
-                return None
-
-            config_content = parse_config(package_info.config)
-            if not config_content:
-                return None
-
-            package_dir = PathManager.get_package_path(package_name, package_info.version, stage)
-            if not package_dir.exists() and config_content.runtime != RuntimeType.CONTAINER:
-                return None
-
-            entry_file_path = os.path.join(package_dir, config_content.entrypoint)
-            if os.path.exists(entry_file_path):
-                return PackageInfo(
-                    package_entity=package_info,
-                    package_dir=Path(package_dir),
-                    entry_point_path=Path(entry_file_path),
-                    requirements_path=Path(os.path.join(package_dir, "requirements.txt"))
-                )
-
-            if config_content.runtime == RuntimeType.CONTAINER:
-                return PackageInfo(
-                    package_entity=package_info,
-                    package_dir=Path(),
-                    entry_point_path=Path(),
-                    requirements_path=Path()
-                )
-
-            return None
+            package_entity = db_session.scalars(select_package(package_name, stage, version)).first()
+            return to_package_info(package_name, stage, package_entity)
         finally:
             db_session.close()
 
+    @staticmethod
+    async def get_package_info_async(
+        package_name: str,
+        stage: str,
+        version: Optional[str]
+    ) -> Optional[PackageInfo]:
+        async with AsyncSessionLocal() as db_session:
+            package_entity = await PackageRepository.get_package(db_session, package_name, stage, version)
+            return to_package_info(package_name, stage, package_entity)
+
     @staticmethod
     def get_package_path(
         package_name: str,
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from src.utils import config
+from src.utils.singleton_meta import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+Upstream = Tuple[str, int]
+
+
+@dataclass
+class UpstreamClient:
+    client: httpx.AsyncClient
+    leases: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    closing: bool = False
+
+
+class ProxyClientPool(metaclass=SingletonMeta):
+    def __init__(self):
+        self.max_upstreams = config.PROXY_MAX_UPSTREAMS
+        self.idle_timeout = config.PROXY_CLIENT_IDLE_TIMEOUT_SECONDS
+        self.limits = httpx.Limits(max_connections=config.PROXY_MAX_CONNECTIONS_PER_UPSTREAM,
+                                   max_keepalive_connections=config.PROXY_MAX_KEEPALIVE_PER_UPSTREAM,
+                                   keepalive_expiry=config.PROXY_KEEPALIVE_EXPIRY_SECONDS)
+        self._clients: "OrderedDict[Upstream, UpstreamClient]" = OrderedDict()
+        self._task_upstreams: Dict[str, Set[Upstream]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def acquire(self, task_id: str, address: str, port: int) -> httpx.AsyncClient:
+        upstream = (address, port)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._task_upstreams.setdefault(task_id, set()).add(upstream)
+
+            entry = self._clients.get(upstream)
+            if entry is None:
+                entry = UpstreamClient(self._create_client(address, port))
+                self._clients[upstream] = entry
+
+            self._clients.move_to_end(upstream)
+            entry.leases += 1
+            entry.last_used = time.monotonic()
+            expired = self._collect_expired()
+
+        self._close_clients(expired)
+        return entry.client
+
+    def release(self, address: str, port: int):
+        with self._lock:
+            entry = self._clients.get((address, port))
+            if entry is None:
+                return
+
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            expired = self._collect_expired()
+
+        self._close_clients(expired)
+
+    def close_task(self, task_id: str):
+        # called from worker threads when a task ends, the clients belong to the event loop
+        with self._lock:
+            upstreams = self._task_upstreams.pop(task_id, set())
+            for entry in (self._clients.get(upstream) for upstream in upstreams):
+                if entry is not None:
+                    entry.closing = True
+            expired = self._collect_expired()
+            loop = self._loop
+
+        if expired and loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._close_clients, expired)
+            except RuntimeError:
+                pass
+
+    async def aclose(self):
+        with self._lock:
+            clients = [entry.client for entry in self._clients.values()]
+            self._clients.clear()
+            self._task_upstreams.clear()
+
+        for client in clients:
+            await client.aclose()
+
+    def _create_client(self, address: str, port: int) -> httpx.AsyncClient:
+        # the client is shared by all users of the app, so upstream cookies must never be stored on it.
+        # upstreams are pod addresses inside the cluster, environment proxies never apply to them
+        # redirects go back to the browser, following them here would serve the target under the old url
+        return httpx.AsyncClient(base_url=f"http://{address}:{port}/", follow_redirects=False, limits=self.limits,
+                                 cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])), trust_env=False)
+
+    def _collect_expired(self) -> List[httpx.AsyncClient]:
+        now = time.monotonic()
+        idle = [upstream for upstream, entry in self._clients.items()
+                if entry.leases <= 0 and (entry.closing or now - entry.last_used > self.idle_timeout)]
+
+        # least recently used first, entries with requests in flight are kept
+        overflow = len(self._clients) - len(idle) - self.max_upstreams
+        if overflow > 0:
+            idle.extend([upstream for upstream, entry in self._clients.items()
+                         if entry.leases <= 0 and upstream not in idle][:overflow])
+
+        expired = []
+        for upstream in idle:
+            expired.append(self._clients.pop(upstream).client)
+
+        if expired:
+            for task_id, upstreams in list(self._task_upstreams.items()):
+                upstreams.difference_update(idle)
+                if not upstreams:
+                    del self._task_upstreams[task_id]
+
+        return expired
+
+    @staticmethod
+    def _close_clients(clients: List[httpx.AsyncClient]):
+        for client in clients:
+            asyncio.ensure_future(client.aclose())
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.services.task_event_bus import TaskEventBus
+from src.utils import config
+from src.utils.singleton_meta import SingletonMeta
+
+
+@dataclass
+class ProxyRoute:
+    ip: str
+    port: int
+
+
+class ProxyRouteTable(metaclass=SingletonMeta):
+    def __init__(self):
+        self.ttl = config.PROXY_ROUTE_TTL_SECONDS
+        self.max_size = config.PROXY_ROUTE_TABLE_SIZE
+        self._routes: "OrderedDict[str, Dict[str, Tuple[ProxyRoute, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._generation = 0
+        # [generation, loads in flight] per task, only kept while a route of the task is loading
+        self._loading: Dict[str, List[int]] = {}
+
+        # every replica drops its entries as soon as the task changes anywhere
+        TaskEventBus().add_listener(self.invalidate)
+
+    async def resolve(self, task_id: str, kind: str,
+                      loader: Callable[[], Awaitable[Optional[ProxyRoute]]]) -> Optional[ProxyRoute]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._routes.get(task_id, {}).get(kind)
+            if entry is not None and entry[1] > now:
+                self._routes.move_to_end(task_id)
+                self._hits += 1
+                return entry[0]
+
+            self._misses += 1
+            loading = self._loading.setdefault(task_id, [0, 0])
+            loading[1] += 1
+            generation = (self._generation, loading[0])
+
+        try:
+            route = await loader()
+        except BaseException:
+            with self._lock:
+                self._finish_load(task_id)
+            raise
+
+        with self._lock:
+            # an invalidation of this task while loading may have made the loaded route stale already
+            if self._finish_load(task_id) != generation or route is None:
+                return route
+
+            self._routes.setdefault(task_id, {})[kind] = (route, now + self.ttl)
+            self._routes.move_to_end(task_id)
+            while len(self._routes) > self.max_size:
+                self._evictions += len(self._routes.popitem(last=False)[1])
+
+        return route
+
+    def invalidate(self, task_id: Optional[str] = None):
+        with self._lock:
+            if task_id is None:
+                self._generation += 1
+                self._invalidations += sum(len(routes) for routes in self._routes.values())
+                self._routes.clear()
+                return
+
+            if task_id in self._loading:
+                self._loading[task_id][0] += 1
+            if task_id in self._routes:
+                self._invalidations += len(self._routes.pop(task_id))
+
+    def _finish_load(self, task_id: str) -> Tuple[int, int]:
+        loading = self._loading[task_id]
+        generation = (self._generation, loading[0])
+        loading[1] -= 1
+        if loading[1] == 0:
+            del self._loading[task_id]
+        return generation
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": sum(len(routes) for routes in self._routes.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_API = "registry-1.docker.io"
+
+OCI_INDEX = "application/vnd.oci.image.index.v1+json"
+OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+DOCKER_MANIFEST_LIST = "application/vnd.docker.distribution.manifest.list.v2+json"
+DOCKER_MANIFEST = "application/vnd.docker.distribution.manifest.v2+json"
+MANIFEST_MEDIA_TYPES = [OCI_INDEX, DOCKER_MANIFEST_LIST, OCI_MANIFEST, DOCKER_MANIFEST]
+
+LAYER_MEDIA_TYPES = {
+    OCI_MANIFEST: "application/vnd.oci.image.layer.v1.tar+gzip",
+    DOCKER_MANIFEST: "application/vnd.docker.image.rootfs.diff.tar.gzip",
+}
+
+
+@dataclass
+class ImageReference:
+    registry: str
+    repository: str
+    reference: str
+
+    @staticmethod
+    def parse(image: str) -> "ImageReference":
+        name, digest = image.split("@", 1) if "@" in image else (image, None)
+
+        registry = DOCKER_HUB
+        first, _, rest = name.partition("/")
+        if rest and ("." in first or ":" in first or first == "localhost"):
+            registry, name = first, rest
+
+        tag = "latest"
+        if ":" in name.rsplit("/", 1)[-1]:
+            name, tag = name.rsplit(":", 1)
+
+        if registry == DOCKER_HUB and "/" not in name:
+            name = f"library/{name}"
+
+        return ImageReference(registry, name, digest or tag)
+
+
+class RegistryClient:
+    def __init__(self, registry: str, username: Optional[str] = None, password: Optional[str] = None,
+                 insecure: bool = False, actions: str = "pull"):
+        host = DOCKER_HUB_API if registry == DOCKER_HUB else registry
+        self.base_url = f"{'http' if insecure else 'https'}://{host}/v2/"
+        self.auth = (username, password) if username else None
+        self.actions = actions
+        self.session = requests.Session()
+        self._tokens: Dict[str, str] = {}
+
+    def get_manifest(self, repository: str, reference: str, platform: str) -> Tuple[Dict[str, Any], str]:
+        response = self._request("GET", repository, f"manifests/{reference}",
+                                 headers={"Accept": ", ".join(MANIFEST_MEDIA_TYPES)})
+        response.raise_for_status()
+        manifest = response.json()
+        media_type = manifest.get("mediaType") or response.headers.get("Content-Type", "").split(";")[0]
+
+        if media_type in (OCI_INDEX, DOCKER_MANIFEST_LIST):
+            operating_system, _, architecture = platform.partition("/")
+            for entry in manifest["manifests"]:
+                entry_platform = entry.get("platform", {})
+                if (entry_platform.get("os") == operating_system and
+                        entry_platform.get("architecture") == architecture):
+                    return self.get_manifest(repository, entry["digest"], platform)
+
+            raise RuntimeError(f"No manifest for platform {platform} in {repository}:{reference}")
+
+        return manifest, media_type
+
+    def get_blob(self, repository: str, digest: str) -> requests.Response:
+        response = self._request("GET", repository, f"blobs/{digest}", stream=True)
+        response.raise_for_status()
+        return response
+
+    def has_blob(self, repository: str, digest: str) -> bool:
+        return self._request("HEAD", repository, f"blobs/{digest}").status_code == 200
+
+    def upload_blob(self, repository: str, digest: str, data: IO[bytes], size: int):
+        response = self._request("POST", repository, "blobs/uploads/")
+        response.raise_for_status()
+
+        location = urljoin(self.base_url, response.headers["Location"])
+        separator = "&" if "?" in location else "?"
+        data.seek(0)
+        response = self._request("PUT", repository, f"{location}{separator}digest={digest}", data=data,
+                                 headers={"Content-Type": "application/octet-stream",
+                                          "Content-Length": str(size)})
+        response.raise_for_status()
+
+    def put_manifest(self, repository: str, reference: str, manifest: Dict[str, Any]) -> str:
+        body = json.dumps(manifest, separators=(",", ":")).encode()
+        response = self._request("PUT", repository, f"manifests/{reference}", data=body,
+                                 headers={"Content-Type": manifest["mediaType"]})
+        response.raise_for_status()
+        return response.headers.get("Docker-Content-Digest") or f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+    def _request(self, method: str, repository: str, path: str, **kwargs) -> requests.Response:
+        url = path if path.startswith("http") else f"{self.base_url}{repository}/{path}"
+        headers = dict(kwargs.pop("headers", {}))
+
+        response = self._send(method, url, repository, headers, **kwargs)
+        challenge = response.headers.get("WWW-Authenticate", "")
+        if response.status_code != 401 or not challenge.lower().startswith("bearer"):
+            return response
+
+        self._tokens[repository] = self._fetch_token(challenge, repository)
+        if hasattr(kwargs.get("data"), "seek"):
+            kwargs["data"].seek(0)
+        return self._send(method, url, repository, headers, **kwargs)
+
+    def _send(self, method: str, url: str, repository: str, headers: Dict[str, str],
+              **kwargs) -> requests.Response:
+        token = self._tokens.get(repository)
+        if token:
+            return self.session.request(method, url, headers={**headers, "Authorization": f"Bearer {token}"},
+                                        **kwargs)
+
+        return self.session.request(method, url, headers=headers, auth=self.auth, **kwargs)
+
+    def _fetch_token(self, challenge: str, repository: str) -> str:
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        realm = params.pop("realm")
+        params["scope"] = f"repository:{repository}:{self.actions}"
+
+        response = self.session.get(realm, params=params, auth=self.auth)
+        response.raise_for_status()
+        token = response.json()
+        return token.get("token") or token["access_token"]
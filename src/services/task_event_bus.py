@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Generator, List, Optional, Set
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import ColumnElement, Text, cast, func, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.utils import config
+from src.utils.singleton_meta import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "lotse_task_events"
+ALL_TASKS = "*"
+
+
+NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+
+
+def get_notify_parameters(task_id: str, status: Optional[str]) -> Dict[str, str]:
+    return {"channel": CHANNEL, "payload": json.dumps({"task_id": task_id, "status": status})}
+
+
+class TaskSubscription:
+    def __init__(self, bus: "TaskEventBus", task_id: str, accept: Optional[Callable[[Optional[str]], bool]] = None):
+        self.bus = bus
+        self.task_id = task_id
+        self.accept = accept
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        # without a listener connection changes are only noticed by re-checking
+        if not self.bus.is_listening:
+            timeout = 1.0 if timeout is None else min(timeout, 1.0)
+
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.event.clear()
+
+    def notify(self, task_id: Optional[str] = None):
+        # called on the listener thread, a filter keeps ALL_TASKS subscribers from waking up for unrelated tasks
+        if self.accept is not None and not self.accept(task_id):
+            return
+
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass
+
+
+class TaskEventBus(metaclass=SingletonMeta):
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[TaskSubscription]] = {}
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+        self._listening = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_listening(self) -> bool:
+        return self._listening.is_set()
+
+    @staticmethod
+    def publish(db: Session, task_id: str, status: Optional[str] = None):
+        # sent on commit of the surrounding transaction, so listeners never see uncommitted state
+        db.execute(NOTIFY_STATEMENT, get_notify_parameters(task_id, status))
+
+    @staticmethod
+    async def publish_async(db: AsyncSession, task_id: str, status: Optional[str] = None):
+        await db.execute(NOTIFY_STATEMENT, get_notify_parameters(task_id, status))
+
+    @staticmethod
+    def notification(task_id: ColumnElement, status: ColumnElement) -> ColumnElement:
+        # the same event as publish, as a column so one statement can notify for every row it changed
+        payload = func.json_build_object(literal("task_id"), task_id, literal("status"), status)
+        return func.pg_notify(CHANNEL, cast(payload, Text))
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def add_listener(self, listener: Callable[[Optional[str]], None]):
+        # called on the listener thread with the task id, or None when every task may have changed
+        with self._lock:
+            self._listeners.append(listener)
+        self.start()
+
+    @contextmanager
+    def subscribe(self, task_id: str = ALL_TASKS,
+                  accept: Optional[Callable[[Optional[str]], bool]] = None) -> Generator[TaskSubscription, None, None]:
+        self.start()
+        subscription = TaskSubscription(self, task_id, accept)
+        with self._lock:
+            self._subscriptions.setdefault(task_id, set()).add(subscription)
+
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscriptions.get(task_id)
+                if subscriptions is not None:
+                    subscriptions.discard(subscription)
+                    if not subscriptions:
+                        del self._subscriptions[task_id]
+
+    def _dispatch(self, task_id: Optional[str]):
+        with self._lock:
+            if task_id is None:
+                subscriptions = [subscription for subscriptions in self._subscriptions.values()
+                                 for subscription in subscriptions]
+            else:
+                subscriptions = [*self._subscriptions.get(task_id, ()), *self._subscriptions.get(ALL_TASKS, ())]
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(task_id)
+            except Exception as e:
+                logger.error(f"Error in task event listener: {str(e)}")
+
+        for subscription in subscriptions:
+            subscription.notify(task_id)
+
+    def _run(self):
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(config.DATABASE_URL)
+                connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+
+                self._listening.set()
+                # events may have been missed while disconnected, let every subscriber re-check
+                self._dispatch(None)
+
+                while True:
+                    if select.select([connection], [], [], 60) == ([], [], []):
+                        continue
+
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        self._dispatch(json.loads(notification.payload).get("task_id"))
+            except Exception as e:
+                logger.error(f"Task event listener failed: {str(e)}")
+            finally:
+                self._listening.clear()
+                if connection is not None:
+                    connection.close()
+
+            time.sleep(1)
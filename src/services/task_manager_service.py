@@ -1,28 +1,38 @@
 import asyncio
+import functools
 import logging
 import os
-import threading
-from typing import List, Optional
-
-from kubernetes import client, config
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Coroutine, List, Optional
 
 import src.utils.config as framework_config
 from src.database.repositories.task_repository import TaskRepository
 from src.database.repositories.volume_repository import VolumeRepository
 from src.misc.runtime_type import RuntimeType
-from src.misc.task_status import TaskStatus
+from src.misc.task_status import ACTIVE_TASK_STATUSES, TaskStatus
 from src.models.k8s.cluster import PodMetrics
 from src.models.package_request_argument import PackageRequestArgument
 from src.models.sync_execution_response import SyncExecutionResponse
 from src.models.yaml_config import parse_config
+from src.services.deadline_scheduler import DeadlineScheduler
+from src.services.execution_scheduler import ExecutionScheduler, ScheduledExecution
+from src.services.image_build_service import ImageBuildService
 from src.services.kubernetes import pod_api_wrapper
+from src.services.kubernetes.k8s_api import K8sApi
 from src.services.kubernetes.pod_environment import PodEnvironment
 from src.services.kubernetes.pod_executor import PodExecutor
 from src.services.kubernetes.pod_file_operations import PodFileOperations
+from src.services.kubernetes.pod_informer import PodInformer
+from src.services.kubernetes.pod_log_stream import PodLogStream
 from src.services.kubernetes.pod_manager import PodManager
+from src.services.kubernetes.pod_pool import PodPool
 from src.services.kubernetes.pod_port_manager import PodPortManager
+from src.services.kubernetes.port_detector import PortDetector
 from src.services.kubernetes.runtimes import python_pod
 from src.services.package_service import PackageService
+from src.services.proxy_client_pool import ProxyClientPool
+from src.services.venv_cache_service import VenvCacheService
 from src.utils import global_queue_handler
 from src.utils.name_generator import generate_name
 from src.utils.singleton_meta import SingletonMeta
@@ -37,19 +47,24 @@ class TaskManagerService(metaclass=SingletonMeta):
         self.task_manager = task_manager
         self.task_logger = TaskLogger()
 
-        if framework_config.IS_DEBUG:
-            config.load_kube_config()
-        else:
-            config.load_incluster_config()
-
-        self.v1 = client.CoreV1Api()
-        self.custom_api = client.CustomObjectsApi()
+        k8s_api = K8sApi()
+        self.v1 = k8s_api.core
+        self.custom_api = k8s_api.custom
         self.namespace = framework_config.K8S_NAMESPACE
+        self.pod_informer = PodInformer(self.v1, self.namespace)
+        self.pod_pool = PodPool(self.v1, self.namespace)
+        self.venv_cache = VenvCacheService()
+        self.scheduler = ExecutionScheduler()
+        self.deadlines = DeadlineScheduler()
 
     def cancel_task(self, task_id: str) -> bool:
         task_logger = self.task_logger.setup_logger(task_id)
-        self.task_manager.update_task_status(task_id, TaskStatus.CANCELLED, None)
-        PodManager.delete_pod(self.v1, self.namespace, task_id, task_logger)
+        self.task_manager.update_task_status(task_id, TaskStatus.CANCELLED, None, ACTIVE_TASK_STATUSES)
+        if self.scheduler.cancel(task_id):
+            task_logger.info("Queued task cancelled")
+            return True
+
+        PodManager.delete_pod(self.v1, self.namespace, self.pod_pool.get_pod_name(task_id), task_logger)
         return True
 
     def execute_package(
@@ -59,8 +74,10 @@ class TaskManagerService(metaclass=SingletonMeta):
             stage: str,
             version: Optional[str],
             arguments: List[PackageRequestArgument],
-            empty_instance: bool) -> bool:
+            empty_instance: bool) -> Optional[Coroutine[Any, Any, Optional[int]]]:
         task_logger = self.task_logger.setup_logger(task_id)
+        pod_name = task_id
+        venv_key = None
 
         try:
             package_info = PackageService.get_package_info(package_name, stage, version)
@@ -68,17 +85,14 @@ class TaskManagerService(metaclass=SingletonMeta):
                 raise FileNotFoundError(f"Package not found for {package_name} in stage {stage}")
 
             package_config = parse_config(package_info.package_entity.config)
-
-            self.task_manager.update_task_status(
-                task_id,
-                TaskStatus.INITIALIZING,
-                None
-            )
             package_dir = package_info.package_dir
+            image_ref = ImageBuildService.get_image_ref(package_name, package_info.package_entity.version, stage)
+            if image_ref is not None:
+                task_logger.info(f"Using prebuilt image {image_ref}")
 
             match package_config.runtime:
-                case RuntimeType.PYTHON:
-                    python_pod.prepare_environment(
+                case RuntimeType.PYTHON if image_ref is None:
+                    venv_key = python_pod.prepare_environment(
                         self.v1,
                         self.namespace,
                         task_id,
@@ -90,28 +104,44 @@ class TaskManagerService(metaclass=SingletonMeta):
                     )
 
             volume_maps = VolumeRepository.get_volume_maps(package_config.volumes)
-            PodManager.create_pod(self.v1, self.namespace, task_id,
-                                  package_info.package_entity.python_version,
-                                  package_config.environment, task_logger, volume_maps,
-                                  package_config.image, package_config.runtime,
-                                  empty_instance)
-            asyncio.run(pod_api_wrapper.wait_for_pod_running(self.v1, self.namespace, task_id, task_logger))
+            pooled_pod_name = None
+            if image_ref is None and self.pod_pool.is_eligible(package_config.runtime, volume_maps, empty_instance):
+                pooled_pod_name = self.pod_pool.claim(package_info.package_entity.python_version,
+                                                      package_config.image, task_id, task_logger)
+
+            env_vars = None
+            venv_volume = None
+            if pooled_pod_name is None:
+                if venv_key is not None:
+                    venv_volume = python_pod.get_shared_venv_volume(venv_key)
+                    if venv_volume is not None:
+                        volume_maps.append(venv_volume)
+
+                PodManager.create_pod(self.v1, self.namespace, task_id,
+                                      package_info.package_entity.python_version,
+                                      package_config.environment, task_logger, volume_maps,
+                                      image_ref or package_config.image, package_config.runtime,
+                                      empty_instance, image_ref is not None)
+                asyncio.run(pod_api_wrapper.wait_for_pod_running(self.v1, self.namespace, task_id, task_logger))
+            else:
+                pod_name = pooled_pod_name
+                env_vars = PodManager.get_env_vars(task_id, package_config.environment)
 
-            if package_config.runtime != RuntimeType.CONTAINER:
-                task_logger.info(f"Copying package files to pod {task_id}")
-                PodFileOperations.copy_files_to_pod(self.namespace, task_id, str(package_dir), "/app")
+            if package_config.runtime != RuntimeType.CONTAINER and image_ref is None:
+                task_logger.info(f"Copying package files to pod {pod_name}")
+                PodFileOperations.copy_files_to_pod(self.namespace, pod_name, str(package_dir), "/app")
 
             match package_config.runtime:
-                case RuntimeType.PYTHON:
+                case RuntimeType.PYTHON if venv_key is not None:
                     python_pod.prepare_runtime(
-                        self.v1,
                         self.namespace,
-                        task_id,
+                        pod_name,
                         task_logger,
-                        package_name,
-                        stage,
-                        package_info
+                        venv_key,
+                        venv_volume is not None
                     )
+                    self.venv_cache.release(venv_key)
+                    venv_key = None
 
             command = []
             for arg in arguments:
@@ -122,132 +152,177 @@ class TaskManagerService(metaclass=SingletonMeta):
                     command.append(arg.value)
 
             task_logger.info(f"Executing package: {package_name}, Stage: {stage}")
-            self.task_manager.update_task_status(
-                task_id,
-                TaskStatus.RUNNING,
-                None
-            )
+            if not self.task_manager.update_task_status(task_id, TaskStatus.RUNNING, None,
+                                                        [TaskStatus.INITIALIZING]):
+                raise RuntimeError(f"Task {task_id} was stopped before it started running")
 
+            # the returned run only waits on the pod, it is driven by the scheduler's watcher loop
             if package_config.runtime != RuntimeType.CONTAINER:
                 if empty_instance:
-                    command = ["tail", "-f", "/dev/null"]
+                    self.scheduler.release(task_id)
 
                     def line_callback(line: str) -> bool:
                         task_logger.info(line)
                         return False
 
-                    PodExecutor.run_command(self.v1, self.namespace, task_id, command, line_callback)
-                    result = 1
-                else:
-                    file_name = os.path.basename(package_info.entry_point_path)
-                    result = pod_api_wrapper.start_app(
-                        self.v1, self.namespace, task_id,
-                        file_name, command, task_logger, task_id, self.task_manager,
-                        package_config.runtime
-                    )
-            else:
-                result = asyncio.run(pod_api_wrapper.watch_pod(self.v1, self.namespace,
-                                     task_id, task_logger, task_id, self.task_manager))
+                    async def run_empty_instance() -> Optional[int]:
+                        await PodExecutor.exec_command(self.namespace, pod_name, ["tail", "-f", "/dev/null"],
+                                                       line_callback, line_callback)
+                        return 1
 
-            return result is not None and result == 0
+                    return run_empty_instance()
+
+                file_name = os.path.basename(package_info.entry_point_path)
+                return pod_api_wrapper.start_app(
+                    self.v1, self.namespace, pod_name,
+                    file_name, command, task_logger, task_id, self.task_manager,
+                    package_config.runtime, env_vars, package_config.port_detection
+                )
+
+            return pod_api_wrapper.watch_pod(self.v1, self.namespace,
+                                             pod_name, task_logger, task_id, self.task_manager,
+                                             package_config.port_detection)
         except Exception as e:
-            PodManager.delete_pod(self.v1, self.namespace, task_id, task_logger)
+            PodManager.delete_pod(self.v1, self.namespace, pod_name, task_logger)
             logger.error(f"Error executing package: {str(e)}")
-            return False
+            return None
+        finally:
+            if venv_key is not None:
+                self.venv_cache.release(venv_key)
 
     def __internal_run_package(self, timeout: int, task_id: str, package_name: str,
                                stage: str, version: Optional[str], arguments: List[PackageRequestArgument],
                                empty_instance: bool):
-        task_logger = self.task_logger.setup_logger(task_id)
         try:
-            timer = None
+            # a task cancelled while it was queued stays cancelled
+            if not self.task_manager.update_task_status(task_id, TaskStatus.INITIALIZING, None,
+                                                        [TaskStatus.QUEUED]):
+                self.__release_task(task_id)
+                return
+
             if timeout > 0:
-                def kill_on_timeout():
-                    task_logger.info(f"Package execution timed out after {timeout} seconds")
-                    self.task_manager.kill_and_update_task(task_id, TaskStatus.TIMEOUT)
-                    PodManager.delete_pod(self.v1, self.namespace, task_id, task_logger)
+                self.deadlines.schedule(task_id, timeout)
 
-                timer = threading.Timer(timeout, kill_on_timeout)
-                timer.daemon = True
-                timer.start()
+            run = self.execute_package(task_id, package_name, stage, version, arguments, empty_instance)
+        except Exception as e:
+            self.__finish_package(task_id, False, str(e))
+            return
 
-            output_lines = []
-            error_lines = []
-            success = self.execute_package(task_id, package_name, stage, version, arguments, empty_instance)
+        if run is None:
+            self.__finish_package(task_id, False)
+            return
 
-            if timer:
-                timer.cancel()
+        # ui apps and empty instances release their slot while running, the watcher then finishes them
+        self.scheduler.watch(task_id, run, functools.partial(self.__complete_run, task_id))
 
+    def __complete_run(self, task_id: str, run: Future):
+        try:
+            result = run.result()
+        except Exception as e:
+            task_logger = self.task_logger.setup_logger(task_id)
+            PodManager.delete_pod(self.v1, self.namespace, self.pod_pool.get_pod_name(task_id), task_logger)
+            logger.error(f"Error executing package: {str(e)}")
+            result = None
+
+        self.__finish_package(task_id, result is not None and result == 0)
+
+    def __finish_package(self, task_id: str, success: bool, error: Optional[str] = None):
+        task_logger = self.task_logger.setup_logger(task_id)
+        try:
+            self.deadlines.cancel(task_id)
             result = SyncExecutionResponse(
                 success=success,
                 task_id=task_id,
-                output=''.join(output_lines),
-                error=''.join(error_lines)
+                output="",
+                error=error or ""
             )
 
+            if error is not None:
+                self.task_manager.update_task_status(task_id, TaskStatus.FAILED, result.__dict__,
+                                                     ACTIVE_TASK_STATUSES)
+                return
+
             status = TaskStatus.COMPLETED if success else TaskStatus.FAILED
-            task = self.task_manager.get_task(task_id)
-            if task is None:
-                raise Exception(f"Task {task_id} not found")
-
-            if task.status == TaskStatus.CANCELLED:
-                task_logger.info("Package was cancelled")
-            elif task.status == TaskStatus.TIMEOUT:
-                pass
-            else:
-                self.task_manager.update_task_status(task_id, status, result.__dict__)
+            if self.task_manager.update_task_status(task_id, status, result.__dict__,
+                                                    [TaskStatus.INITIALIZING, TaskStatus.RUNNING]):
                 task_logger.info(f"Package execution completed with status: {status}")
+            else:
+                task = self.task_manager.get_task(task_id)
+                if task is not None and task.status == TaskStatus.CANCELLED:
+                    task_logger.info("Package was cancelled")
         except Exception as e:
-            self.task_manager.update_task_status(
-                task_id,
-                TaskStatus.FAILED,
-                SyncExecutionResponse(
-                    success=False,
-                    task_id=task_id,
-                    output="",
-                    error=str(e)
-                ).__dict__
-            )
+            logger.error(f"Error finishing task {task_id}: {str(e)}")
         finally:
-            self.task_manager.update_task_pid(task_id, None)
+            self.__release_task(task_id)
+
+    def __release_task(self, task_id: str):
+        self.deadlines.cancel(task_id)
+        self.task_manager.update_task_pid(task_id, None)
+        self.pod_pool.release(task_id)
+        ProxyClientPool().close_task(task_id)
+
+    def extend_task_timeout(self, task_id: str, seconds: int) -> Optional[float]:
+        return self.deadlines.extend(task_id, seconds)
+
+    def __handle_task_timeout(self, task_id: str):
+        # only the transition that actually times the task out kills its pod
+        if not self.task_manager.kill_and_update_task(task_id, TaskStatus.TIMEOUT,
+                                                      [TaskStatus.RUNNING, TaskStatus.INITIALIZING]):
+            return
+
+        task_logger = self.task_logger.setup_logger(task_id)
+        task_logger.info("Package execution timed out")
+        PodManager.delete_pod(self.v1, self.namespace, self.pod_pool.get_pod_name(task_id), task_logger)
 
     async def execute_package_async(self,
                                     package_name: str,
                                     stage: str,
                                     version: Optional[str],
                                     arguments: List[PackageRequestArgument],
-                                    empty_instance: bool) -> str:
+                                    empty_instance: bool,
+                                    priority: int = 0) -> str:
 
-        package_info = PackageService.get_package_info(package_name, stage, version)
+        package_info = await PackageService.get_package_info_async(package_name, stage, version)
         if package_info is None:
             raise FileNotFoundError(f"Package {package_name} ({version}) not found in stage {stage}")
 
-        task_id = generate_name(package_name)
-
-        self.task_manager.add_task(task_id, package_info.package_entity.deployment_id, stage, arguments)
         parsed_config = parse_config(package_info.package_entity.config)
         if parsed_config is None:
             raise FileNotFoundError(f"Package {package_name} ({version}) not found in stage {stage}")
 
+        task_id = generate_name(package_name)
+        await self.task_manager.add_task_async(task_id, package_info.package_entity.deployment_id, stage,
+                                               arguments, TaskStatus.QUEUED)
         timeout = (framework_config.GLOBAL_TASK_TIMEOUT_SECONDS if parsed_config.timeout is None
                    else parsed_config.timeout)
 
-        threading.Thread(
-            target=self.__internal_run_package,
-            args=(timeout, task_id, package_name, stage, version, arguments, empty_instance),
-            daemon=True
-        ).start()
+        self.scheduler.submit(ScheduledExecution(
+            task_id,
+            package_name,
+            stage,
+            priority,
+            parsed_config.max_concurrency,
+            functools.partial(self.__internal_run_package, timeout, task_id, package_name, stage, version,
+                              arguments, empty_instance)
+        ))
 
         return task_id
 
     async def check_and_initialize_pods(self) -> None:
+        PortDetector.bind_loop()
+        self.pod_informer.start()
+        self.pod_pool.restore_claims()
+        self.task_manager.kill_and_update_tasks([task.task_id for task in self.task_manager.get_queued_tasks()],
+                                                TaskStatus.FAILED, [TaskStatus.QUEUED])
+
+        failed_task_ids = []
         tasks = self.task_manager.get_running_tasks()
         for task in tasks:
-            pod_name = task.task_id
+            pod_name = self.pod_pool.get_pod_name(task.task_id)
             try:
-                pod = PodManager.get_pod(self.v1, self.namespace, pod_name)
+                pod = self.pod_informer.get_pod(pod_name)
                 if pod is None or pod.status.phase != "Running":
-                    self.task_manager.kill_and_update_task(task.task_id, TaskStatus.FAILED)
+                    failed_task_ids.append(task.task_id)
                     continue
 
                 task_logger = self.task_logger.setup_logger(task.task_id)
@@ -257,34 +332,52 @@ class TaskManagerService(metaclass=SingletonMeta):
                         task.task_id, self.task_manager, task.original_ui_port)
 
                 if task.vscode_port is not None and task.vscode_port != 0:
-                    self.install_and_run_vscode_server(task.task_id)
+                    await asyncio.to_thread(self.install_and_run_vscode_server, task.task_id)
+
+                if parse_config(task.package.config).runtime == RuntimeType.CONTAINER:  # type: ignore
+                    self.resume_log_stream(task.task_id, pod_name)
 
             except Exception as e:
                 logger.error(f"Error checking pod {pod_name}: {str(e)}")
-                self.task_manager.kill_and_update_task(task.task_id, TaskStatus.FAILED)
+                failed_task_ids.append(task.task_id)
+
+        # tasks whose pod is gone are failed together instead of one round trip each
+        self.task_manager.kill_and_update_tasks(failed_task_ids, TaskStatus.FAILED,
+                                                [TaskStatus.INITIALIZING, TaskStatus.RUNNING])
 
         running_pods = PodManager.get_running_pods(self.v1, self.namespace)
-        for pod in running_pods:
-            task_of_pod = self.task_manager.get_task(pod)
+        for task_id in running_pods:
+            pod_name = self.pod_pool.get_pod_name(task_id)
+            task_of_pod = self.task_manager.get_task(task_id)
             if task_of_pod is None:
-                PodManager.delete_pod(self.v1, self.namespace, pod, None)
+                PodManager.delete_pod(self.v1, self.namespace, pod_name, None)
             else:
                 is_task_running = (task_of_pod.status == TaskStatus.RUNNING or
                                    task_of_pod.status == TaskStatus.INITIALIZING)
                 if not is_task_running:
                     task_logger = self.task_logger.setup_logger(task_of_pod.task_id)
-                    PodManager.delete_pod(self.v1, self.namespace, pod, task_logger)
+                    PodManager.delete_pod(self.v1, self.namespace, pod_name, task_logger)
 
-    def get_task_metrics(self, task_id: str) -> Optional[PodMetrics]:
-        return PodManager.get_pod_metrics(self.custom_api, self.namespace, task_id)
+        self.deadlines.start(self.__handle_task_timeout,
+                             [task.task_id for task in self.task_manager.get_running_tasks()])
+        self.pod_pool.start()
 
-    def get_task_logs(self, task_id: str) -> Optional[str]:
-        return PodManager.get_pod_logs(self.v1, self.namespace, task_id)
+    def resume_log_stream(self, task_id: str, pod_name: str):
+        # the container output up to the last write to the task log is already in there
+        task_logger = self.task_logger.setup_logger(task_id)
+        log_file = self.task_logger.get_log_file_path(task_id)
+        since = (datetime.fromtimestamp(log_file.stat().st_mtime, timezone.utc)
+                 if log_file.exists() else None)
+        PodLogStream(self.namespace, pod_name, task_logger.info, since).start()
+
+    def get_task_metrics(self, task_id: str) -> Optional[PodMetrics]:
+        return PodManager.get_pod_metrics(self.custom_api, self.namespace, self.pod_pool.get_pod_name(task_id))
 
     def install_ssh_server(self, task_id: str) -> bool:
         task_logger = self.task_logger.setup_logger(task_id)
         try:
-            PodEnvironment.install_ssh_server(self.v1, self.namespace, task_id, "sshuser", "123456", task_logger)
+            PodEnvironment.install_ssh_server(self.v1, self.namespace, self.pod_pool.get_pod_name(task_id),
+                                              "sshuser", "123456", task_logger)
             return True
         except Exception as e:
             logger.error(f"Error installing SSH server: {str(e)}")
@@ -293,12 +386,13 @@ class TaskManagerService(metaclass=SingletonMeta):
     def install_and_run_vscode_server(self, task_id: str) -> bool:
         task_logger = self.task_logger.setup_logger(task_id)
         try:
+            pod_name = self.pod_pool.get_pod_name(task_id)
             PodEnvironment.install_and_run_vscode_server(
-                self.v1, self.namespace, task_id, task_logger)
+                self.v1, self.namespace, pod_name, task_logger)
             vs_code_port = 8080
             if framework_config.IS_DEBUG:
                 async def port_forward_vscode():
-                    result = await PodPortManager.port_forward(self.namespace, task_id, vs_code_port)
+                    result = await PodPortManager.port_forward(self.namespace, pod_name, vs_code_port)
                     if result:
                         _, local_port = result
                         if local_port:
@@ -308,6 +402,7 @@ class TaskManagerService(metaclass=SingletonMeta):
             else:
                 self.task_manager.update_vscode_port(task_id, vs_code_port)
 
+            self.scheduler.release(task_id)
             return True
         except Exception as e:
             logger.error(f"Error installing VSCode server: {str(e)}")
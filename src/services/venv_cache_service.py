@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import shutil
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Generator, List
+
+from src.utils import config
+from src.utils.name_generator import sanitize_name
+from src.utils.singleton_meta import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_NAME = "venv.tar.gz"
+REFERENCES_DIR = "refs"
+LEASES_DIR = "leases"
+PUBLISHED_MARKER = "published"
+LOCAL_REQUIREMENT_PREFIXES = ("-r", "--requirement", "-c", "--constraint", "-e", "--editable", ".", "/", "file:")
+
+
+class VenvCacheService(metaclass=SingletonMeta):
+    def __init__(self):
+        self.root = Path(config.VENV_CACHE_ROOT)
+        self.max_size = config.VENV_CACHE_MAX_SIZE_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._leases: Dict[str, int] = {}
+        self.lease_name = sanitize_name(socket.gethostname())
+        self.lease_timeout = config.VENV_CACHE_LEASE_TIMEOUT_SECONDS
+
+    @staticmethod
+    def normalize_requirements(content: str) -> List[str]:
+        requirements = set()
+        for line in content.splitlines():
+            line = line.split(" #", 1)[0].strip()
+            if line and not line.startswith("#"):
+                requirements.add(" ".join(line.split()))
+
+        return sorted(requirements)
+
+    @staticmethod
+    def get_cache_key(python_version: str, image: str, requirements_path: Path) -> str:
+        content = requirements_path.read_text() if requirements_path.is_file() else ""
+        requirements = VenvCacheService.normalize_requirements(content)
+
+        digest = hashlib.sha256()
+        digest.update(f"{python_version}\n{image}\n".encode())
+        digest.update("\n".join(requirements).encode())
+
+        # requirements that point into the package make the venv depend on the package contents
+        if any(requirement.startswith(LOCAL_REQUIREMENT_PREFIXES) for requirement in requirements):
+            package_dir = requirements_path.parent
+            for file_path in sorted(path for path in package_dir.rglob("*") if path.is_file()):
+                digest.update(str(file_path.relative_to(package_dir)).encode())
+                digest.update(file_path.read_bytes())
+
+        return digest.hexdigest()
+
+    def get_archive_path(self, key: str) -> Path:
+        return self.root / key / ARCHIVE_NAME
+
+    def is_published(self, key: str) -> bool:
+        return (self.root / key / PUBLISHED_MARKER).exists()
+
+    def mark_published(self, key: str):
+        (self.root / key / PUBLISHED_MARKER).touch()
+
+    @contextmanager
+    def build_lock(self, key: str) -> Generator[None, None, None]:
+        with self._lock:
+            lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            yield
+
+    def acquire(self, key: str):
+        with self._lock:
+            self._leases[key] = self._leases.get(key, 0) + 1
+            # the cache volume is shared, other replicas only see the leases on disk
+            self._touch_lease(key)
+
+        archive_path = self.get_archive_path(key)
+        if archive_path.exists():
+            archive_path.touch()
+
+    def release(self, key: str):
+        with self._lock:
+            leases = self._leases.get(key, 0) - 1
+            if leases > 0:
+                self._leases[key] = leases
+            else:
+                self._leases.pop(key, None)
+                self._get_lease_path(key).unlink(missing_ok=True)
+
+    def add_reference(self, key: str, package_name: str, version: str, stage: str):
+        reference = self._get_reference_name(package_name, version, stage)
+        for entry in self._list_entries():
+            if entry.name != key:
+                (entry / REFERENCES_DIR / reference).unlink(missing_ok=True)
+
+        references_dir = self.root / key / REFERENCES_DIR
+        references_dir.mkdir(parents=True, exist_ok=True)
+        (references_dir / reference).touch()
+
+    def remove_references(self, package_name: str, version: str, stage: str):
+        reference = self._get_reference_name(package_name, version, stage)
+        for entry in self._list_entries():
+            (entry / REFERENCES_DIR / reference).unlink(missing_ok=True)
+
+    def evict(self):
+        with self._lock:
+            for key in self._leases:
+                self._touch_lease(key)
+
+        now = time.time()
+        entries = []
+        total_size = 0
+        for entry in self._list_entries():
+            archive_path = entry / ARCHIVE_NAME
+            if not archive_path.is_file():
+                continue
+
+            stat = archive_path.stat()
+            references_dir = entry / REFERENCES_DIR
+            referenced = references_dir.is_dir() and any(references_dir.iterdir())
+            total_size += stat.st_size
+            entries.append((referenced, stat.st_mtime, stat.st_size, entry))
+
+        # unreferenced venvs go first, then the least recently used ones
+        for _, _, size, entry in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            if self._is_leased(entry, now):
+                continue
+
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+            logger.info(f"Evicted cached virtual environment {entry.name}")
+
+        if total_size > self.max_size:
+            logger.warning(f"Virtual environment cache uses {total_size} bytes, above the budget of {self.max_size}")
+
+    def _get_lease_path(self, key: str) -> Path:
+        return self.root / key / LEASES_DIR / self.lease_name
+
+    def _touch_lease(self, key: str):
+        lease_path = self._get_lease_path(key)
+        lease_path.parent.mkdir(parents=True, exist_ok=True)
+        lease_path.touch()
+
+    def _is_leased(self, entry: Path, now: float) -> bool:
+        leases_dir = entry / LEASES_DIR
+        if not leases_dir.is_dir():
+            return False
+
+        for lease_path in leases_dir.iterdir():
+            try:
+                # a lease that is not refreshed in time belongs to a replica that went away
+                if now - lease_path.stat().st_mtime < self.lease_timeout:
+                    return True
+            except FileNotFoundError:
+                continue
+
+        return False
+
+    def _list_entries(self) -> List[Path]:
+        return [entry for entry in self.root.iterdir() if entry.is_dir()]
+
+    @staticmethod
+    def _get_reference_name(package_name: str, version: str, stage: str) -> str:
+        return f"{sanitize_name(package_name)}@{sanitize_name(version)}@{sanitize_name(stage)}"
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import WebSocket
+
+from src.utils import config
+from src.utils.singleton_meta import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+RESERVED_CLOSE_CODES = (1005, 1006, 1015)
+
+
+@dataclass
+class RelayCounters:
+    messages: int = 0
+    bytes: int = 0
+
+    def add(self, data: Union[str, bytes]):
+        self.messages += 1
+        self.bytes += len(data.encode("utf-8")) if isinstance(data, str) else len(data)
+
+
+@dataclass
+class WebSocketRelayStats:
+    task_id: str
+    path: str
+    started_at: float = field(default_factory=time.time)
+    to_upstream: RelayCounters = field(default_factory=RelayCounters)
+    to_client: RelayCounters = field(default_factory=RelayCounters)
+
+
+@dataclass
+class _Close:
+    code: Optional[int]
+    reason: str = ""
+
+
+class WebSocketRelayMetrics(metaclass=SingletonMeta):
+    def __init__(self):
+        self._active: Dict[int, WebSocketRelayStats] = {}
+        self._totals = {"connections": 0, "to_upstream": RelayCounters(), "to_client": RelayCounters()}
+        self._lock = threading.Lock()
+
+    def register(self, stats: WebSocketRelayStats):
+        with self._lock:
+            self._active[id(stats)] = stats
+            self._totals["connections"] += 1
+
+    def unregister(self, stats: WebSocketRelayStats):
+        with self._lock:
+            self._active.pop(id(stats), None)
+            for direction in ("to_upstream", "to_client"):
+                totals, counters = self._totals[direction], getattr(stats, direction)
+                totals.messages += counters.messages
+                totals.bytes += counters.bytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = [asdict(stats) for stats in self._active.values()]
+            totals = {key: asdict(value) if isinstance(value, RelayCounters) else value
+                      for key, value in self._totals.items()}
+
+        # totals only include closed connections, add the ones still open
+        for stats in active:
+            for direction in ("to_upstream", "to_client"):
+                totals[direction]["messages"] += stats[direction]["messages"]
+                totals[direction]["bytes"] += stats[direction]["bytes"]
+
+        return {"active": active, "totals": totals}
+
+
+class WebSocketRelay:
+    def __init__(self, websocket: WebSocket, upstream: Any, stats: WebSocketRelayStats):
+        self.websocket = websocket
+        self.upstream = upstream
+        self.stats = stats
+
+    async def run(self):
+        # bounded queues between reader and writer: a slow side stops the other side from being read
+        to_upstream: asyncio.Queue = asyncio.Queue(maxsize=config.PROXY_WS_QUEUE_SIZE)
+        to_client: asyncio.Queue = asyncio.Queue(maxsize=config.PROXY_WS_QUEUE_SIZE)
+        writers = [
+            asyncio.create_task(self._write_upstream(to_upstream)),
+            asyncio.create_task(self._write_client(to_client)),
+        ]
+        readers = [
+            asyncio.create_task(self._read_client(to_upstream)),
+            asyncio.create_task(self._read_upstream(to_client)),
+        ]
+
+        metrics = WebSocketRelayMetrics()
+        metrics.register(self.stats)
+        pending = set(writers + readers)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # a finished reader has queued the close for its writer, the relay ends with the first writer
+                failed = [task for task in done if task.exception() is not None]
+                for task in failed:
+                    logger.warning(f"WebSocket relay for task {self.stats.task_id} failed: {task.exception()}")
+                if failed or any(task in writers for task in done):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            metrics.unregister(self.stats)
+            logger.info(f"WebSocket relay for task {self.stats.task_id} /{self.stats.path} closed after "
+                        f"{time.time() - self.stats.started_at:.1f}s, "
+                        f"to upstream {self.stats.to_upstream.messages} messages/{self.stats.to_upstream.bytes} bytes, "
+                        f"to client {self.stats.to_client.messages} messages/{self.stats.to_client.bytes} bytes")
+
+    async def _read_client(self, queue: asyncio.Queue):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                await queue.put(_Close(message.get("code"), message.get("reason") or ""))
+                return
+
+            data = message["text"] if message.get("text") is not None else message.get("bytes")
+            if data is None:
+                continue
+
+            self.stats.to_upstream.add(data)
+            await queue.put(data)
+
+    async def _write_upstream(self, queue: asyncio.Queue):
+        while True:
+            data = await queue.get()
+            if isinstance(data, _Close):
+                await self.upstream.close(self._get_close_code(data.code), data.reason)
+                return
+
+            await self.upstream.send(data)
+
+    async def _read_upstream(self, queue: asyncio.Queue):
+        try:
+            async for data in self.upstream:
+                self.stats.to_client.add(data)
+                await queue.put(data)
+        except Exception as e:
+            logger.debug(f"Upstream websocket of task {self.stats.task_id} closed: {str(e)}")
+
+        await queue.put(_Close(self.upstream.close_code, self.upstream.close_reason or ""))
+
+    async def _write_client(self, queue: asyncio.Queue):
+        while True:
+            data = await queue.get()
+            if isinstance(data, _Close):
+                await self.websocket.close(self._get_close_code(data.code), data.reason)
+                return
+
+            if isinstance(data, str):
+                await self.websocket.send_text(data)
+            else:
+                await self.websocket.send_bytes(data)
+
+    @staticmethod
+    def _get_close_code(code: Optional[int]) -> int:
+        if code == 1006:
+            return 1011
+
+        return 1000 if code is None or code in RESERVED_CLOSE_CODES else code
+
+
+def get_requested_subprotocols(websocket: WebSocket) -> List[str]:
+    header = websocket.headers.get("sec-websocket-protocol", "")
+    return [protocol.strip() for protocol in header.split(",") if protocol.strip()]
@@ -26,6 +26,10 @@ VENVS_ROOT = os.path.join(HOME_PATH, "venvs")
 if not os.path.exists(VENVS_ROOT):
     os.makedirs(VENVS_ROOT)
 
+VENV_CACHE_ROOT = os.path.join(HOME_PATH, "venv-cache")
+if not os.path.exists(VENV_CACHE_ROOT):
+    os.makedirs(VENV_CACHE_ROOT)
+
 OPENAPI_PREFIX_PATH = os.getenv("OPENAPI_PREFIX_PATH", "/api")
 API_VERSION = os.getenv("API_VERSION", "0.1.0")
 APP_NAME = os.getenv("APP_NAME", "Lotse")
@@ -35,6 +39,10 @@ POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:5432/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:5432/{POSTGRES_DB}"
+# connections per replica, shared by the sync pool (executor threads) and the async pool (request handlers)
+DATABASE_MAX_CONNECTIONS = int(os.getenv("DATABASE_MAX_CONNECTIONS", "80"))
+ASYNC_DATABASE_MAX_CONNECTIONS = int(os.getenv("ASYNC_DATABASE_MAX_CONNECTIONS", "40"))  # part of the budget above
 
 ACTIVEMQ_ACTIVE = os.getenv("ACTIVEMQ_ACTIVE", "false").lower() == "true"
 ACTIVEMQ_HOST = os.getenv("ACTIVEMQ_HOST", "localhost")
@@ -45,7 +53,55 @@ ACTIVEMQ_QUEUE_NAME = os.getenv("ACTIVEMQ_QUEUE_NAME", "default_queue")
 
 GLOBAL_TASK_TIMEOUT_SECONDS = int(os.getenv("GLOBAL_STASK_TIMEOUT_SECONDS", "3600"))  # 1 hour
 
+EXECUTION_MAX_CONCURRENT = int(os.getenv("EXECUTION_MAX_CONCURRENT", "32"))
+EXECUTION_WATCHER_THREADS = int(os.getenv("EXECUTION_WATCHER_THREADS", "4"))  # finish released long-running runs
+EXECUTION_MAX_CONCURRENT_PER_PACKAGE = int(os.getenv("EXECUTION_MAX_CONCURRENT_PER_PACKAGE", "0"))  # 0 is unlimited
+EXECUTION_MAX_CONCURRENT_PER_STAGE = {  # e.g. "dev=4,prod=16"
+    stage.strip(): int(limit) for stage, limit in
+    (item.split("=", 1) for item in os.getenv("EXECUTION_MAX_CONCURRENT_PER_STAGE", "").split(",") if "=" in item)
+}
+
 K8S_NAMESPACE = os.getenv("K8S_NAMESPACE", "test")
+K8S_MAX_CONCURRENT_REQUESTS = int(os.getenv("K8S_MAX_CONCURRENT_REQUESTS", "32"))  # per operation type
+K8S_EXEC_POOL_SIZE = int(os.getenv("K8S_EXEC_POOL_SIZE", "16"))
+POD_LOG_RECONNECT_DELAY_SECONDS = float(os.getenv("POD_LOG_RECONNECT_DELAY_SECONDS", "1"))
+PORT_PROBE_INTERVAL_SECONDS = float(os.getenv("PORT_PROBE_INTERVAL_SECONDS", "1"))
+PORT_PROBE_TIMEOUT_SECONDS = float(os.getenv("PORT_PROBE_TIMEOUT_SECONDS", "300"))
+FILE_TRANSFER_COMPRESSION = os.getenv("FILE_TRANSFER_COMPRESSION", "none").lower()  # none, gzip or zstd
+
+TASK_LIST_DEFAULT_LIMIT = int(os.getenv("TASK_LIST_DEFAULT_LIMIT", "100"))
+TASK_LIST_MAX_LIMIT = int(os.getenv("TASK_LIST_MAX_LIMIT", "1000"))
+TASK_LOG_TAIL_LINES = int(os.getenv("TASK_LOG_TAIL_LINES", "5000"))  # lines returned when no range is requested
+TASK_LOG_MAX_READ_BYTES = int(os.getenv("TASK_LOG_MAX_READ_BYTES", str(8 * 1024 * 1024)))
+
+VENV_CACHE_MAX_SIZE_MB = int(os.getenv("VENV_CACHE_MAX_SIZE_MB", "20480"))
+VENV_CACHE_LEASE_TIMEOUT_SECONDS = int(os.getenv("VENV_CACHE_LEASE_TIMEOUT_SECONDS", "3600"))  # crashed holders
+VENV_VOLUME_NAME = os.getenv("VENV_VOLUME_NAME")  # registered volume to publish venvs to, unset disables it
+
+IMAGE_REGISTRY = os.getenv("IMAGE_REGISTRY")  # host[:port] to push per-deployment images to, unset disables it
+IMAGE_REGISTRY_REPOSITORY = os.getenv("IMAGE_REGISTRY_REPOSITORY", "lotse/packages")
+IMAGE_REGISTRY_USER = os.getenv("IMAGE_REGISTRY_USER")
+IMAGE_REGISTRY_PASSWORD = os.getenv("IMAGE_REGISTRY_PASSWORD")
+IMAGE_REGISTRY_INSECURE = os.getenv("IMAGE_REGISTRY_INSECURE", "false").lower() == "true"
+IMAGE_PLATFORM = os.getenv("IMAGE_PLATFORM", "linux/amd64")
+IMAGE_BUILD_MAX_CONCURRENT = int(os.getenv("IMAGE_BUILD_MAX_CONCURRENT", "2"))
+
+POD_POOL_SIZE = int(os.getenv("POD_POOL_SIZE", "0"))  # idle pods per image, 0 disables the pool
+POD_POOL_IMAGES = [image.strip() for image in os.getenv("POD_POOL_IMAGES", "").split(",") if image.strip()]
+POD_POOL_IDLE_TIMEOUT_SECONDS = int(os.getenv("POD_POOL_IDLE_TIMEOUT_SECONDS", "900"))
+POD_POOL_REFILL_INTERVAL_SECONDS = int(os.getenv("POD_POOL_REFILL_INTERVAL_SECONDS", "5"))
+
+PROXY_MAX_UPSTREAMS = int(os.getenv("PROXY_MAX_UPSTREAMS", "256"))
+PROXY_MAX_CONNECTIONS_PER_UPSTREAM = int(os.getenv("PROXY_MAX_CONNECTIONS_PER_UPSTREAM", "100"))
+PROXY_MAX_KEEPALIVE_PER_UPSTREAM = int(os.getenv("PROXY_MAX_KEEPALIVE_PER_UPSTREAM", "20"))
+PROXY_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("PROXY_KEEPALIVE_EXPIRY_SECONDS", "30"))
+PROXY_CLIENT_IDLE_TIMEOUT_SECONDS = float(os.getenv("PROXY_CLIENT_IDLE_TIMEOUT_SECONDS", "300"))
+PROXY_ROUTE_TTL_SECONDS = float(os.getenv("PROXY_ROUTE_TTL_SECONDS", "30"))
+PROXY_ROUTE_TABLE_SIZE = int(os.getenv("PROXY_ROUTE_TABLE_SIZE", "4096"))
+PROXY_WS_QUEUE_SIZE = int(os.getenv("PROXY_WS_QUEUE_SIZE", "16"))  # buffered messages per direction
+PROXY_WS_MAX_MESSAGE_SIZE = int(os.getenv("PROXY_WS_MAX_MESSAGE_SIZE", str(64 * 1024 * 1024)))
+PROXY_WS_PING_INTERVAL_SECONDS = float(os.getenv("PROXY_WS_PING_INTERVAL_SECONDS", "20"))
+PROXY_WS_UPSTREAM_COMPRESSION = os.getenv("PROXY_WS_UPSTREAM_COMPRESSION", "false").lower() == "true"
 
 # to get a string like this run:
 # openssl rand -hex 32
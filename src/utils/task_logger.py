@@ -1,11 +1,21 @@
 import logging
 import os
 import platform
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, List, Optional, Tuple
 
 from src.utils import config
 
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class LogChunk:
+    lines: List[str]
+    cursor: str
+    reset: bool = False
+
 
 class TaskLogger:
     def __init__(self):
@@ -46,14 +56,74 @@ class TaskLogger:
         self.loggers[task_id] = logger
         return logger
 
-    def get_logs(self, task_id: str) -> List[str]:
-        log_file = self.get_log_file_path(task_id)
-        if not log_file.exists():
-            return []
-
-        with open(log_file, 'r', encoding="utf-8") as f:
-            lines = f.readlines()
-            return lines
+    def read_logs(self, task_id: str, cursor: Optional[str] = None, tail: Optional[int] = None) -> LogChunk:
+        # only complete lines are returned and the cursor always points at the start of the next line
+        try:
+            log_file = open(self.get_log_file_path(task_id), "rb")
+        except FileNotFoundError:
+            return LogChunk([], self._format_cursor(0, 0), cursor is not None)
+
+        with log_file:
+            stat = os.fstat(log_file.fileno())
+            position = self._parse_cursor(cursor)
+            reset = cursor is not None and (position is None or position[0] != stat.st_ino or
+                                            position[1] > stat.st_size)
+            if cursor is not None and not reset:
+                start = position[1]  # type: ignore
+            elif tail is not None:
+                start = self._find_tail_offset(log_file, stat.st_size, tail)
+            else:
+                start = 0
+
+            log_file.seek(start)
+            data = log_file.read(min(stat.st_size - start, config.TASK_LOG_MAX_READ_BYTES))
+            end = data.rfind(b"\n") + 1
+            if end == 0 and len(data) == config.TASK_LOG_MAX_READ_BYTES:
+                end = len(data)
+
+            lines = data[:end].decode("utf-8", errors="replace").splitlines(keepends=True)
+            return LogChunk(lines, self._format_cursor(stat.st_ino, start + end), reset)
+
+    def get_cursor(self, task_id: str, offset: int) -> str:
+        try:
+            return self._format_cursor(self.get_log_file_path(task_id).stat().st_ino, offset)
+        except FileNotFoundError:
+            return self._format_cursor(0, 0)
+
+    @staticmethod
+    def _find_tail_offset(log_file: BinaryIO, size: int, lines: int) -> int:
+        # the newline closing the last complete line is the first one found from the end
+        position = size
+        newlines = 0
+        while position > 0:
+            block_size = min(TAIL_BLOCK_SIZE, position)
+            position -= block_size
+            log_file.seek(position)
+            block = log_file.read(block_size)
+
+            index = len(block)
+            while True:
+                index = block.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+
+                newlines += 1
+                if newlines > lines:
+                    return position + index + 1
+
+        return 0
+
+    @staticmethod
+    def _format_cursor(inode: int, offset: int) -> str:
+        return f"{inode}:{offset}"
+
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+        try:
+            inode, offset = (cursor or "").split(":")
+            return int(inode), int(offset)
+        except ValueError:
+            return None
 
     def clear_logs(self, task_id: str) -> bool:
         try: